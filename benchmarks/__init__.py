@@ -0,0 +1 @@
+"""Benchmarks for the calculator's hot paths, run with python -m benchmarks."""
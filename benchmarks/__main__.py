@@ -0,0 +1,121 @@
+"""Command line for running benchmarks and comparing them against a baseline.
+
+    python -m benchmarks run --out baseline.json
+    python -m benchmarks run --out current.json --filter add/ --max-operands 10000
+    python -m benchmarks compare baseline.json current.json --threshold 10
+
+compare exits with status 1 if any benchmark got slower than the threshold allows.
+"""
+
+import sys
+import fnmatch
+import argparse
+from benchmarks import harness, suites
+from calculator.exceptions import CLIError
+
+
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    """Parse benchmark command line options"""
+    parser = argparse.ArgumentParser(prog="python -m benchmarks",
+                                     description="Calculator benchmarks")
+    commands = parser.add_subparsers(dest="action", required=True)
+
+    run_parser = commands.add_parser("run", help="time the benchmarks")
+    run_parser.add_argument("--out", metavar="FILE", help="save the results as JSON")
+    run_parser.add_argument(
+        "--filter",
+        action="append",
+        metavar="PATTERN",
+        help="only run benchmarks whose name matches a glob or contains PATTERN (repeatable)"
+    )
+    run_parser.add_argument(
+        "--max-operands",
+        type=int,
+        metavar="N",
+        help="leave out operand counts above N (default: up to 10^6)"
+    )
+    run_parser.add_argument(
+        "--min-time",
+        type=float,
+        default=harness.MIN_TIME_S,
+        metavar="SECONDS",
+        help=f"time each benchmark for at least this long (default: {harness.MIN_TIME_S})"
+    )
+    run_parser.add_argument("--list", action="store_true", help="list benchmark names and exit")
+
+    compare_parser = commands.add_parser("compare", help="flag regressions against a baseline")
+    compare_parser.add_argument("baseline", help="results saved by run --out")
+    compare_parser.add_argument("current", help="results saved by run --out")
+    compare_parser.add_argument(
+        "--threshold",
+        type=float,
+        default=harness.DEFAULT_THRESHOLD,
+        metavar="PERCENT",
+        help=f"how much slower counts as a regression (default: {harness.DEFAULT_THRESHOLD}%%)"
+    )
+    compare_parser.add_argument(
+        "--metric",
+        choices=harness.METRICS,
+        default=harness.DEFAULT_METRIC,
+        help=f"latency to compare (default: {harness.DEFAULT_METRIC})"
+    )
+    return parser.parse_args(argv)
+
+
+def selected(name: str, patterns: list[str] | None) -> bool:
+    """Check if a benchmark was asked for with --filter"""
+    return not patterns or any(
+        pattern in name or fnmatch.fnmatchcase(name, pattern) for pattern in patterns
+    )
+
+
+def run(args: argparse.Namespace) -> int:
+    """Time the selected benchmarks, print them and optionally save them"""
+    benchmarks = [(name, factory) for name, factory in suites.all_benchmarks(args.max_operands)
+                  if selected(name, args.filter)]
+    if args.list:
+        for name, _ in benchmarks:
+            print(name)
+        return 0
+
+    results = {}
+    for name, factory in benchmarks:
+        print(f"{name} ...", file=sys.stderr, flush=True)
+        try:
+            with factory() as case:
+                results[name] = harness.measure(case, args.min_time)
+        except CLIError as exc:
+            # e.g. the package isn't installed, so no plugins were registered
+            print(f"{name} failed: {type(exc).__name__}: {exc}", file=sys.stderr)
+
+    if results:
+        harness.print_results(results)
+    if args.out:
+        harness.save_results(args.out, results)
+        print(f"Results saved to {args.out}", file=sys.stderr)
+    return 0 if len(results) == len(benchmarks) else 1
+
+
+def compare(args: argparse.Namespace) -> int:
+    """Compare two saved runs, 1 if anything regressed"""
+    rows = harness.compare(harness.load_results(args.baseline), harness.load_results(args.current),
+                           args.metric, args.threshold)
+    harness.print_comparison(rows, args.metric)
+    regressions = [row["name"] for row in rows if row["regression"]]
+    if regressions:
+        print(f"{len(regressions)} benchmark(s) more than {args.threshold}% slower:"
+              f" {', '.join(regressions)}", file=sys.stderr)
+        return 1
+    return 0
+
+
+def main(argv: list[str] | None = None) -> int:
+    """Entry point for python -m benchmarks"""
+    args = parse_args(argv)
+    if args.action == "compare":
+        return compare(args)
+    return run(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,150 @@
+"""Module for timing benchmark cases and comparing runs against a baseline.
+
+Every call of a case is timed with time.perf_counter_ns and recorded in the same
+log-linear LatencyHistogram the stats command uses, so a result carries p50/p95/p99
+latency as well as throughput. Results are saved as JSON so a later run can be
+compared against them.
+"""
+
+import sys
+import json
+import time
+import platform
+import datetime
+from collections.abc import Callable
+from calculator.stats import LatencyHistogram, format_ns
+
+
+# every case is called at least this many times and for at least this long
+MIN_CALLS = 3
+MIN_TIME_S = 0.5
+MAX_CALLS = 100_000
+# latency a comparison looks at, and how much slower counts as a regression
+DEFAULT_METRIC = "p50_ns"
+DEFAULT_THRESHOLD = 10.0
+METRICS = ("mean_ns", "p50_ns", "p95_ns", "p99_ns")
+
+
+class Case():  # pylint: disable=too-few-public-methods
+    """A callable to time, with untimed set up before each call"""
+    __slots__ = ("run", "before", "ops", "warmup", "min_calls")
+
+    def __init__(self, run: Callable[[], object],  # pylint: disable=too-many-arguments
+                 before: Callable[[], object] | None = None, *, ops: int = 1,
+                 warmup: bool = True, min_calls: int = MIN_CALLS) -> None:
+        self.run = run
+        self.before = before
+        # units of work (operands, records..) done by one call, for throughput
+        self.ops = ops
+        # call once untimed first, off for cases that measure a cold start
+        self.warmup = warmup
+        self.min_calls = min_calls
+
+
+def measure(case: Case, min_time_s: float = MIN_TIME_S, max_calls: int = MAX_CALLS) -> dict:
+    """Call a case repeatedly and summarize its latency and throughput"""
+    if case.warmup:
+        if case.before is not None:
+            case.before()
+        case.run()
+
+    histogram = LatencyHistogram()
+    min_time_ns = int(min_time_s * 1e9)
+    while histogram.count < max_calls and (histogram.count < case.min_calls
+                                           or histogram.total < min_time_ns):
+        if case.before is not None:
+            case.before()
+        start_ns = time.perf_counter_ns()
+        case.run()
+        histogram.record(time.perf_counter_ns() - start_ns)
+
+    return {
+        "calls": histogram.count,
+        "ops_per_call": case.ops,
+        "mean_ns": histogram.total // histogram.count,
+        "p50_ns": histogram.percentile(50),
+        "p95_ns": histogram.percentile(95),
+        "p99_ns": histogram.percentile(99),
+        "max_ns": histogram.max,
+        "ops_per_sec": case.ops * histogram.count * 1e9 / max(histogram.total, 1)
+    }
+
+
+def environment() -> dict:
+    """Where a run was taken, saved with its results"""
+    return {
+        "created": datetime.datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "implementation": platform.python_implementation(),
+        "platform": platform.platform(),
+        "machine": platform.machine()
+    }
+
+
+def save_results(path: str, results: dict[str, dict], meta: dict | None = None) -> None:
+    """Write a run to a JSON file"""
+    with open(path, "w", encoding="utf-8") as results_file:
+        json.dump({"meta": meta or environment(), "results": results}, results_file, indent=2)
+        results_file.write("\n")
+
+
+def load_results(path: str) -> dict[str, dict]:
+    """Read the results of a run saved with save_results"""
+    with open(path, encoding="utf-8") as results_file:
+        return json.load(results_file)["results"]
+
+
+def compare(baseline: dict[str, dict], current: dict[str, dict],
+            metric: str = DEFAULT_METRIC, threshold: float = DEFAULT_THRESHOLD) -> list[dict]:
+    """Change of a latency metric per benchmark, flagging any more than threshold % slower"""
+    rows = []
+    # baseline order, then anything only the current run has
+    for name in list(baseline) + [name for name in current if name not in baseline]:
+        before = baseline.get(name, {}).get(metric)
+        after = current.get(name, {}).get(metric)
+        row = {"name": name, "baseline": before, "current": after,
+               "change": None, "regression": False}
+        if before and after is not None:
+            row["change"] = (after - before) * 100 / before
+            row["regression"] = row["change"] > threshold
+        rows.append(row)
+    return rows
+
+
+def print_table(rows: list[tuple[str, ...]], stream=None) -> None:
+    """Print rows of cells as left aligned columns"""
+    widths = [max(len(row[i]) for row in rows) for i in range(len(rows[0]))]
+    for row in rows:
+        print("  ".join(cell.ljust(width) for cell, width in zip(row, widths)).rstrip(),
+              file=stream or sys.stdout)
+
+
+def print_results(results: dict[str, dict], stream=None) -> None:
+    """Print one line per benchmark with its latency percentiles and throughput"""
+    rows = [("benchmark", "calls", "p50", "p95", "p99", "max", "ops/sec")]
+    for name, result in results.items():
+        rows.append((name, str(result["calls"]),
+                     *(format_ns(result[key]) for key in ("p50_ns", "p95_ns", "p99_ns", "max_ns")),
+                     f"{result['ops_per_sec']:,.0f}"))
+    print_table(rows, stream)
+
+
+def print_comparison(rows: list[dict], metric: str = DEFAULT_METRIC, stream=None) -> None:
+    """Print a comparison made by compare"""
+    table = [("benchmark", f"baseline {metric}", f"current {metric}", "change", "")]
+    for row in rows:
+        if row["baseline"] is None:
+            flag, change = "new", ""
+        elif row["current"] is None:
+            flag, change = "missing", ""
+        else:
+            flag = "REGRESSION" if row["regression"] else ""
+            change = f"{row['change']:+.1f}%" if row["change"] is not None else ""
+        table.append((
+            row["name"],
+            format_ns(row["baseline"]) if row["baseline"] is not None else "-",
+            format_ns(row["current"]) if row["current"] is not None else "-",
+            change,
+            flag
+        ))
+    print_table(table, stream)
@@ -0,0 +1,236 @@
+"""Module defining the benchmarked hot paths of the calculator.
+
+Each benchmark is a context manager building its Case, so inputs are only generated
+for the benchmarks that run and anything they open is closed afterwards. Inputs are
+made with Faker the way the tests' generators make them, seeded so every run times
+the same commands.
+"""
+
+import os
+import sys
+import tempfile
+import subprocess
+import contextlib
+from collections.abc import Callable, Iterator
+from faker import Faker
+from benchmarks.harness import Case
+from calculator.invoker import Invoker
+from calculator.command_input import CommandInput
+from calculator.command_output import CommandOutput
+from calculator.result_cache import ResultCache
+from calculator.commands.history.history import History
+from calculator.commands.expression import compiler
+
+
+SEED = 4
+# arithmetic plugins and the operand counts they are timed at
+ARITHMETIC_COMMANDS = ("add", "subtract", "multiply", "divide")
+OPERAND_COUNTS = (2, 10, 100, 1_000, 10_000, 100_000, 1_000_000)
+HISTORY_BACKENDS = ("csv", "sqlite")
+HISTORY_SIZES = (5, 100, 10_000)
+# history print/delete rebuild every retained record, so fewer sizes
+HISTORY_PRINT_SIZES = (5, 1_000)
+EXPRESSION = "(3.5 + 4) * 2 / 7 - 1 + 2 ** 10 % 7"
+STARTUP_CALLS = 5
+STARTUP_SCRIPT = "from calculator.cli import CLI; CLI().history.close()"
+
+
+def gen_operands(command: str, num_args: int) -> list[str]:
+    """Random operands for an arithmetic command
+
+    Sums use integers like the tests' generators. Products and quotients use values
+    between 0.5 and 2, so a million of them neither overflow nor hit a zero divisor.
+    """
+    fake = Faker()
+    fake.seed_instance(SEED)
+    if command in ("multiply", "divide"):
+        return [f"{fake.random_int(min=5000, max=20000) / 10000:.4f}" for _ in range(num_args)]
+    return [str(fake.random_int(min=-10000, max=10000)) for _ in range(num_args)]
+
+
+def gen_cmd(command: str, num_args: int) -> CommandInput:
+    """Random arithmetic command with a given number of operands"""
+    return CommandInput(" ".join([command] + gen_operands(command, num_args)))
+
+
+@contextlib.contextmanager
+def history_env(size: int, backend: str = "csv") -> Iterator[str]:
+    """Point History at a scratch log of the given size and backend"""
+    names = ("HISTORY_FILE", "HISTORY_SIZE", "HISTORY_BACKEND")
+    saved = {name: os.environ.get(name) for name in names}
+    with tempfile.TemporaryDirectory(prefix="calculator-bench-") as scratch:
+        history_file = os.path.join(scratch, "history.db" if backend == "sqlite" else "history.csv")
+        os.environ.update(HISTORY_FILE=history_file, HISTORY_SIZE=str(size),
+                          HISTORY_BACKEND=backend)
+        try:
+            yield history_file
+        finally:
+            for name, value in saved.items():
+                if value is None:
+                    os.environ.pop(name, None)
+                else:
+                    os.environ[name] = value
+
+
+@contextlib.contextmanager
+def filled_history(size: int, backend: str = "csv") -> Iterator[History]:
+    """History holding size records, closed afterwards"""
+    with history_env(size, backend):
+        history = History()
+        try:
+            record = History.form_history_record(gen_cmd("add", 2), CommandOutput("0"))
+            for _ in range(size):
+                history.add_record(record)
+            history.flush()
+            yield history
+        finally:
+            history.close()
+
+
+@contextlib.contextmanager
+def bench_parse(num_args: int) -> Iterator[Case]:
+    """Turn an input line into a CommandInput"""
+    line = " ".join(["add"] + gen_operands("add", num_args))
+    yield Case(lambda: CommandInput(line))
+
+
+@contextlib.contextmanager
+def bench_dispatch() -> Iterator[Case]:
+    """Pick the plugin for a command and construct it, as Invoker.execute_command does"""
+    invoker = Invoker()
+    cmd = gen_cmd("add", 2)
+
+    def run():
+        # pylint: disable-next=protected-access
+        plugin = invoker._choose_command(cmd)
+        return plugin(cmd, **invoker._services_for(plugin))  # pylint: disable=protected-access
+
+    yield Case(run)
+
+
+@contextlib.contextmanager
+def bench_pipeline(cached: bool) -> Iterator[Case]:
+    """Parse and execute a two operand command end to end, computing it every call unless cached"""
+    invoker = Invoker({"result_cache": ResultCache(None if cached else 0)})
+    line = " ".join(["add"] + gen_operands("add", 2))
+    yield Case(lambda: invoker.execute_command(CommandInput(line)))
+
+
+@contextlib.contextmanager
+def bench_arithmetic(command: str, num_args: int) -> Iterator[Case]:
+    """Validate and execute an already parsed arithmetic command"""
+    invoker = Invoker()
+    cmd = gen_cmd(command, num_args)
+    plugin = invoker._choose_command(cmd)  # pylint: disable=protected-access
+
+    def run():
+        # a new command each call, operands are parsed once per command object
+        command_object = plugin(cmd)
+        command_object.validate()
+        return command_object.execute()
+
+    yield Case(run, ops=num_args, min_calls=1 if num_args >= 100_000 else 3)
+
+
+@contextlib.contextmanager
+def bench_expression(cached: bool) -> Iterator[Case]:
+    """Evaluate an infix expression, compiling it every call unless cached"""
+    invoker = Invoker()
+    cmd = CommandInput(f"eval {EXPRESSION}")
+    plugin = invoker._choose_command(cmd)  # pylint: disable=protected-access
+
+    def run():
+        command_object = plugin(cmd)
+        command_object.validate()
+        return command_object.execute()
+
+    # pylint: disable-next=protected-access
+    yield Case(run, before=None if cached else compiler._compile_normalized.cache_clear)
+
+
+@contextlib.contextmanager
+def bench_history_add(size: int, backend: str) -> Iterator[Case]:
+    """Record a command in a full history, including its share of log writes"""
+    with filled_history(size, backend) as history:
+        cmd_in = gen_cmd("add", 2)
+        cmd_out = CommandOutput("0")
+        yield Case(lambda: history.add(cmd_in, cmd_out))
+
+
+@contextlib.contextmanager
+def bench_history_print(size: int, backend: str) -> Iterator[Case]:
+    """Build the DataFrame the history command prints"""
+    with filled_history(size, backend) as history:
+        plugin = Invoker()._choose_command(CommandInput("history"))  # pylint: disable=protected-access
+
+        def run():
+            command_object = plugin(CommandInput("history"), history=history)
+            command_object.validate()
+            return str(command_object.execute())
+
+        yield Case(run, ops=size)
+
+
+@contextlib.contextmanager
+def bench_history_delete(size: int, backend: str) -> Iterator[Case]:
+    """Delete the oldest record, with history topped back up before each call"""
+    with filled_history(size, backend) as history:
+        cmd = CommandInput("delete 0")
+        plugin = Invoker()._choose_command(cmd)  # pylint: disable=protected-access
+        record = History.form_history_record(gen_cmd("add", 2), CommandOutput("0"))
+
+        def before():
+            history.add_record(record)
+            history.flush()
+
+        def run():
+            command_object = plugin(cmd, history=history)
+            command_object.validate()
+            return command_object.execute()
+
+        yield Case(run, before=before)
+
+
+@contextlib.contextmanager
+def bench_startup() -> Iterator[Case]:
+    """Start an interpreter and build a CLI with its History and plugins"""
+    with history_env(5):
+        root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        env = dict(os.environ)
+        env["PYTHONPATH"] = os.pathsep.join(filter(None, [root, env.get("PYTHONPATH")]))
+        argv = [sys.executable, "-c", STARTUP_SCRIPT]
+        yield Case(lambda: subprocess.run(argv, env=env, check=True),
+                   warmup=False, min_calls=STARTUP_CALLS)
+
+
+def all_benchmarks(max_operands: int | None = None) -> list[tuple[str, Callable]]:
+    """Every benchmark as (name, factory), leaving out operand counts above max_operands"""
+    counts = [count for count in OPERAND_COUNTS
+              if max_operands is None or count <= max_operands]
+    benchmarks = [(f"parse/{count}", lambda count=count: bench_parse(count)) for count in counts]
+    benchmarks += [("dispatch", bench_dispatch),
+                   ("pipeline", lambda: bench_pipeline(False)),
+                   ("pipeline/cached", lambda: bench_pipeline(True))]
+    benchmarks += [
+        (f"{command}/{count}", lambda command=command, count=count:
+            bench_arithmetic(command, count))
+        for command in ARITHMETIC_COMMANDS
+        for count in counts
+    ]
+    benchmarks += [("eval/compile", lambda: bench_expression(False)),
+                   ("eval/cached", lambda: bench_expression(True))]
+    for backend in HISTORY_BACKENDS:
+        benchmarks += [
+            (f"history_add/{backend}/{size}", lambda size=size, backend=backend:
+                bench_history_add(size, backend))
+            for size in HISTORY_SIZES
+        ]
+        for name, factory in (("history_print", bench_history_print),
+                              ("history_delete", bench_history_delete)):
+            benchmarks += [
+                (f"{name}/{backend}/{size}", lambda size=size, backend=backend, factory=factory:
+                    factory(size, backend))
+                for size in HISTORY_PRINT_SIZES
+            ]
+    benchmarks.append(("startup", bench_startup))
+    return benchmarks
@@ -0,0 +1,126 @@
+"""Module for running batch commands across a pool of worker processes.
+
+Command lines are sent to the workers in chunks to keep pickling and IPC overhead
+low, and each worker keeps one Invoker with its plugins imported for its whole
+life. Results are handed back in input order, along with the phase timings the
+worker recorded for them, which are merged into the parent's stats. Commands that
+use the shared History or stats (history, delete, clear, stats) can't run in a
+worker, so they run in the parent process once everything before them has finished.
+"""
+
+import logging
+from collections import deque
+from collections.abc import Callable, Iterable, Iterator
+from concurrent.futures import Future, ProcessPoolExecutor
+from calculator.command_input import CommandInput
+from calculator.exceptions import CLIError
+from calculator.invoker import Invoker
+from calculator.stats import Stats
+from calculator.commands.history.history import History
+
+
+# command lines per task sent to a worker
+DEFAULT_CHUNK_LINES = 1024
+# chunks queued per worker, bounds how far reading runs ahead of writing
+CHUNKS_PER_WORKER = 2
+
+# warm Invoker of a worker process, set up once by init_worker
+_worker_invoker = None  # pylint: disable=invalid-name
+
+
+def execute_line(invoker: Invoker, line: str, keep_record: bool) -> tuple[str, dict | None]:
+    """Run one command line, returning the printed result and its history record"""
+    command = CommandInput(line.rstrip("\r\n"))
+    result = invoker.execute_command(command)
+    # the text first, a streamed output can only be read once
+    text = str(result)
+    record = History.form_history_record(command, result) if keep_record else None
+    return text, record
+
+
+def init_worker() -> None:
+    """Build the worker's Invoker, timing commands, and import every plugin up front"""
+    global _worker_invoker  # pylint: disable=global-statement
+    _worker_invoker = Invoker({"stats": Stats()})
+    _worker_invoker.list_commands()
+
+
+def run_chunk(lines: list[tuple[int, str]], keep_records: bool) -> tuple[list[tuple], dict]:
+    """Run a chunk of numbered lines in a worker
+
+    Returns (line number, result, record, error) per line, with error set instead of
+    result when the command failed, and the phase histograms recorded for the chunk.
+    """
+    outcomes = []
+    for line_number, line in lines:
+        try:
+            result, record = execute_line(_worker_invoker, line, keep_records)
+            outcomes.append((line_number, result, record, None))
+        except CLIError as exc:
+            outcomes.append((line_number, None, None, f"{type(exc).__name__}: {exc}"))
+        except Exception as exc:  # pylint: disable=broad-exception-caught
+            # e.g. decimal.Overflow, one bad line mustn't lose the rest of the chunk
+            logging.exception(f"Batch line {line_number} raised")
+            outcomes.append((line_number, None, None, f"{type(exc).__name__}: {exc}"))
+    stats = _worker_invoker.services["stats"]
+    histograms = dict(stats.histograms)
+    stats.clear()
+    return outcomes, histograms
+
+
+def collect(future: Future, stats: Stats | None) -> Iterator[tuple[str, dict | None]]:
+    """Results of a finished chunk, logging the lines that failed and merging its timings"""
+    outcomes, histograms = future.result()
+    if stats is not None:
+        stats.merge(histograms)
+    for line_number, result, record, error in outcomes:
+        if error is not None:
+            logging.info(f"Batch line {line_number} failed: {error}")
+            continue
+        yield result, record
+
+
+def run_parallel(  # pylint: disable=too-many-arguments,too-many-positional-arguments
+        source: Iterable[str], workers: int, keep_records: bool,
+        run_serial: Callable[[int, str], Iterator[tuple[str, dict | None]]],
+        is_exit: Callable[[str], bool], serial_aliases: set[str],
+        chunk_lines: int | None = None,
+        stats: Stats | None = None) -> Iterator[tuple[str, dict | None]]:
+    """Run source lines on a process pool, yielding (result, record) in input order
+
+    Lines whose command is in serial_aliases go to run_serial in this process after
+    every earlier line is done. Reading stops at the first exit command. The workers'
+    phase timings are merged into stats if given.
+    """
+    chunk_lines = chunk_lines or DEFAULT_CHUNK_LINES
+    with ProcessPoolExecutor(workers, initializer=init_worker) as pool:
+        pending = deque()
+        chunk = []
+        for line_number, line in enumerate(source, 1):
+            words = line.split(None, 1)
+            if not words:
+                continue
+            command = words[0].lower()
+            if is_exit(command):
+                break
+            if command in serial_aliases:
+                if chunk:
+                    pending.append(pool.submit(run_chunk, chunk, keep_records))
+                    chunk = []
+                while pending:
+                    yield from collect(pending.popleft(), stats)
+                yield from run_serial(line_number, line)
+                continue
+
+            chunk.append((line_number, line))
+            if len(chunk) >= chunk_lines:
+                pending.append(pool.submit(run_chunk, chunk, keep_records))
+                chunk = []
+                # don't read further ahead than the workers can keep up with
+                while len(pending) > workers * CHUNKS_PER_WORKER:
+                    yield from collect(pending.popleft(), stats)
+
+        if chunk:
+            pending.append(pool.submit(run_chunk, chunk, keep_records))
+        while pending:
+            yield from collect(pending.popleft(), stats)
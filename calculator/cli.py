@@ -1,31 +1,49 @@
 """Module implementing a command line interface"""
 
 import re
+import sys
 import logging
 import datetime
+from collections import deque
+from collections.abc import Callable, Iterator
+from typing import TextIO
 from dateutil.relativedelta import relativedelta
 from calculator.exceptions import CLIError, CLIExit
 from calculator.command_input import CommandInput
 from calculator.invoker import Invoker
+from calculator import batch_pool
 from calculator.timedeltaprint import pprintrd
+from calculator.stats import Stats
 from calculator.commands.history.history import History
 
 
+# how --batch records commands in history
+HISTORY_POLICIES = ("off", "sample", "bulk")
+# batch results are written out this many lines at a time
+BATCH_OUTPUT_LINES = 1024
+
+
 class CLI():
     """Command line interpretor"""
     def __init__(self) -> None:
         self.start_time = datetime.datetime.now()
         self.commands_run = 0
         # exit interpretor command regex
-        self.exit_pattern = re.compile(r"\s*(exit|e|quit|q)", re.IGNORECASE)
-        self.invoker = Invoker()
+        self.exit_pattern = re.compile(r"\s*(exit|e|quit|q)\s*$", re.IGNORECASE)
         self.history = History()
+        self.stats = Stats()
+        # history plugins work on the same History the interpreter records to
+        self.invoker = Invoker({"history": self.history, "stats": self.stats})
 
 
-    def _print_exit_msg(self) -> None:
+    def _print_exit_msg(self, stream: TextIO | None = None) -> None:
         """Print message when exiting"""
-        rt = pprintrd(relativedelta(datetime.datetime.now(), self.start_time))
-        print(f"Ran {self.commands_run} command{'s' if self.commands_run != 1 else ''} in {rt}")
+        now = datetime.datetime.now()
+        rt = pprintrd(relativedelta(now, self.start_time))
+        elapsed = (now - self.start_time).total_seconds()
+        rate = self.commands_run / elapsed if elapsed > 0 else 0.0
+        print(f"Ran {self.commands_run} command{'s' if self.commands_run != 1 else ''} in {rt}"
+              f" ({rate:,.1f} commands/sec)", file=stream)
 
 
     def _check_for_exit(self, cmd: CommandInput) -> None:
@@ -48,11 +66,101 @@ class CLI():
                 self._check_for_exit(command)
                 result = self.invoker.execute_command(command)
                 self.commands_run += 1
+                output_ns = Stats.clock()
+                for line in result.lines():
+                    print(line)
+                history_ns = Stats.clock()
+                self.stats.record("output", history_ns - output_ns)
+                # buffered, written to disk in the background
                 self.history.add(command, result)
-                print(result)
+                self.stats.record("history", Stats.clock() - history_ns)
             except CLIError:
                 # Choosing not to exit the calculator if the user does a typo
                 logging.info("Command line interpretor error", exc_info=True)
             except (KeyboardInterrupt, EOFError, CLIExit):
+                self.history.close()
                 self._print_exit_msg()
                 break
+
+
+    def _run_batch_line(self, line_number: int, line: str,
+                        keep_record: bool) -> Iterator[tuple[str, dict | None]]:
+        """Run one batch line in this process, yielding its result unless it failed"""
+        try:
+            yield batch_pool.execute_line(self.invoker, line, keep_record)
+        except CLIError:
+            logging.info(f"Batch line {line_number} failed", exc_info=True)
+        except Exception:  # pylint: disable=broad-exception-caught
+            # skipped like in a worker, so serial and parallel batches agree
+            logging.exception(f"Batch line {line_number} raised")
+
+
+    def _run_batch_serial(self, source: TextIO, keep_records: bool,
+                          run_history_line: Callable[[int, str], Iterator],
+                          history_aliases: set[str]) -> Iterator[tuple[str, dict | None]]:
+        """Run batch lines one after another until the first exit command"""
+        for line_number, line in enumerate(source, 1):
+            words = line.split(None, 1)
+            if not words:
+                continue
+            command = words[0].lower()
+            if self.exit_pattern.match(command):
+                return
+            if command in history_aliases:
+                yield from run_history_line(line_number, line)
+            else:
+                yield from self._run_batch_line(line_number, line, keep_records)
+
+
+    def run_batch(  # pylint: disable=too-many-arguments,too-many-positional-arguments
+            self, source: TextIO, sink: TextIO, history_policy: str = "bulk",
+            sample_every: int = 100, workers: int = 1) -> None:
+        """Run every command line in source without prompting, writing results to sink
+
+        history_policy "off" records nothing, "sample" records every sample_every-th
+        command and "bulk" records the commands still retained in history once the
+        batch is done. With more than one worker, lines run on a process pool; results
+        and history still follow input order.
+        """
+        keep_records = history_policy != "off"
+        # bulk only has to remember what would survive in the history ring
+        retained = deque(maxlen=self.history.size if history_policy == "bulk" else 0)
+
+        def run_history_line(line_number: int, line: str) -> Iterator[tuple[str, dict | None]]:
+            """History commands see every record before them, even when bulk recording"""
+            while retained:
+                self.history.add_record(retained.popleft())
+            yield from self._run_batch_line(line_number, line, keep_records)
+
+        # stats has to see the timings of every line before it, from every worker
+        history_aliases = (self.invoker.aliases_using("history")
+                           | self.invoker.aliases_using("stats"))
+        if workers > 1:
+            outcomes = batch_pool.run_parallel(source, workers, keep_records, run_history_line,
+                                               self.exit_pattern.match, history_aliases,
+                                               stats=self.stats)
+        else:
+            outcomes = self._run_batch_serial(source, keep_records, run_history_line,
+                                              history_aliases)
+
+        results = []
+        try:
+            for result, record in outcomes:
+                self.commands_run += 1
+                results.append(f"{result}\n")
+                if len(results) >= BATCH_OUTPUT_LINES:
+                    sink.write("".join(results))
+                    results.clear()
+                if history_policy == "sample":
+                    if self.commands_run % sample_every == 0:
+                        self.history.add_record(record)
+                else:
+                    retained.append(record)
+        finally:
+            sink.write("".join(results))
+            sink.flush()
+            for record in retained:
+                self.history.add_record(record)
+            self.history.close()
+            # keep the summary out of the results
+            self._print_exit_msg(sys.stderr)
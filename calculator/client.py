@@ -0,0 +1,158 @@
+"""Thin client for a calculator daemon running behind a Unix socket.
+
+`calc add 1 2` sends its arguments as one command, `calc` with no arguments sends
+every line of stdin. The client only imports the standard library pieces it needs,
+so each call costs an interpreter start and one round trip instead of loading
+dotenv, logging config, plugins and pandas. If no daemon is listening, one is
+started in the background (run_calculator --serve --socket PATH).
+"""
+
+import os
+import sys
+import json
+import time
+import socket
+import threading
+
+
+# seconds to wait for an auto-started daemon to accept connections
+DEFAULT_START_TIMEOUT = 10.0
+
+
+def default_socket_path() -> str:
+    """Socket the daemon listens on, CALCULATOR_SOCKET or one per user"""
+    path = os.environ.get("CALCULATOR_SOCKET")
+    if path:
+        return path
+    runtime_dir = os.environ.get("XDG_RUNTIME_DIR") or "/tmp"
+    return os.path.join(runtime_dir, f"calculator-{os.getuid()}.sock")
+
+
+def connect(socket_path: str) -> socket.socket | None:
+    """Connect to a running daemon, None if nothing is listening"""
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        sock.connect(socket_path)
+    except (FileNotFoundError, ConnectionRefusedError):
+        sock.close()
+        return None
+    return sock
+
+
+def start_daemon(socket_path: str) -> None:
+    """Start a daemon in its own session, detached from this terminal"""
+    import subprocess  # pylint: disable=import-outside-toplevel
+    subprocess.Popen(  # pylint: disable=consider-using-with
+        [sys.executable, "-m", "calculator.main", "--serve", "--socket", socket_path],
+        stdin=subprocess.DEVNULL,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+        start_new_session=True
+    )
+
+
+def connect_or_start(socket_path: str, timeout: float | None = None) -> socket.socket:
+    """Connect to the daemon, starting one first if none is running"""
+    sock = connect(socket_path)
+    if sock is not None:
+        return sock
+
+    start_daemon(socket_path)
+    if timeout is None:
+        timeout = float(os.environ.get("CALCULATOR_START_TIMEOUT", DEFAULT_START_TIMEOUT))
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        time.sleep(0.05)
+        sock = connect(socket_path)
+        if sock is not None:
+            return sock
+    raise ConnectionError(f"Calculator daemon did not start listening on {socket_path}")
+
+
+def send_requests(sock: socket.socket, commands, sent: list[int]) -> None:
+    """Write one request per command, then tell the daemon nothing more is coming
+
+    The number of requests written is appended to sent when done, even if the
+    daemon went away part way through.
+    """
+    count = 0
+    try:
+        with sock.makefile("w", encoding="utf-8") as requests:
+            for request_id, command in enumerate(commands):
+                requests.write(json.dumps({"id": request_id, "input": command}) + "\n")
+                count += 1
+        sock.shutdown(socket.SHUT_WR)
+    except OSError:
+        # the replies read so far tell which requests went unanswered
+        pass
+    finally:
+        sent.append(count)
+
+
+def print_reply(reply: dict, stdout, stderr) -> bool:
+    """Print a reply's output, or its error on stderr, return True if it failed"""
+    if reply["error"] is not None:
+        stderr.write(f"{reply['error']}\n")
+        return True
+    stdout.write(f"{reply['output']}\n")
+    return False
+
+
+def run(commands, socket_path: str, stdout=None, stderr=None) -> int:
+    """Send commands to the daemon and print replies in order, return an exit status
+
+    Requests the daemon never answered are reported on stderr and fail the run.
+    """
+    stdout = stdout or sys.stdout
+    stderr = stderr or sys.stderr
+    sock = connect_or_start(socket_path)
+    sent = []
+    # send from a thread so a long stdin can't deadlock against unread replies
+    sender = threading.Thread(target=send_requests, args=(sock, commands, sent), daemon=True)
+    sender.start()
+
+    status = 0
+    # replies to long commands can overtake earlier ones, print them in request order
+    waiting = {}
+    next_id = 0
+    with sock, sock.makefile("r", encoding="utf-8") as replies:
+        for line in replies:
+            reply = json.loads(line)
+            waiting[reply["id"]] = reply
+            while next_id in waiting:
+                if print_reply(waiting.pop(next_id), stdout, stderr):
+                    status = 1
+                next_id += 1
+    sender.join()
+
+    # the connection closed, print what arrived after a gap and report the gaps
+    missing = []
+    for request_id in range(next_id, sent[0]):
+        if request_id not in waiting:
+            missing.append(request_id)
+        elif print_reply(waiting.pop(request_id), stdout, stderr):
+            status = 1
+    if missing:
+        status = 1
+        stderr.write(f"calc: no reply to {len(missing)} requests, ids "
+                     f"{', '.join(map(str, missing))}\n")
+    stdout.flush()
+    return status
+
+
+def main(argv: list[str] | None = None) -> int:
+    """Entry point: forward argv, or stdin lines, to the daemon"""
+    argv = sys.argv[1:] if argv is None else argv
+    if argv:
+        commands = [" ".join(argv)]
+    else:
+        commands = (line.strip() for line in sys.stdin if line.strip())
+    try:
+        return run(commands, default_socket_path())
+    except (ConnectionError, OSError) as exc:
+        sys.stderr.write(f"calc: {exc}\n")
+        return 2
+
+
+if __name__ == "__main__":
+    sys.exit(main())
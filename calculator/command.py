@@ -3,13 +3,29 @@
 Plugins are used to implement commands in the command pattern design of the REPL.
 """
 
+import math
+import logging
 from abc import ABC, abstractmethod
+from collections.abc import Iterable, Iterator
+from decimal import Decimal, InvalidOperation
+from calculator import float_backend, operand_stream
 from calculator.command_input import CommandInput
 from calculator.command_output import CommandOutput
 
 
 class Command(ABC):
     """Plugin astract base class"""
+    # literal command strings this plugin answers to, used by the Invoker to
+    # dispatch without running in_scope - leave empty to only use in_scope
+    ALIASES: tuple[str, ...] = ()
+    # names of shared services (e.g. "history") the Invoker passes to the
+    # constructor as keyword arguments
+    SERVICES: tuple[str, ...] = ()
+    # the output depends on nothing but the arguments, so the Invoker may
+    # memoize it, and for COMMUTATIVE plugins exact results don't depend on their order
+    PURE: bool = False
+    COMMUTATIVE: bool = False
+
     @classmethod
     @abstractmethod
     def in_scope(cls, cmd: CommandInput) -> bool:
@@ -26,3 +42,146 @@ class Command(ABC):
     def execute(self) -> CommandOutput:
         """Executes the functionality of this command"""
         raise NotImplementedError("execute must be implemented by subclass")
+
+
+class OperandCommand(Command):
+    """Plugin base class for commands that reduce a list of Decimal operands
+
+    Arguments are converted once and the typed operands are kept on the command,
+    so validate() and execute() share the same parse. Large operand lists can be
+    reduced in float64 instead when the float backend is selected. Commands with
+    @file or @- arguments stream their operands into reduce() instead, see
+    calculator.operand_stream.
+    """
+    # fewest operands the command accepts
+    MIN_OPERANDS = 2
+    # plugin specific errors raised for too few or unconvertable arguments
+    MISSING_ARGUMENTS_ERROR: type[Exception] = ValueError
+    INVALID_ARGUMENTS_ERROR: type[Exception] = ValueError
+
+    def __init__(self, cmd: CommandInput) -> None:
+        self.cmd = cmd
+        self._operands = None
+        self._float_operands = None
+        self._float_checked = False
+        self._streaming = None
+
+
+    @property
+    def streaming(self) -> bool:
+        """True if operands are read from files or stdin"""
+        if self._streaming is None:
+            self._streaming = operand_stream.has_sources(self.cmd.arguments)
+        return self._streaming
+
+
+    @property
+    def operands(self) -> list[Decimal]:
+        """Arguments as Decimals, parsed on first access"""
+        if self._operands is None:
+            self._operands = self.parse_operands()
+        return self._operands
+
+
+    @property
+    def float_operands(self):
+        """Arguments as a float64 array if the float backend applies to them, else None"""
+        if not self._float_checked and not self.streaming:
+            self._float_checked = True
+            num_args = len(self.cmd.args)
+            if num_args >= self.MIN_OPERANDS and float_backend.enabled(num_args):
+                self._float_operands = float_backend.parse_operands(list(self.cmd.args.values()))
+        return self._float_operands
+
+
+    def parse_operands(self) -> list[Decimal]:
+        """Convert every argument to Decimal, raising the plugin's errors if any fail"""
+        if len(self.cmd.args) < self.MIN_OPERANDS:
+            raise self.MISSING_ARGUMENTS_ERROR()
+
+        operands = []
+        bad_args = []
+        for arg_value in self.cmd.args.values():
+            try:
+                operands.append(Decimal(arg_value))
+            except (InvalidOperation, ValueError):
+                bad_args.append(arg_value)
+
+        if len(bad_args) > 0:
+            raise self.INVALID_ARGUMENTS_ERROR(bad_args)
+        return operands
+
+
+    def stream_operands(self) -> Iterator[Decimal]:
+        """Operands parsed lazily from the arguments and the sources they name
+
+        Operands are parsed and checked a chunk at a time. Bad tokens are raised
+        together with their line numbers once every source is read, or at the first
+        one in strict mode.
+        """
+        strict = operand_stream.strict()
+        bad_tokens = operand_stream.BadTokens()
+        num_operands = 0
+        chunk = []
+        try:
+            for token, location in operand_stream.tokens(self.cmd.arguments):
+                try:
+                    chunk.append(Decimal(token))
+                except (InvalidOperation, ValueError):
+                    bad_tokens.add(token, location)
+                    if strict:
+                        break
+                if len(chunk) == operand_stream.CHUNK_OPERANDS:
+                    num_operands += len(chunk)
+                    # nothing more is reduced once the result is known to be an error
+                    if not bad_tokens:
+                        self.check_operands(chunk)
+                        yield from chunk
+                    chunk = []
+        except OSError as exc:
+            raise self.INVALID_ARGUMENTS_ERROR([f"@{exc.filename} ({exc.strerror})"]) from exc
+
+        if bad_tokens:
+            raise self.INVALID_ARGUMENTS_ERROR(bad_tokens.values())
+        if num_operands + len(chunk) < self.MIN_OPERANDS:
+            raise self.MISSING_ARGUMENTS_ERROR()
+        self.check_operands(chunk)
+        yield from chunk
+
+
+    def check_operands(self, operands) -> None:
+        """Plugin specific checks on parsed operands (Decimals or a float64 array)"""
+        pass
+
+
+    def validate(self) -> None:
+        """Verify arguments are valid decimals - LBYL"""
+        if self.streaming:
+            # a stream can only be read once, its operands are checked as they're reduced
+            return
+        values = self.float_operands
+        self.check_operands(self.operands if values is None else values)
+
+
+    @abstractmethod
+    def reduce(self, operands: Iterable[Decimal]) -> Decimal:
+        """Combine the Decimal operands, a list or a stream, into the command's result"""
+        raise NotImplementedError("reduce must be implemented by subclass")
+
+
+    def reduce_float(self, values) -> float | None:  # pylint: disable=unused-argument
+        """Combine a float64 array of operands, None to fall back to reduce()"""
+        return None
+
+
+    def execute(self) -> CommandOutput:
+        """Reduce the operands, return CommandOutput with the result"""
+        if self.streaming:
+            return CommandOutput(str(self.reduce(self.stream_operands())))
+        values = self.float_operands
+        if values is not None:
+            result = self.reduce_float(values)  # pylint: disable=assignment-from-none
+            if result is not None and math.isfinite(result):
+                return CommandOutput(float_backend.format_result(result))
+            logging.info("Float result out of range, falling back to Decimal")
+        return CommandOutput(str(self.reduce(self.operands)))
@@ -1,17 +1,69 @@
-"""Module for generating command input objects from string input."""
+"""Module for generating command input objects from string input.
 
+Arguments are kept in one tuple in input order and the time a command was entered
+as two nanosecond ints, a monotonic stamp for durations and a wall clock one for
+history, so a command with a million arguments costs one tuple rather than a dict
+with a generated key per argument. The "argument_N" dict
+older plugins expect is available as a read-only view over the tuple.
+"""
+
+import re
+import time
 import datetime
 import logging
+from collections.abc import Iterator, Mapping
+
+
+ARGUMENT_KEY = re.compile(r"argument_([1-9][0-9]*)")
+
+
+class ArgumentsView(Mapping):
+    """Read-only {"argument_1": .., "argument_N": ..} view of an argument tuple"""
+    __slots__ = ("_values",)
+
+    def __init__(self, values: tuple[str, ...]) -> None:
+        self._values = values
+
+
+    def __getitem__(self, key: str) -> str:
+        match = ARGUMENT_KEY.fullmatch(key) if isinstance(key, str) else None
+        if match is None or int(match.group(1)) > len(self._values):
+            raise KeyError(key)
+        return self._values[int(match.group(1)) - 1]
+
+
+    def __iter__(self) -> Iterator[str]:
+        return (f"argument_{i}" for i in range(1, len(self._values) + 1))
+
+
+    def __len__(self) -> int:
+        return len(self._values)
+
+
+    def values(self) -> tuple[str, ...]:
+        """Arguments in input order, without building any keys"""
+        return self._values
+
+
+    def __repr__(self) -> str:
+        return f"ArgumentsView({self._values!r})"
 
 
 class CommandInput():
     """Stores and parses an input string as a command input object"""
+    __slots__ = ("input_string", "command", "arguments", "timestamp_ns", "wall_ns", "parse_ns")
+
     def __init__(self, input_string: str) -> None:
         """Initializes a command input object by parsing an input string"""
         self.input_string = input_string
+        # monotonic for measuring, wall clock for dating, the two drift apart
+        self.timestamp_ns = time.monotonic_ns()
+        self.wall_ns = time.time_ns()
+        start_ns = time.perf_counter_ns()
         self.parse_input()
-        self.time = datetime.datetime.now()
-        logging.debug(f"CommandInput received: {self.__dict__}")
+        # parse phase timing, picked up by the Invoker's stats
+        self.parse_ns = time.perf_counter_ns() - start_ns
+        logging.debug("CommandInput received: %s", self)
 
 
     @staticmethod
@@ -21,11 +73,38 @@ class CommandInput():
 
 
     def parse_input(self) -> None:
-        """Parses input string into a command and a dict of arguments"""
-        tokens = self.get_token(self.input_string)
-        self.command = next(tokens)
-        self.num_args = 0
-        self.args = {}
-        for arg in tokens:
-            self.num_args += 1
-            self.args[f"argument_{self.num_args}"] = arg
+        """Parses input string into a command and a tuple of arguments"""
+        tokens = self.input_string.split()
+        if not tokens:
+            raise StopIteration
+        self.command = tokens[0]
+        self.arguments = tuple(tokens[1:])
+
+
+    @property
+    def num_args(self) -> int:
+        """Number of arguments after the command"""
+        return len(self.arguments)
+
+
+    @property
+    def args(self) -> ArgumentsView:
+        """Arguments as a read-only mapping keyed "argument_1".."argument_N\""""
+        return ArgumentsView(self.arguments)
+
+
+    @args.setter
+    def args(self, args: Mapping[str, str]) -> None:
+        # only the order of the values is kept, they are renumbered from argument_1
+        self.arguments = tuple(args.values())
+
+
+    @property
+    def time(self) -> datetime.datetime:
+        """Local time the command was entered"""
+        return datetime.datetime.fromtimestamp(self.wall_ns / 1e9)
+
+
+    def __repr__(self) -> str:
+        return (f"CommandInput(command={self.command!r}, num_args={self.num_args},"
+                f" parse_ns={self.parse_ns})")
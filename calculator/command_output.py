@@ -2,21 +2,53 @@
 
 import datetime
 import logging
+from collections.abc import Iterable, Iterator
 from typing import Any
 
 
+class StreamedOutput():
+    """Output produced a line at a time, so the first lines print before the rest exist"""
+    __slots__ = ("_lines", "_text", "count")
+
+    def __init__(self, lines: Iterable[str]) -> None:
+        self._lines = iter(lines)
+        self._text = None
+        # lines handed out so far
+        self.count = 0
+
+
+    def __iter__(self) -> Iterator[str]:
+        for line in self._lines:
+            self.count += 1
+            yield line
+
+
+    def __str__(self) -> str:
+        # once printed line by line the lines are gone, only their number is left
+        if self._text is None:
+            self._text = f"({self.count} lines)" if self.count else "\n".join(self)
+        return self._text
+
+
 class CommandOutput():
     """Stores output from a command"""
     def __init__(self, output: Any) -> None:
         self.output = output
         self.time = datetime.datetime.now()
-        logging.debug(f"CommandOutput recieved: {self.__dict__}")
+        logging.debug("CommandOutput recieved: %s", self.__dict__)
 
 
     def __str__(self) -> str:
         return str(self.output)
 
 
+    def lines(self) -> Iterable[str]:
+        """Output to print, produced a line at a time if it is streamed"""
+        if isinstance(self.output, StreamedOutput):
+            return self.output
+        return (str(self.output),)
+
+
     def get_stats(self) -> str:
         """Show stats about the command execution"""
         return f"Command finished at {self.time} with result {self.output}"
@@ -5,54 +5,51 @@ Uses decimal data type.
 
 import re
 import logging
-from decimal import Decimal, InvalidOperation
-from calculator.command import Command
+from collections.abc import Iterable
+from decimal import Decimal
+from calculator import float_backend
+from calculator.command import OperandCommand
 from calculator.command_input import CommandInput
-from calculator.command_output import CommandOutput
 from calculator.commands.add.exceptions import InvalidAdditionArguments, MissingAdditionArguments
 
 
-class Add(Command):
+class Add(OperandCommand):
     """Add the arguments together"""
     # command string regex this plugin will be responsible for
     # ignore leading whitespace, make it case insensitive
     COMMAND_PATTERN = re.compile(r"^\s*(add|plus|\+|addition|addn|a)$", re.IGNORECASE)
+    # literal aliases matched by COMMAND_PATTERN, used for indexed dispatch
+    ALIASES = ("add", "plus", "+", "addition", "addn", "a")
+    # results are memoized by the Invoker, with the arguments in any order
+    PURE = True
+    COMMUTATIVE = True
+    MISSING_ARGUMENTS_ERROR = MissingAdditionArguments
+    INVALID_ARGUMENTS_ERROR = InvalidAdditionArguments
 
     def __init__(self, cmd: CommandInput) -> None:
-        self.cmd = cmd
+        super().__init__(cmd)
         logging.debug("Add plugin object initialized")
 
 
     @classmethod
     def in_scope(cls, cmd: CommandInput) -> bool:
         """Return T/F if the command is in this plugin's scope"""
-        logging.debug(f"Add plugin scope check for {cmd.command}")
+        logging.debug("Add plugin scope check for %s", cmd.command)
         return bool(cls.COMMAND_PATTERN.match(cmd.command))
 
 
-    def validate(self) -> None:
-        """Verify arguments are valid decimals - LBYL"""
-        if len(self.cmd.args.keys()) < 2:
-            raise MissingAdditionArguments
-
-        bad_args = []
-        for arg_value in self.cmd.args.values():
-            try:
-                Decimal(arg_value)
-            except (InvalidOperation, ValueError):
-                bad_args.append(arg_value)
-
-        if len(bad_args) > 0:
-            raise InvalidAdditionArguments(bad_args)
+    def reduce(self, operands: Iterable[Decimal]) -> Decimal:
+        """Add arguments together, return the sum"""
+        logging.debug("Adding %s", self.cmd.args.values())
 
+        out_sum = Decimal(0)
+        for operand in operands:
+            out_sum += operand
 
-    def execute(self) -> CommandOutput:
-        """Add arguments together, return CommandOutput with sum"""
-        logging.debug(f"Adding {self.cmd.args.values()}")
+        logging.debug("Returning sum %s", out_sum)
+        return out_sum
 
-        out_sum = Decimal(0)
-        for i in range(1, self.cmd.num_args + 1):
-            out_sum += Decimal(self.cmd.args[f"argument_{i}"])
 
-        logging.debug(f"Returning sum {out_sum}")
-        return CommandOutput(str(out_sum))
+    def reduce_float(self, values) -> float:
+        """Add a float64 array of arguments, correctly rounded"""
+        return float_backend.total(values)
@@ -0,0 +1,46 @@
+"""Module for command to show the result cache counters"""
+
+import re
+import logging
+from calculator.command import Command
+from calculator.command_input import CommandInput
+from calculator.command_output import CommandOutput
+from calculator.result_cache import ResultCache
+from calculator.commands.cache.exceptions import InvalidCacheArguments
+
+
+class CacheCommand(Command):
+    """Prints result cache hits, misses and evictions"""
+    # command string regex this plugin will be responsible for
+    # ignore leading whitespace, make it case insensitive
+    COMMAND_PATTERN = re.compile(r"^\s*cache\s*$", re.IGNORECASE)
+    # literal aliases matched by COMMAND_PATTERN, used for indexed dispatch
+    ALIASES = ("cache",)
+    SERVICES = ("result_cache",)
+
+    def __init__(self, cmd: CommandInput, result_cache: ResultCache | None = None) -> None:
+        self.cmd = cmd
+        self.result_cache = result_cache if result_cache is not None else ResultCache()
+        logging.debug("Cache plugin object initialized")
+
+
+    @classmethod
+    def in_scope(cls, cmd: CommandInput) -> bool:
+        """Return T/F if the command is in this plugin's scope"""
+        logging.debug("Cache scope check for %s", cmd.command)
+        return bool(cls.COMMAND_PATTERN.match(cmd.command))
+
+
+    def validate(self) -> None:
+        """Verify there are no arguments, or just clear - LBYL"""
+        args = list(self.cmd.args.values())
+        if args and args != ["clear"]:
+            raise InvalidCacheArguments
+
+
+    def execute(self) -> CommandOutput:
+        """Print the cache counters, or empty the cache with cache clear"""
+        if list(self.cmd.args.values()) == ["clear"]:
+            self.result_cache.clear()
+            return CommandOutput("Result cache cleared")
+        return CommandOutput(self.result_cache.report())
@@ -0,0 +1,9 @@
+"""Module for cache plugin command exceptions"""
+
+from calculator.exceptions import CLIError
+
+
+class InvalidCacheArguments(CLIError):
+    """Error to raise when cache gets wrong args"""
+    def __init__(self) -> None:
+        super().__init__("cache takes no arguments, or clear")
@@ -5,10 +5,11 @@ Uses decimal data type.
 
 import re
 import logging
-from decimal import Decimal, InvalidOperation
-from calculator.command import Command
+from collections.abc import Iterable
+from decimal import Decimal
+from calculator import float_backend
+from calculator.command import OperandCommand
 from calculator.command_input import CommandInput
-from calculator.command_output import CommandOutput
 from calculator.commands.divide.exceptions import (
     InvalidDivisionArguments,
     MissingDivisionArguments,
@@ -16,48 +17,53 @@ from calculator.commands.divide.exceptions import (
 )
 
 
-class Divide(Command):
+class Divide(OperandCommand):
     """Divide the arguments together"""
     # command string regex this plugin will be responsible for
     # ignore leading whitespace, make it case insensitive
     COMMAND_PATTERN = re.compile(r"^\s*(divide|over|\%|division|div|d)$", re.IGNORECASE)
+    # literal aliases matched by COMMAND_PATTERN, used for indexed dispatch
+    ALIASES = ("divide", "over", "%", "division", "div", "d")
+    # results are memoized by the Invoker
+    PURE = True
+    MISSING_ARGUMENTS_ERROR = MissingDivisionArguments
+    INVALID_ARGUMENTS_ERROR = InvalidDivisionArguments
 
     def __init__(self, cmd: CommandInput) -> None:
-        self.cmd = cmd
+        super().__init__(cmd)
         logging.debug("Divide plugin object initialized")
 
 
     @classmethod
     def in_scope(cls, cmd: CommandInput) -> bool:
         """Return T/F if the command is in this plugin's scope"""
-        logging.debug(f"Divide plugin scope check for {cmd.command}")
+        logging.debug("Divide plugin scope check for %s", cmd.command)
         return bool(cls.COMMAND_PATTERN.match(cmd.command))
 
 
-    def validate(self) -> None:
-        """Verify arguments are valid decimals - LBYL"""
-        if len(self.cmd.args.keys()) < 2:
-            raise MissingDivisionArguments
+    def check_operands(self, operands) -> None:
+        """Verify no operand is zero - LBYL"""
+        if not all(operands):
+            raise DivisionZeroArgument
 
-        bad_args = []
-        for arg_value in self.cmd.args.values():
-            try:
-                if(Decimal(arg_value)) == 0:
-                    raise DivisionZeroArgument
-            except (InvalidOperation, ValueError):
-                bad_args.append(arg_value)
 
-        if len(bad_args) > 0:
-            raise InvalidDivisionArguments(bad_args)
+    def reduce(self, operands: Iterable[Decimal]) -> Decimal:
+        """Divide arguments together, return the quotient"""
+        logging.debug("Dividing %s", self.cmd.args.values())
 
+        operands = iter(operands)
+        out_quotient = next(operands)
+        for operand in operands:
+            out_quotient /= operand
 
-    def execute(self) -> CommandOutput:
-        """Divide arguments together, return CommandOutput with quotient"""
-        logging.debug(f"Dividing {self.cmd.args.values()}")
+        logging.debug("Returning sum %s", out_quotient)
+        return out_quotient
 
-        out_quotient = Decimal(self.cmd.args["argument_1"])
-        for i in range(2, self.cmd.num_args + 1):
-            out_quotient /= Decimal(self.cmd.args[f"argument_{i}"])
 
-        logging.debug(f"Returning sum {out_quotient}")
-        return CommandOutput(str(out_quotient))
+    def reduce_float(self, values) -> float | None:
+        """Divide a float64 array of arguments, None if the quotient underflowed"""
+        divisor = float_backend.product(values[1:])
+        if divisor == 0:
+            return None
+        out_quotient = float(values[0]) / divisor
+        return out_quotient if out_quotient != 0 else None
@@ -0,0 +1,171 @@
+"""Module turning infix expressions into reusable Decimal evaluators.
+
+An expression goes through a single pass lexer, then a Pratt parser that builds
+the tree and folds every operation whose operands are already known, then gets
+compiled into nested closures. compile_expression keeps the newest evaluators in an
+LRU cache keyed on the whitespace-normalized text, so evaluating the same formula
+again skips all of that.
+
+Operators, loosest first: + -, then * / // %, then unary + -, then ** (right
+associative, so -2 ** 2 is -4 like in Python). Arithmetic is Decimal's, so //
+truncates towards 0 and % takes the sign of the dividend.
+"""
+
+import re
+import operator
+import functools
+from decimal import Decimal
+from collections.abc import Callable
+from calculator.commands.expression.exceptions import InvalidExpression
+
+
+# evaluators kept by compile_expression
+CACHE_SIZE = 1024
+TOKEN_PATTERN = re.compile(
+    r"\s*(?:(?P<number>(?:\d+\.?\d*|\.\d+)(?:[eE][+-]?\d+)?)|(?P<operator>\*\*|//|[-+*/%()]))"
+)
+BINARY_OPERATORS = {
+    "+": operator.add,
+    "-": operator.sub,
+    "*": operator.mul,
+    "/": operator.truediv,
+    "//": operator.floordiv,
+    "%": operator.mod,
+    "**": operator.pow
+}
+UNARY_OPERATORS = {"-": operator.neg, "+": operator.pos}
+# how tightly each binary operator holds its left operand
+BINDING_POWER = {"+": 10, "-": 10, "*": 20, "/": 20, "//": 20, "%": 20, "**": 40}
+UNARY_BINDING_POWER = 30
+RIGHT_ASSOCIATIVE = {"**"}
+
+
+def tokenize(text: str) -> list[tuple[str, str, int]]:
+    """Split an expression into (kind, text, position) tokens in one pass"""
+    tokens = []
+    position = 0
+    end = len(text.rstrip())
+    while position < end:
+        match = TOKEN_PATTERN.match(text, position)
+        if match is None:
+            start = len(text) - len(text[position:].lstrip())
+            raise InvalidExpression(f"unexpected {text[start]!r}", start)
+        kind = match.lastgroup
+        tokens.append((kind, match.group(kind), match.start(kind)))
+        position = match.end()
+    tokens.append(("end", "", end))
+    return tokens
+
+
+def fold(function: Callable, *operands):
+    """Apply an operator now if every operand is a constant, else leave a tree node
+
+    Operations that fail, like dividing by 0, are left in the tree so the error is
+    raised when the expression is evaluated.
+    """
+    if all(isinstance(operand, Decimal) for operand in operands):
+        try:
+            return function(*operands)
+        except ArithmeticError:
+            pass
+    return (function, *operands)
+
+
+class Parser():
+    """Pratt parser building a constant folded tree from tokens"""
+    __slots__ = ("tokens", "index")
+
+    def __init__(self, tokens: list[tuple[str, str, int]]) -> None:
+        self.tokens = tokens
+        self.index = 0
+
+
+    def peek(self) -> tuple[str, str, int]:
+        """Next token without consuming it"""
+        return self.tokens[self.index]
+
+
+    def advance(self) -> tuple[str, str, int]:
+        """Consume the next token"""
+        token = self.tokens[self.index]
+        if token[0] != "end":
+            self.index += 1
+        return token
+
+
+    def parse(self):
+        """Parse the whole expression"""
+        node = self.expression(0)
+        kind, text, position = self.peek()
+        if kind != "end":
+            raise InvalidExpression(f"unexpected {text!r}", position)
+        return node
+
+
+    def expression(self, right_binding_power: int):
+        """Parse operators binding tighter than right_binding_power"""
+        node = self.prefix(self.advance())
+        while True:
+            kind, text, _ = self.peek()
+            binding_power = BINDING_POWER.get(text, 0) if kind == "operator" else 0
+            if binding_power <= right_binding_power:
+                return node
+            self.advance()
+            # right associative operators accept their own kind on the right
+            if text in RIGHT_ASSOCIATIVE:
+                binding_power -= 1
+            node = fold(BINARY_OPERATORS[text], node, self.expression(binding_power))
+
+
+    def prefix(self, token: tuple[str, str, int]):
+        """Parse a number, a parenthesized expression or a unary operator"""
+        kind, text, position = token
+        if kind == "number":
+            return Decimal(text)
+        if text == "(":
+            node = self.expression(0)
+            kind, text, position = self.advance()
+            if text != ")":
+                raise InvalidExpression("missing ')'", position)
+            return node
+        if text in UNARY_OPERATORS:
+            return fold(UNARY_OPERATORS[text], self.expression(UNARY_BINDING_POWER))
+        if kind == "end":
+            raise InvalidExpression("expression ended early", position)
+        raise InvalidExpression(f"unexpected {text!r}", position)
+
+
+def compile_node(node) -> Callable[[], Decimal]:
+    """Turn a folded tree into nested closures"""
+    if isinstance(node, Decimal):
+        return lambda: node
+    function, *operands = node
+    if len(operands) == 1:
+        operand = compile_node(operands[0])
+        return lambda: function(operand())
+    left, right = compile_node(operands[0]), compile_node(operands[1])
+    return lambda: function(left(), right())
+
+
+@functools.lru_cache(maxsize=CACHE_SIZE)
+def _compile_normalized(text: str) -> Callable[[], Decimal]:
+    """Compile an expression whose whitespace is already normalized"""
+    try:
+        return compile_node(Parser(tokenize(text)).parse())
+    except RecursionError as exc:
+        raise InvalidExpression("nested too deeply", 0) from exc
+
+
+def normalize(text: str) -> str:
+    """Cache key for an expression, runs of whitespace collapsed to one space"""
+    return " ".join(text.split())
+
+
+def compile_expression(text: str) -> Callable[[], Decimal]:
+    """Evaluator for an expression, InvalidExpression if it doesn't parse"""
+    return _compile_normalized(normalize(text))
+
+
+def cache_info() -> tuple:
+    """Hits, misses and size of the evaluator cache"""
+    return _compile_normalized.cache_info()
@@ -0,0 +1,26 @@
+"""Module for expression plugin command exceptions"""
+
+from calculator.exceptions import CLIError
+
+
+class MissingExpression(CLIError):
+    """Error to raise when eval is given nothing to evaluate"""
+    def __init__(self) -> None:
+        error_msg = "eval requires an expression, e.g. eval (3.5 + 4) * 2"
+        super().__init__(error_msg)
+
+
+class InvalidExpression(CLIError):
+    """Error to raise when an expression can't be tokenized or parsed"""
+    def __init__(self, reason: str, position: int) -> None:
+        error_msg = f"Invalid expression at character {position + 1}: {reason}"
+        super().__init__(error_msg)
+        self.position = position
+
+
+class ExpressionArithmeticError(CLIError):
+    """Error to raise when evaluating an expression fails, e.g. dividing by 0"""
+    def __init__(self, error: ArithmeticError) -> None:
+        reason = "division by 0" if isinstance(error, ZeroDivisionError) else type(error).__name__
+        error_msg = f"Expression can't be evaluated: {reason}"
+        super().__init__(error_msg)
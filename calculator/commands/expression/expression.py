@@ -0,0 +1,66 @@
+"""Plugin for the eval command - evaluates an infix expression like (3.5 + 4) * 2 / 7 - 1.
+
+Uses decimal data type. Expressions are compiled once and the evaluator is cached,
+see calculator.commands.expression.compiler.
+"""
+
+import re
+import logging
+from collections.abc import Callable
+from decimal import Decimal
+from calculator.command import Command
+from calculator.command_input import CommandInput
+from calculator.command_output import CommandOutput
+from calculator.commands.expression.compiler import compile_expression
+from calculator.commands.expression.exceptions import (
+    ExpressionArithmeticError,
+    MissingExpression
+)
+
+
+class Expression(Command):
+    """Evaluate an infix arithmetic expression"""
+    # command string regex this plugin will be responsible for
+    # ignore leading whitespace, make it case insensitive
+    COMMAND_PATTERN = re.compile(r"^\s*(eval|expr|expression|=)$", re.IGNORECASE)
+    # literal aliases matched by COMMAND_PATTERN, used for indexed dispatch
+    ALIASES = ("eval", "expr", "expression", "=")
+    # results are memoized by the Invoker
+    PURE = True
+
+    def __init__(self, cmd: CommandInput) -> None:
+        self.cmd = cmd
+        self._evaluator = None
+        logging.debug("Expression plugin object initialized")
+
+
+    @classmethod
+    def in_scope(cls, cmd: CommandInput) -> bool:
+        """Return T/F if the command is in this plugin's scope"""
+        logging.debug("Expression plugin scope check for %s", cmd.command)
+        return bool(cls.COMMAND_PATTERN.match(cmd.command))
+
+
+    @property
+    def evaluator(self) -> Callable[[], Decimal]:
+        """Compiled expression, from the cache if it was seen before"""
+        if self._evaluator is None:
+            if len(self.cmd.args) == 0:
+                raise MissingExpression
+            self._evaluator = compile_expression(" ".join(self.cmd.args.values()))
+        return self._evaluator
+
+
+    def validate(self) -> None:
+        """Verify the expression parses - LBYL"""
+        _ = self.evaluator
+
+
+    def execute(self) -> CommandOutput:
+        """Evaluate the expression, return CommandOutput with the result"""
+        try:
+            result = self.evaluator()
+        except ArithmeticError as exc:
+            raise ExpressionArithmeticError(exc) from exc
+        logging.debug("Returning result %s", result)
+        return CommandOutput(str(result))
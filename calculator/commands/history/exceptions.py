@@ -11,8 +11,10 @@ class HistoryOverflow(CLIError):
 
 class InvalidHistoryPrintArguments(CLIError):
     """Error to raise when history print gets wrong args"""
-    def __init__(self) -> None:
-        super().__init__("history print takes no arguments")
+    def __init__(self, reason: str = "unexpected argument") -> None:
+        super().__init__(f"Invalid history arguments ({reason}), history takes --limit N,"
+                         " --offset N, --tail N, --command NAME, --since TIME, --until TIME"
+                         " and --archived")
 
 
 class InvalidHistoryClearArguments(CLIError):
@@ -23,11 +25,18 @@ class InvalidHistoryClearArguments(CLIError):
 
 class InvalidHistoryDeleteArguments(CLIError):
     """Error to raise when history delete gets wrong args"""
-    def __init__(self) -> None:
-        super().__init__("history delete takes 1 argument (index)")
+    def __init__(self, reason: str = "nothing to delete") -> None:
+        super().__init__(f"Invalid delete arguments ({reason}), delete takes indices like"
+                         " 3, 3,7,9 or 10-500, --id IDS and --command NAME")
 
 
 class InvalidHistoryDeleteIndex(CLIError):
     """Erorr to raise when delete index is out of bounds"""
     def __init__(self) -> None:
         super().__init__("Deletion index must be between 0 and len(history) - 1")
+
+
+class InvalidHistoryDeleteId(CLIError):
+    """Error to raise when no retained record has an ID given to delete"""
+    def __init__(self, record_id: int) -> None:
+        super().__init__(f"No retained history record has ID {record_id}")
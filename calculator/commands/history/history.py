@@ -1,37 +1,73 @@
 """Module for maintaining a command line interface's history"""
 
 import os
+import atexit
 import logging
-from functools import wraps
-import pandas as pd
+import weakref
+from collections.abc import Iterable
 from calculator.command_input import CommandInput
 from calculator.command_output import CommandOutput
-from calculator.commands.history.exceptions import HistoryOverflow
+from calculator.commands.history import history_archive, history_log
+from calculator.commands.history.history_ring import HistoryRing
 
 
 HISTORY_SIZE = 5
 HISTORY_COLUMNS = "command,input,output,start_time,end_time"
+# live History objects, so readers of the log can flush what they have buffered
+_open_histories = weakref.WeakSet()
+
+
+def flush_all() -> None:
+    """Write out records buffered by any History in this process"""
+    for history in list(_open_histories):
+        try:
+            history.writer.flush()
+        except OSError:
+            logging.error(f"Failed to write history to {history.history_file}", exc_info=True)
+
+
+# buffered records must not be lost when the interpreter exits
+atexit.register(flush_all)
+
+
+def history_size() -> int:
+    """Number of records retained in history"""
+    return int(os.getenv("HISTORY_SIZE", str(HISTORY_SIZE)))
+
+
+def read_history(history_file: str, size: int | None = None):
+    """Read the retained records from the history log as a DataFrame indexed by sequence number"""
+    if size is None:
+        size = history_size()
+    flush_all()
+    store = history_log.open_store(history_file)
+    try:
+        return store.read_frame(size)
+    finally:
+        store.close()
 
 
 class History():
-    """List of command executions and arguments"""
+    """List of command executions and arguments
+
+    One History is shared by the CLI and the history plugins (the Invoker hands it
+    to plugins that list it in SERVICES), so it owns both the in-memory records and
+    everything written to the log.
+    """
     def __init__(self) -> None:
         self.history_file = os.getenv("HISTORY_FILE")
+        # number of records retained, older ones are overwritten
+        self.size = history_size()
+        self.store = history_log.open_store(self.history_file,
+                                            history_archive.open_archive(self.history_file))
+        self.writer = None
+        # IDs reserved for this History's records, _next_id is the next unused one
+        self._next_id = self._ids_end = 0
         self.load_history()
+        _open_histories.add(self)
         logging.debug(f"History initialized using {self.history_file}")
 
 
-    @staticmethod
-    def autosave(method):
-        """Decorator to automatically save history after modifying it"""
-        @wraps(method)
-        def wrapper(self, *args, **kwargs):
-            result = method(self, *args, **kwargs)
-            self.save_history()
-            return result
-        return wrapper
-
-
     @staticmethod
     def form_history_record(cmd_in: CommandInput, cmd_out: CommandOutput) -> dict:
         """Format command input/output pair into a record for a dataframe"""
@@ -46,86 +82,176 @@ class History():
         return record
 
 
-    def add_row(self, row: dict) -> None:
-        """Append a row to a dataframe"""
-        logging.debug(f"Adding row to history: {row}")
+    @property
+    def history(self):
+        """Retained records as a pandas DataFrame, oldest first, built on demand"""
+        return self.ring.to_frame()
+
 
-        if len(self.history) < HISTORY_SIZE:
-            new_row_df = pd.DataFrame([row])
-            new_row_df.index = [self.history.index.max() + 1 if not self.history.empty else 0]
-            if self.history.empty:
-                self.history = new_row_df
-            else:
-                self.history = pd.concat([self.history, new_row_df])
-        else:
-            logging.debug(f"Max history size ({HISTORY_SIZE}) exceeded, rolling over")
-            raise HistoryOverflow
+    @property
+    def archive(self):
+        """HistoryArchive of records that rolled out, None unless HISTORY_ARCHIVE is set"""
+        return self.store.archive
 
 
-    def overwrite_row(self, index: int, row: dict) -> None:
-        """Overwrite a row at a given index in the data frame"""
-        logging.debug(f"Overwriting row {index + 1} in history with {row}")
+    @property
+    def cur_index(self) -> int:
+        """Ring slot the next record overwrites once history is full"""
+        return self.ring.head
 
-        if index < HISTORY_SIZE:
-            # Create a single-row DataFrame with aligned columns and types
-            row_df = pd.DataFrame([row], columns=self.history.columns)
 
-            # Assign with automatic type handling
-            self.history.iloc[index] = row_df.iloc[0]
-        else:
-            raise HistoryOverflow
+    def __len__(self) -> int:
+        return len(self.ring)
 
 
-    @autosave
     def add(self, cmd_in: CommandInput, cmd_out: CommandOutput) -> None:
         """Add a new entry into history - EAFP"""
-        # history may have been altered
+        self.add_record(self.form_history_record(cmd_in, cmd_out))
+
+
+    def add_record(self, record: dict) -> None:
+        """Add an already formed record into history, overwriting the oldest once full"""
+        self.ring.push(self._next_seq(), record)
+        self.append_history(record)
+
+
+    def _next_seq(self) -> int:
+        """ID of the next record, reserving a block of IDs when the last one is used"""
+        if self._next_id >= self._ids_end:
+            self._next_id = self.store.reserve_ids(history_log.ID_BLOCK)
+            self._ids_end = self._next_id + history_log.ID_BLOCK
+        return self._next_id
+
+
+    def append_history(self, record: dict) -> None:
+        """Queue a record for the history log, written in the background"""
+        self.writer.append(history_log.format_row(self._next_seq(), record))
+        self._next_id += 1
+
+
+    @property
+    def pending(self) -> list[list]:
+        """Rows buffered but not yet written to the log"""
+        return self.writer.pending
+
+
+    def flush(self) -> None:
+        """Write buffered records to the log"""
+        self.writer.flush()
+
+
+    def close(self) -> None:
+        """Stop background writing, persist anything still buffered and hand back unused IDs"""
+        if self._next_id < self._ids_end:
+            self.store.release_ids(self._next_id, self._ids_end)
+            self._ids_end = self._next_id
+        self.writer.close()
+
+
+    def refresh(self) -> bool:
+        """Pick up changes other processes made to the log, True if there were any
+
+        When nothing else wrote to the log this costs a stat. Rows appended to a CSV
+        log are read from where this History left off; any other change reloads the
+        retained history.
+        """
+        self.writer.flush()
+        with self.writer.lock():
+            known, current = self.writer.signature, self.store.signature()
+            if current == known:
+                return False
+            rows = self.store.read_appended(known, current)  # pylint: disable=assignment-from-none
+            if rows is not None:
+                logging.debug("Reading %d history records appended to the log", len(rows))
+                self._push_rows(rows)
+                self.writer.log_rows += len(rows)
+                self.writer.signature = current
+                return True
+        logging.info(f"History log {self.history_file} changed, reloading")
         self.load_history()
-        record = self.form_history_record(cmd_in, cmd_out)
+        return True
+
+
+    def ids(self) -> list[int]:
+        """IDs (sequence numbers) of the retained records, oldest first
+
+        Unlike indices, the ID of a record doesn't change as others are deleted.
+        """
+        return [self.ring.seqs[slot] for slot in self.ring.slots()]
+
+
+    def delete_ids(self, ids: Iterable[int]) -> int:
+        """Delete retained records by ID, return how many of the IDs were retained
+
+        The records are only marked deleted, in the ring and with tombstones in the
+        log, and physically dropped when the log is next compacted.
+        """
+        wanted = set(ids)
+        slots = self.ring.find(wanted)
+        for slot in slots:
+            self.ring.delete(slot)
+        found = sorted({self.ring.seqs[slot] for slot in slots})
+        if found:
+            logging.info(f"Deleting {len(found)} history entries")
+            self.writer.delete_ids(found)
+        return len(found)
+
+
+    def clear(self) -> None:
+        """Drop every record, FileNotFoundError if there was no log to remove"""
+        self.ring.clear()
+        self.writer.discard()
         try:
-            self.add_row(record)
-        except HistoryOverflow:
-            try:
-                self.overwrite_row(self.cur_index, record)
-                self.cur_index += 1
-            except HistoryOverflow:
-                self.cur_index = 0
-                self.overwrite_row(self.cur_index, record)
+            self.store.clear()
+        finally:
+            self.writer.sync()
 
 
-    @autosave
     def create_empty_history(self) -> None:
-        """Define history data frame"""
-        self.history = pd.DataFrame({
-            "command": pd.Series(dtype="str"),
-            "input": pd.Series(dtype="str"),
-            "output": pd.Series(dtype="str"),
-            "start_time": pd.Series(dtype="datetime64[ns]"),
-            "end_time": pd.Series(dtype="datetime64[ns]")
-        })
+        """Start an empty history and log"""
+        self.ring.clear()
+        self.store.rewrite([])
 
 
     def save_history(self):
-        """Persist history data frame"""
-        logging.debug("Updating history file")
-        self.history.to_csv(self.history_file, index=True)
+        """Persist buffered records and compact the history log"""
+        self.writer.compact()
+
+
+    def _open_writer(self, log_rows: int) -> None:
+        """Set up the write-behind buffer for the history log"""
+        if self.writer is not None:
+            self.writer.close()
+        self.writer = history_log.LogWriter(self.store, self.size, log_rows)
 
 
     def load_history(self):
         """Load history from file"""
+        flush_all()
+        self.ring = HistoryRing(self.size)
         try:
             logging.debug(f"Loading history from {self.history_file}")
-            self.history = pd.read_csv(
-                self.history_file,
-                parse_dates=["start_time", "end_time"],
-                index_col=0
-            )
-
-            # Explicitly cast 'output' column to string to match expected dtype
-            self.history["output"] = self.history["output"].astype(str)
-
-            self.cur_index = len(self.history) % HISTORY_SIZE
+            rows, log_rows = self.store.read_tail(self.size)
+            self._open_writer(log_rows)
+            # only the newest records are retained, oldest first
+            self._push_rows(rows)
         except FileNotFoundError:
             logging.info(f"No history file found at {self.history_file}, starting fresh")
             self.create_empty_history()
-            self.cur_index = 0
+            self._open_writer(0)
+        self.writer.sync()
+
+
+    def _push_rows(self, rows: list[list]) -> None:
+        """Add rows read from the log to the ring, oldest first"""
+        for row in rows:
+            if history_log.is_tombstone(row):
+                for slot in self.ring.find({int(row[0])}):
+                    self.ring.delete(slot)
+                continue
+            try:
+                seq, record = history_log.parse_row(row)
+            except ValueError:
+                logging.warning(f"Skipping malformed history row {row}")
+                continue
+            self.ring.push(seq, record)
@@ -0,0 +1,221 @@
+"""Module archiving the records that roll out of the retained history.
+
+With HISTORY_ARCHIVE=gzip or lzma, records compaction drops from the log because
+they rolled out are kept in a directory next to it (HISTORY_FILE.archive) instead of
+being discarded. Deleted records are never archived. Records go to a plain CSV
+active segment, which is sealed once it holds HISTORY_SEGMENT_ROWS records: it is
+compressed into a numbered segment file, next to a small JSON summary of its time
+range, row count and command counts.
+
+Queries read only the summaries and open just the segments that can hold a match,
+so a long-lived archive doesn't slow down the log or queries for recent records.
+Sealed segments never change, and their summaries are cached by inode, mtime and
+size, dropped when the archive is cleared.
+"""
+
+import os
+import csv
+import gzip
+import lzma
+import json
+import logging
+import datetime
+from collections import Counter
+from collections.abc import Iterator
+from calculator.commands.history import history_log
+from calculator.commands.history.history_ring import datetime_to_ns
+
+
+# file extension and opener of a sealed segment for each HISTORY_ARCHIVE
+COMPRESSORS = {
+    "gzip": (".csv.gz", gzip.open),
+    "lzma": (".csv.xz", lzma.open)
+}
+DEFAULT_SEGMENT_ROWS = 4096
+ACTIVE_SEGMENT = "active.csv"
+SUMMARY_SUFFIX = ".json"
+# summaries of sealed segments by (path, inode, mtime, size)
+_summaries = {}
+
+
+def open_archive(history_file: str):
+    """Archive for a log, None unless HISTORY_ARCHIVE names a compression"""
+    compression = os.getenv("HISTORY_ARCHIVE", "")
+    if compression in ("", "0", "off"):
+        return None
+    if compression not in COMPRESSORS:
+        logging.warning(f"Unknown HISTORY_ARCHIVE {compression}, not archiving history")
+        return None
+    segment_rows = int(os.getenv("HISTORY_SEGMENT_ROWS", str(DEFAULT_SEGMENT_ROWS)))
+    return HistoryArchive(history_file, compression, segment_rows)
+
+
+def start_ns(row: list) -> int:
+    """Start time of a log row in nanoseconds, ValueError if malformed"""
+    return datetime_to_ns(datetime.datetime.fromisoformat(row[4]))
+
+
+def summarize(rows: list[list]) -> dict:
+    """Time range, row count and command counts of a segment's rows"""
+    times = [start_ns(row) for row in rows]
+    return {
+        "rows": len(rows),
+        "first_ns": min(times),
+        "last_ns": max(times),
+        "commands": dict(Counter(row[1].lower() for row in rows))
+    }
+
+
+def overlaps(summary: dict, command: str | None, since_ns: int | None,
+             until_ns: int | None) -> bool:
+    """Check if a segment can hold records matching a query"""
+    if command is not None and command not in summary["commands"]:
+        return False
+    if since_ns is not None and summary["last_ns"] < since_ns:
+        return False
+    return until_ns is None or summary["first_ns"] < until_ns
+
+
+def matches(row: list, command: str | None, since_ns: int | None,
+            until_ns: int | None) -> bool:
+    """Check if a row matches a query, like HistoryRing.select"""
+    if command is not None and row[1].lower() != command:
+        return False
+    time_ns = start_ns(row)
+    return (since_ns is None or time_ns >= since_ns) and (until_ns is None or time_ns < until_ns)
+
+
+def read_segment(path: str) -> list[list]:
+    """Rows of a segment, decompressed according to its extension"""
+    opener = open
+    for extension, compressed_opener in COMPRESSORS.values():
+        if path.endswith(extension):
+            opener = compressed_opener
+    with opener(path, "rt", newline="", encoding="utf-8") as segment:
+        reader = csv.reader(segment)
+        next(reader, None)
+        return list(reader)
+
+
+def well_formed(row: list) -> bool:
+    """Check if a row parses, malformed ones aren't archived"""
+    try:
+        history_log.parse_row(row)
+    except ValueError:
+        return False
+    return True
+
+
+class HistoryArchive():
+    """Segments of records that rolled out of the retained history"""
+    def __init__(self, history_file: str, compression: str, segment_rows: int) -> None:
+        self.directory = f"{history_file}.archive"
+        self.compression = compression
+        self.segment_rows = max(segment_rows, 1)
+        self.active_file = os.path.join(self.directory, ACTIVE_SEGMENT)
+
+
+    def add(self, rows: list[list]) -> None:
+        """Archive rows oldest first, sealing every segment that fills up"""
+        rows = [row for row in rows if well_formed(row)]
+        if not rows:
+            return
+        os.makedirs(self.directory, exist_ok=True)
+        with history_log.locked(self.active_file, exclusive=True):
+            try:
+                active = history_log.read_rows(self.active_file)
+            except FileNotFoundError:
+                active = []
+            active.extend(rows)
+            while len(active) >= self.segment_rows:
+                self._seal(active[:self.segment_rows])
+                del active[:self.segment_rows]
+            history_log.replace_rows(self.active_file, active)
+
+
+    def _seal(self, rows: list[list]) -> None:
+        """Write rows as a compressed segment and its summary, caller holds the lock"""
+        number = len(self._summary_entries()) + 1
+        extension, opener = COMPRESSORS[self.compression]
+        name = f"{number:06d}"
+        logging.debug(f"Sealing history segment {name} of {len(rows)} records")
+        segment_file = os.path.join(self.directory, name + extension)
+        tmp_file = f"{segment_file}.{os.getpid()}.tmp"
+        with opener(tmp_file, "wb") as segment:
+            segment.write(history_log.encode_rows([history_log.HISTORY_HEADER] + rows))
+        os.replace(tmp_file, segment_file)
+
+        summary = summarize(rows)
+        summary["file"] = name + extension
+        summary_file = os.path.join(self.directory, name + SUMMARY_SUFFIX)
+        tmp_file = f"{summary_file}.{os.getpid()}.tmp"
+        with open(tmp_file, "w", encoding="utf-8") as summary_out:
+            json.dump(summary, summary_out)
+        # a segment only counts once its summary is in place
+        os.replace(tmp_file, summary_file)
+
+
+    def _summary_entries(self) -> list[os.DirEntry]:
+        """Directory entries of the segment summaries, oldest first"""
+        try:
+            entries = [entry for entry in os.scandir(self.directory)
+                       if entry.name.endswith(SUMMARY_SUFFIX)]
+        except FileNotFoundError:
+            return []
+        return sorted(entries, key=lambda entry: entry.name)
+
+
+    def summaries(self) -> list[dict]:
+        """Summaries of the sealed segments, oldest first"""
+        summaries = []
+        for entry in self._summary_entries():
+            stat = entry.stat()
+            # a cleared archive's files are written again, often on the same inodes
+            key = (entry.path, stat.st_ino, stat.st_mtime_ns, stat.st_size)
+            summary = _summaries.get(key)
+            if summary is None:
+                with open(entry.path, encoding="utf-8") as summary_in:
+                    summary = _summaries[key] = json.load(summary_in)
+            summaries.append(summary)
+        return summaries
+
+
+    def select(self, command: str | None = None, since_ns: int | None = None,
+               until_ns: int | None = None, newest_first: bool = False) -> Iterator[list]:
+        """Rows of matching archived records, lazily, opening only segments that may match
+
+        Arguments are the same as HistoryRing.select.
+        """
+        if not os.path.isdir(self.directory):
+            return
+        # the active segment is read up front, it may be sealed while rows are handed out
+        with history_log.locked(self.active_file, exclusive=False):
+            segments = [os.path.join(self.directory, summary["file"])
+                        for summary in self.summaries()
+                        if overlaps(summary, command, since_ns, until_ns)]
+            try:
+                active = read_segment(self.active_file)
+            except FileNotFoundError:
+                active = []
+        sources = [*segments, None]
+        if newest_first:
+            sources.reverse()
+        for source in sources:
+            rows = active if source is None else read_segment(source)
+            for row in reversed(rows) if newest_first else rows:
+                if matches(row, command, since_ns, until_ns):
+                    yield row
+
+
+    def clear(self) -> None:
+        """Remove every archived record"""
+        if not os.path.isdir(self.directory):
+            return
+        with history_log.locked(self.active_file, exclusive=True):
+            for entry in os.scandir(self.directory):
+                # others may be waiting on the lock file
+                if not entry.name.endswith(".lock"):
+                    os.remove(entry.path)
+            prefix = os.path.join(self.directory, "")
+            for key in [key for key in _summaries if key[0].startswith(prefix)]:
+                del _summaries[key]
@@ -1,11 +1,11 @@
 """Module for command to clear history"""
 
-import os
 import re
 import logging
 from calculator.command import Command
 from calculator.command_input import CommandInput
 from calculator.command_output import CommandOutput
+from calculator.commands.history.history import History
 from calculator.commands.history.exceptions import InvalidHistoryClearArguments
 
 
@@ -14,17 +14,21 @@ class HistoryClear(Command):
     # command string regex this plugin will be responsible for
     # ignore leading whitespace, make it case insensitive
     COMMAND_PATTERN = re.compile(r"^\s*clear\s*$", re.IGNORECASE)
+    # literal aliases matched by COMMAND_PATTERN, used for indexed dispatch
+    ALIASES = ("clear",)
+    SERVICES = ("history",)
 
-    def __init__(self, cmd: CommandInput) -> None:
+    def __init__(self, cmd: CommandInput, history: History | None = None) -> None:
         self.cmd = cmd
-        self.history_file = os.getenv("HISTORY_FILE")
+        self.history = history if history is not None else History()
+        self.history_file = self.history.history_file
         logging.debug("History clear plugin object initialized")
 
 
     @classmethod
     def in_scope(cls, cmd: CommandInput) -> bool:
         """Return T/F if the command is in this plugin's scope"""
-        logging.debug(f"History clear scope check for {cmd.command}")
+        logging.debug("History clear scope check for %s", cmd.command)
         return bool(cls.COMMAND_PATTERN.match(cmd.command))
 
 
@@ -40,7 +44,7 @@ class HistoryClear(Command):
     def clear_history(self) -> None:  # pragma: no cover
         """Clear the history from storage."""
         try:
-            os.remove(self.history_file)
+            self.history.clear()
             logging.info("History file successfully removed.")
         except FileNotFoundError:
             logging.warning("History file not found during clear.")
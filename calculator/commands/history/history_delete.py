@@ -1,79 +1,111 @@
-"""Module for command to print history"""
+"""Module for command to delete records from history
+
+delete takes indices as history numbers them, singly, as lists or as ranges, and
+options selecting records by ID or command, all combined:
+delete 10-500, delete 3,7,9, delete --command divide, delete --id 17
+Everything selected is resolved to record IDs before anything is deleted, so
+deleting one record never renumbers the ones still to go.
+"""
 
-import os
 import re
 import logging
-import pandas as pd
+from collections.abc import Iterator
 from calculator.command import Command
 from calculator.command_input import CommandInput
 from calculator.command_output import CommandOutput
+from calculator.commands.history.history import History
 from calculator.commands.history.exceptions import (
     InvalidHistoryDeleteArguments,
+    InvalidHistoryDeleteId,
     InvalidHistoryDeleteIndex
 )
 
 
+OPTIONS = ("--id", "--command")
+
+
+def parse_ranges(spec: str) -> Iterator[tuple[int, int]]:
+    """(first, last) for each part of 3, 3,7,9 or 10-500, InvalidHistoryDeleteArguments if bad"""
+    for part in spec.split(","):
+        first, dash, last = part.partition("-")
+        try:
+            first = int(first)
+            last = int(last) if dash else first
+        except ValueError as exc:
+            raise InvalidHistoryDeleteArguments(f"bad selection {spec!r}") from exc
+        if first > last:
+            raise InvalidHistoryDeleteArguments(f"range {part!r} runs backwards")
+        yield first, last
+
+
 class HistoryDelete(Command):
-    """Handles printing of history to terminal"""
+    """Handles deleting records from history"""
     # command string regex this plugin will be responsible for
     # ignore leading whitespace, make it case insensitive
     COMMAND_PATTERN = re.compile(r"^\s*delete\s*$", re.IGNORECASE)
+    # literal aliases matched by COMMAND_PATTERN, used for indexed dispatch
+    ALIASES = ("delete",)
+    SERVICES = ("history",)
 
-    def __init__(self, cmd: CommandInput) -> None:
+    def __init__(self, cmd: CommandInput, history: History | None = None) -> None:
         self.cmd = cmd
-        self.history_file = os.getenv("HISTORY_FILE")
-        self.load_history()
-        logging.debug("History clear plugin object initialized")
+        self.history = history if history is not None else History()
+        self.ids = None
+        logging.debug("History delete plugin object initialized")
 
 
     @classmethod
     def in_scope(cls, cmd: CommandInput) -> bool:
         """Return T/F if the command is in this plugin's scope"""
-        logging.debug(f"History print scope check for {cmd.command}")
+        logging.debug("History delete scope check for %s", cmd.command)
         return bool(cls.COMMAND_PATTERN.match(cmd.command))
 
 
     def validate(self) -> None:
-        """Verify arguments are valid decimals - LBYL"""
-        if len(self.cmd.args.keys()) != 1:
+        """Resolve the selection to record IDs - LBYL"""
+        if len(self.cmd.args) == 0:
             raise InvalidHistoryDeleteArguments
-
-        try:
-            idx = int(self.cmd.args["argument_1"])
-        except ValueError as exc:
-            raise InvalidHistoryDeleteArguments from exc
-
-        if idx < 0 or idx >= len(self.history):
-            raise InvalidHistoryDeleteIndex
-
-
-    def delete_history(self, index: int) -> None:
-        """Delete the specified row and shift the rest"""
-        logging.info(f"Deleting history entry at index: {index}")
-        self.history.drop(index, inplace=True)
-        self.history.reset_index(drop=True, inplace=True)
-        self.history.to_csv(self.history_file, index=True)
-
-
-    def load_history(self):
-        """Load history from file"""
-        try:
-            logging.debug(f"Loading history from {self.history_file}")
-            self.history = pd.read_csv(
-                self.history_file,
-                parse_dates=["start_time", "end_time"],
-                index_col=0
-            )
-            # Explicitly cast 'output' column to string to match expected dtype
-            self.history["output"] = self.history["output"].astype(str)
-        except FileNotFoundError:
-            logging.info("No history file to delete from!")
-            raise
+        # indices count records other processes added to a shared log too
+        self.history.refresh()
+        self.ids = self.select(self.cmd.arguments)
+
+
+    def select(self, arguments: tuple[str, ...]) -> set[int]:
+        """IDs of the records the arguments select"""
+        ids = self.history.ids()
+        selected = set()
+        tokens = iter(arguments)
+        for token in tokens:
+            name, equals, value = token.partition("=")
+            name = name.lower()
+            if name not in OPTIONS:
+                if token.startswith("--"):
+                    raise InvalidHistoryDeleteArguments(f"unknown option {token!r}")
+                for first, last in parse_ranges(token):
+                    if last >= len(ids):
+                        raise InvalidHistoryDeleteIndex
+                    selected.update(ids[first:last + 1])
+                continue
+            if not equals:
+                value = next(tokens, None)
+                if value is None:
+                    raise InvalidHistoryDeleteArguments(f"{name} needs a value")
+            if name == "--command":
+                ring = self.history.ring
+                selected.update(ring.seqs[slot] for _, slot in ring.select(value.lower()))
+                continue
+            retained = set(ids)
+            for first, last in parse_ranges(value):
+                if first == last and first not in retained:
+                    raise InvalidHistoryDeleteId(first)
+                selected.update(seq for seq in retained if first <= seq <= last)
+        return selected
 
 
     def execute(self) -> CommandOutput:
-        """Print the history"""
-        self.load_history()
-        logging.debug("Deleting command from history")
-        self.delete_history(int(self.cmd.args["argument_1"]))
-        return CommandOutput("Deleted")
+        """Delete the selected records"""
+        logging.debug("Deleting commands from history")
+        if self.ids is None:
+            self.validate()
+        deleted = self.history.delete_ids(self.ids)
+        return CommandOutput("Deleted" if deleted == 1 else f"Deleted {deleted} records")
@@ -0,0 +1,558 @@
+"""Module for the on-disk history log.
+
+History is kept as an append-only CSV file. Every record gets a sequence number in
+the first (index) column, new records are appended at the end of the file, and the
+retained history is the last HISTORY_SIZE records of the file. This gives ring
+buffer semantics without rewriting the file on every command; the file is only
+rewritten when it gets compacted back down to the retained records.
+
+Appends are buffered by LogWriter and written by a background thread, keeping disk
+I/O off the interactive path. The log itself is a store selected with HISTORY_BACKEND:
+CSVStore (the default) or SQLiteStore from history_sqlite.
+
+Several processes can share a log. Appends are a single O_APPEND write under a
+shared flock on a .lock file next to the log, so appenders never wait for each
+other. Rewrites (compaction, deletes) hold the lock exclusively while they read the
+log and atomically replace it, so no append can land in a file about to be replaced.
+
+Record IDs (sequence numbers) must be unique across every writer of a log, since
+deletes address records by ID. Each History reserves a block of IDs at a time from a
+counter in HISTORY_FILE.ids, read and bumped under the exclusive lock.
+
+Stores give a signature of the log, for a CSV file its (st_mtime_ns, st_size,
+st_ino) and a generation bumped by every write in this process. The writer keeps
+the signature the log had after its own last write, so History can tell with one
+stat whether anyone else changed the log, and read just the rows they appended.
+
+Deleting a record appends a tombstone row naming its sequence number instead of
+rewriting the log. Reading replays the log in order through a window of the newest
+HISTORY_SIZE records, so a tombstone frees its record's place without bringing back
+records that had already rolled out. Compaction writes out just the window, which
+physically drops deleted records and their tombstones once the log has grown to
+twice the retained size. Records that rolled out are handed to the store's archive
+(see history_archive) when there is one, instead of being dropped.
+"""
+
+import io
+import os
+import csv
+import fcntl
+import logging
+import datetime
+import threading
+from collections import OrderedDict
+from collections.abc import Iterable, Iterator
+from contextlib import contextmanager
+
+
+BACKENDS = ("csv", "sqlite")
+HISTORY_FIELDS = ("command", "input", "output", "start_time", "end_time")
+# first column is the unnamed sequence number index, matching DataFrame.to_csv
+HISTORY_HEADER = ("",) + HISTORY_FIELDS
+# write-behind defaults: flush every 32 records or once a second, whichever is first
+DEFAULT_FLUSH_EVERY = 32
+DEFAULT_FLUSH_INTERVAL_MS = 1000
+# record IDs a History reserves at a time
+ID_BLOCK = 64
+# command column of a tombstone row, commands are single words so none is named this
+TOMBSTONE = "<deleted>"
+# lock descriptors this process has open
+_held_locks = set()
+# writes made to each log by this process, so a change is seen even when it keeps the
+# size and lands within the file system's timestamp resolution
+_generations = {}
+
+
+def format_time(time: datetime.datetime) -> str:
+    """Format timestamps the same way for every row so the file parses consistently"""
+    return time.isoformat(sep=" ", timespec="microseconds")
+
+
+def format_row(seq: int, record: dict) -> list:
+    """Turn a history record into a CSV row"""
+    return [
+        seq,
+        record["command"],
+        record["input"],
+        record["output"],
+        format_time(record["start_time"]),
+        format_time(record["end_time"])
+    ]
+
+
+def parse_row(row: list) -> tuple[int, dict]:
+    """Turn a CSV row back into a sequence number and record, ValueError if malformed"""
+    if len(row) != len(HISTORY_HEADER):
+        raise ValueError(f"Expected {len(HISTORY_HEADER)} fields, got {len(row)}")
+    record = {
+        "command": row[1],
+        "input": row[2],
+        "output": row[3],
+        "start_time": datetime.datetime.fromisoformat(row[4]),
+        "end_time": datetime.datetime.fromisoformat(row[5])
+    }
+    return int(row[0]), record
+
+
+def tombstone_row(seq: int) -> list:
+    """Row marking the record with a sequence number as deleted"""
+    return [seq, TOMBSTONE, "", "", "", ""]
+
+
+def is_tombstone(row: list) -> bool:
+    """Check if a row marks a deleted record"""
+    return len(row) > 1 and row[1] == TOMBSTONE
+
+
+def replay(rows: Iterable[list], size: int, rolled_out: list | None = None) -> list[list]:
+    """Rows of the retained records once tombstones are applied, oldest first
+
+    Logs written before IDs were reserved can hold several records with the same
+    sequence number, a tombstone deletes all of them. Records that rolled out of the window, and
+    weren't deleted before they did, are added to rolled_out if it is given.
+    """
+    retained = OrderedDict()
+    # row numbers in retained by sequence number, stale once a record rolls out
+    by_seq = {}
+    # row number of the last tombstone for each sequence number
+    tombstones = {}
+    evicted = []
+    for number, row in enumerate(rows):
+        if is_tombstone(row):
+            tombstones[str(row[0])] = number
+            for deleted in by_seq.pop(str(row[0]), ()):
+                retained.pop(deleted, None)
+            continue
+        retained[number] = row
+        by_seq.setdefault(str(row[0]), []).append(number)
+        if len(retained) > size:
+            evicted.append(retained.popitem(last=False))
+    if rolled_out is not None:
+        # a process that still retained a record can delete it after it rolled out here
+        rolled_out.extend(row for number, row in evicted
+                          if tombstones.get(str(row[0]), -1) < number)
+    return list(retained.values())
+
+
+def bump_generation(history_file: str) -> None:
+    """Count a write to a log"""
+    _generations[history_file] = _generations.get(history_file, 0) + 1
+
+
+def file_signature(history_file: str) -> tuple | None:
+    """(st_mtime_ns, st_size, st_ino, generation) of a log, None if there is none"""
+    try:
+        stat = os.stat(history_file)
+    except FileNotFoundError:
+        return None
+    return (stat.st_mtime_ns, stat.st_size, stat.st_ino, _generations.get(history_file, 0))
+
+
+def _drop_inherited_locks() -> None:
+    """Close the lock descriptors a forked child got, the parent still holds the locks"""
+    for lock_fd in _held_locks:
+        os.close(lock_fd)
+    _held_locks.clear()
+
+
+# flock belongs to the open file, so a child forked mid-write (e.g. a --workers
+# process) would otherwise hold the lock for as long as it lives
+os.register_at_fork(after_in_child=_drop_inherited_locks)
+
+
+@contextmanager
+def locked(history_file: str, exclusive: bool) -> Iterator[None]:
+    """Hold the log's advisory lock, shared by appenders and exclusive for rewrites"""
+    lock_fd = os.open(f"{history_file}.lock", os.O_RDWR | os.O_CREAT, 0o644)
+    _held_locks.add(lock_fd)
+    try:
+        fcntl.flock(lock_fd, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+        yield
+    finally:
+        # closing the descriptor releases the lock, unless a fork already closed it
+        if lock_fd in _held_locks:
+            _held_locks.discard(lock_fd)
+            os.close(lock_fd)
+
+
+def encode_rows(rows: list[list]) -> bytes:
+    """CSV bytes for rows, written out in one piece"""
+    text = io.StringIO(newline="")
+    csv.writer(text).writerows(rows)
+    return text.getvalue().encode("utf-8")
+
+
+def append_rows(history_file: str, rows: list[list]) -> int:
+    """Append rows to the end of the log with one write, creating it with a header if new
+
+    Returns the number of bytes appended, not counting a new log's header.
+    """
+    data = encode_rows(rows)
+    while True:
+        with locked(history_file, exclusive=False):
+            try:
+                log_fd = os.open(history_file, os.O_WRONLY | os.O_APPEND)
+            except FileNotFoundError:
+                log_fd = None
+            if log_fd is not None:
+                try:
+                    # O_APPEND moves to the end and writes in one step, so rows from
+                    # concurrent appenders never overwrite or split each other
+                    view = memoryview(data)
+                    while view:
+                        view = view[os.write(log_fd, view):]
+                finally:
+                    os.close(log_fd)
+                break
+        # a new log must appear with its header before anyone appends to it
+        with locked(history_file, exclusive=True):
+            if not os.path.exists(history_file):
+                replace_rows(history_file, [])
+    bump_generation(history_file)
+    return len(data)
+
+
+def read_rows(history_file: str) -> list[list]:
+    """Read every row of the log, raises FileNotFoundError if there is none"""
+    with open(history_file, newline="", encoding="utf-8") as log:
+        reader = csv.reader(log)
+        next(reader, None)
+        return list(reader)
+
+
+def read_rows_between(history_file: str, start: int, end: int) -> list[list] | None:
+    """Rows in bytes start to end of the log, None if those don't end with a whole row"""
+    with open(history_file, "rb") as log:
+        log.seek(start)
+        data = log.read(end - start)
+    if len(data) != end - start or not data.endswith(b"\n"):
+        return None
+    return list(csv.reader(io.StringIO(data.decode("utf-8"), newline="")))
+
+
+def replace_rows(history_file: str, rows: list[list]) -> None:
+    """Swap the log for a new file holding the given rows, caller holds the exclusive lock"""
+    tmp_file = f"{history_file}.{os.getpid()}.tmp"
+    with open(tmp_file, "wb") as log:
+        log.write(encode_rows([HISTORY_HEADER] + rows))
+    os.replace(tmp_file, history_file)
+    bump_generation(history_file)
+
+
+def _read_next_id(history_file: str) -> int:
+    """Next unreserved record ID, after the log's highest if nothing was reserved yet"""
+    try:
+        with open(f"{history_file}.ids", encoding="utf-8") as ids:
+            return int(ids.read())
+    except (FileNotFoundError, ValueError):
+        pass
+    try:
+        rows = read_rows(history_file)
+    except FileNotFoundError:
+        return 0
+    seqs = (int(row[0]) for row in rows if row and row[0].lstrip("-").isdigit())
+    return max(seqs, default=-1) + 1
+
+
+def _write_next_id(history_file: str, next_id: int) -> None:
+    """Store the next unreserved record ID, caller holds the exclusive lock"""
+    ids_file = f"{history_file}.ids"
+    tmp_file = f"{ids_file}.{os.getpid()}.tmp"
+    with open(tmp_file, "w", encoding="utf-8") as ids:
+        ids.write(str(next_id))
+    os.replace(tmp_file, ids_file)
+
+
+def reserve_ids(history_file: str, count: int) -> int:
+    """Reserve count record IDs no other writer of the log gets, return the first"""
+    with locked(history_file, exclusive=True):
+        first = _read_next_id(history_file)
+        _write_next_id(history_file, first + count)
+    return first
+
+
+def release_ids(history_file: str, next_id: int, end: int) -> None:
+    """Hand back the unused IDs next_id to end, if nobody reserved any after them"""
+    with locked(history_file, exclusive=True):
+        if _read_next_id(history_file) == end:
+            _write_next_id(history_file, next_id)
+
+
+def rewrite_rows(history_file: str, rows: list[list]) -> None:
+    """Replace the log with the given rows atomically"""
+    with locked(history_file, exclusive=True):
+        replace_rows(history_file, rows)
+
+
+def compact(history_file: str, size: int, archive=None) -> int:
+    """Drop deleted records and those that rolled out of the retained history, return rows kept"""
+    with locked(history_file, exclusive=True):
+        try:
+            rows = read_rows(history_file)
+        except FileNotFoundError:
+            return 0
+        rolled_out = []
+        kept = replay(rows, size, rolled_out)
+        if archive is not None and rolled_out:
+            archive.add(rolled_out)
+        if len(kept) < len(rows):
+            replace_rows(history_file, kept)
+        return len(kept)
+
+
+class CSVStore():
+    """History log kept as an append-only CSV file"""
+    def __init__(self, history_file: str, archive=None) -> None:
+        self.history_file = history_file
+        # HistoryArchive taking records that roll out, None to drop them
+        self.archive = archive
+        # bytes and writes this store appended since signature_after was last asked
+        self._written = self._writes = 0
+
+
+    def read_tail(self, size: int) -> tuple[list[list], int]:
+        """Retained rows oldest first and the number of rows in the log"""
+        rows = read_rows(self.history_file)
+        return replay(rows, size), len(rows)
+
+
+    def signature(self) -> tuple | None:
+        """Signature of the log file, None if there is none"""
+        return file_signature(self.history_file)
+
+
+    def signature_after(self, known: tuple | None) -> tuple | None:
+        """Signature of the log after this store's appends, None if anyone else wrote to it
+
+        known is the signature the log had before them. Appenders only share the
+        lock, so another process can append between them; the log then grew by more
+        than this store wrote.
+        """
+        written, writes = self._written, self._writes
+        self._written = self._writes = 0
+        current = self.signature()
+        if known is None or current is None:
+            return None
+        if current[1:] != (known[1] + written, known[2], known[3] + writes):
+            return None
+        return current
+
+
+    def read_appended(self, known: tuple | None, current: tuple | None) -> list[list] | None:
+        """Rows appended since the log had the known signature
+
+        None if the log changed in some other way, e.g. it was compacted into a new
+        file, and has to be read again.
+        """
+        if known is None or current is None or current[2] != known[2] or current[1] <= known[1]:
+            return None
+        return read_rows_between(self.history_file, known[1], current[1])
+
+
+    def read_frame(self, size: int):
+        """Retained records as a DataFrame indexed by sequence number"""
+        import pandas as pd  # pylint: disable=import-outside-toplevel
+        rows = replay(read_rows(self.history_file), size)
+        history = pd.read_csv(io.BytesIO(encode_rows([HISTORY_HEADER] + rows)),
+                              parse_dates=["start_time", "end_time"], index_col=0)
+        # Explicitly cast 'output' column to string to match expected dtype
+        history["output"] = history["output"].astype(str)
+        return history
+
+
+    def retained(self, size: int) -> int:
+        """Number of records in the retained history"""
+        return len(replay(read_rows(self.history_file), size))
+
+
+    def append(self, rows: list[list]) -> None:
+        """Add rows at the end of the log"""
+        self._written += append_rows(self.history_file, rows)
+        self._writes += 1
+
+
+    def rewrite(self, rows: list[list]) -> None:
+        """Replace the log with the given rows"""
+        rewrite_rows(self.history_file, rows)
+
+
+    def compact(self, size: int) -> int:
+        """Drop records that rolled out of the retained history, return rows kept"""
+        return compact(self.history_file, size, self.archive)
+
+
+    def delete_ids(self, seqs: list[int], size: int) -> int:
+        """Append tombstones for records by sequence number, return rows added to the log"""
+        _ = size  # the window is applied when the log is read
+        self._written += append_rows(self.history_file, [tombstone_row(seq) for seq in seqs])
+        self._writes += 1
+        return len(seqs)
+
+
+    def reserve_ids(self, count: int) -> int:
+        """Reserve count record IDs no other writer gets, return the first"""
+        return reserve_ids(self.history_file, count)
+
+
+    def release_ids(self, next_id: int, end: int) -> None:
+        """Hand back unused reserved IDs"""
+        release_ids(self.history_file, next_id, end)
+
+
+    def clear(self) -> None:
+        """Remove the log, FileNotFoundError if there is none"""
+        with locked(self.history_file, exclusive=True):
+            if self.archive is not None:
+                self.archive.clear()
+            os.remove(self.history_file)
+        bump_generation(self.history_file)
+
+
+    def close(self) -> None:
+        """Nothing is held open between calls"""
+
+
+def open_store(history_file: str, archive=None):
+    """History log store for the configured HISTORY_BACKEND, archiving into archive if given"""
+    if os.getenv("HISTORY_BACKEND", "csv") == "sqlite":
+        # pylint: disable=import-outside-toplevel
+        from calculator.commands.history.history_sqlite import SQLiteStore
+        return SQLiteStore(history_file, archive)
+    return CSVStore(history_file, archive)
+
+
+class LogWriter():  # pylint: disable=too-many-instance-attributes
+    """Write-behind buffer in front of the history log
+
+    Rows are written by a background thread once HISTORY_FLUSH_EVERY rows are
+    buffered or every HISTORY_FLUSH_INTERVAL_MS, whichever comes first. An interval
+    of 0 writes every row straight away.
+    """
+    def __init__(self, store, size: int, log_rows: int) -> None:
+        self.store = store
+        self.size = size
+        # rows currently in the file, compaction happens at twice the retained size
+        self.log_rows = log_rows
+        self.flush_every = int(os.getenv("HISTORY_FLUSH_EVERY", str(DEFAULT_FLUSH_EVERY)))
+        self.flush_interval = int(
+            os.getenv("HISTORY_FLUSH_INTERVAL_MS", str(DEFAULT_FLUSH_INTERVAL_MS))
+        ) / 1000
+        self.pending = []
+        # signature of the log as this writer last left it
+        self.signature = None
+        self._pending_lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._flusher = None
+        self._closed = False
+
+
+    def append(self, row: list) -> None:
+        """Queue a row for the log"""
+        with self._pending_lock:
+            self.pending.append(row)
+            num_pending = len(self.pending)
+
+        if self._closed or self.flush_interval <= 0:
+            self.flush()
+            return
+
+        if self._flusher is None:
+            self._flusher = threading.Thread(target=self._flush_loop, name="history-flusher",
+                                             daemon=True)
+            self._flusher.start()
+        if num_pending >= self.flush_every:
+            self._wake.set()
+
+
+    def _flush_loop(self) -> None:
+        """Background thread writing buffered rows every interval or when woken"""
+        while not self._closed:
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            try:
+                self.flush()
+            except OSError:
+                logging.error(f"Failed to write history to {self.store.history_file}",
+                              exc_info=True)
+
+
+    def flush(self) -> None:
+        """Write buffered rows to the log, compacting it once in a while"""
+        with self._flush_lock:
+            with self._pending_lock:
+                rows, self.pending = self.pending, []
+            if not rows:
+                return
+            logging.debug("Flushing %d history records", len(rows))
+            self.store.append(rows)
+            self.log_rows += len(rows)
+            self._after_write()
+
+
+    def delete_ids(self, seqs: list[int]) -> None:
+        """Write buffered rows, then mark records deleted by sequence number"""
+        # a tombstone must come after the record it deletes
+        self.flush()
+        with self._flush_lock:
+            self.log_rows += self.store.delete_ids(seqs, self.size)
+            self._after_write()
+
+
+    def _after_write(self) -> None:
+        """Move the signature past this writer's own write, compacting once in a while
+
+        Caller holds the flush lock. Rows anyone else wrote before or alongside
+        would hide behind the new signature, so then it is set to None, which no
+        signature matches, and History reads the whole log again.
+        """
+        self.signature = self.store.signature_after(self.signature)
+        if self.log_rows >= 2 * self.size:
+            self._compact()
+            # compaction folds in whatever was appended up to it
+            self.signature = None
+
+
+    def lock(self) -> threading.Lock:
+        """Lock keeping the flusher from writing while the log is compared or read"""
+        return self._flush_lock
+
+
+    def sync(self) -> None:
+        """Take the log as it is now to be as this writer left it"""
+        with self._flush_lock:
+            self.signature = self.store.signature()
+
+
+    def discard(self) -> None:
+        """Drop buffered rows and forget the log's contents, for when it gets cleared"""
+        with self._flush_lock:
+            with self._pending_lock:
+                self.pending = []
+            self.log_rows = 0
+
+
+    def compact(self) -> None:
+        """Write buffered rows and compact the log down to the retained records"""
+        self.flush()
+        with self._flush_lock:
+            self._compact()
+            # compaction folds in whatever others appended, so read the log again
+            self.signature = None
+
+
+    def _compact(self) -> None:
+        """Compact the log, caller holds the flush lock"""
+        logging.debug("Compacting history file")
+        self.log_rows = self.store.compact(self.size)
+
+
+    def close(self) -> None:
+        """Stop the background flusher and write out anything still buffered"""
+        self._closed = True
+        if self._flusher is not None:
+            self._wake.set()
+            self._flusher.join()
+            self._flusher = None
+        self.flush()
+        self.store.close()
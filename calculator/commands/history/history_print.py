@@ -1,13 +1,97 @@
-"""Module for command to print history"""
+"""Module for command to print history
+
+history on its own prints the retained history as a table. With options it streams
+only the matching records, a line each, straight from the history ring:
+history --command add --since 2025-01-01 --tail 10
+--archived also searches records that rolled out into the history archive, opening
+only the segments whose summaries can match.
+"""
 
-import os
 import re
 import logging
+import datetime
+import itertools
+from collections.abc import Iterator
 import pandas as pd
 from calculator.command import Command
 from calculator.command_input import CommandInput
-from calculator.command_output import CommandOutput
+from calculator.command_output import CommandOutput, StreamedOutput
 from calculator.commands.history.exceptions import InvalidHistoryPrintArguments
+from calculator.commands.history import history_log
+from calculator.commands.history.history import History
+from calculator.commands.history.history_ring import datetime_to_ns
+
+
+def count(value: str) -> int:
+    """Option value that is a number of records"""
+    number = int(value)
+    if number < 0:
+        raise ValueError(f"{number} is negative")
+    return number
+
+
+def timestamp(value: str) -> int:
+    """Option value that is an ISO date or time, as nanoseconds like the history ring"""
+    time = datetime.datetime.fromisoformat(value)
+    if time.tzinfo is not None:
+        # the history keeps naive local times
+        time = time.astimezone().replace(tzinfo=None)
+    return datetime_to_ns(time)
+
+
+OPTIONS = {
+    "--limit": count,
+    "--offset": count,
+    "--tail": count,
+    "--command": str.lower,
+    "--since": timestamp,
+    "--until": timestamp
+}
+# options without a value
+FLAGS = ("--archived",)
+# number shown for archived records, delete can't reach them by index
+ARCHIVED = "-"
+
+
+class HistoryQuery():  # pylint: disable=too-few-public-methods
+    """Options given to the history command"""
+    __slots__ = ("limit", "offset", "tail", "command", "since", "until", "archived")
+
+    def __init__(self) -> None:
+        self.limit = None
+        self.offset = 0
+        self.tail = None
+        self.command = None
+        self.since = None
+        self.until = None
+        self.archived = False
+
+
+    @classmethod
+    def parse(cls, arguments: tuple[str, ...]) -> "HistoryQuery":
+        """Read --option VALUE and --option=VALUE pairs, InvalidHistoryPrintArguments if bad"""
+        query = cls()
+        tokens = iter(arguments)
+        for token in tokens:
+            name, equals, value = token.partition("=")
+            if name.lower() in FLAGS and not equals:
+                setattr(query, name[2:].lower(), True)
+                continue
+            convert = OPTIONS.get(name.lower())
+            if convert is None:
+                raise InvalidHistoryPrintArguments(f"unknown option {token!r}")
+            if not equals:
+                value = next(tokens, None)
+                if value is None:
+                    raise InvalidHistoryPrintArguments(f"{name} needs a value")
+            try:
+                setattr(query, name[2:].lower(), convert(value))
+            except ValueError as exc:
+                raise InvalidHistoryPrintArguments(f"bad {name} {value!r}") from exc
+
+        if query.limit is not None and query.tail is not None:
+            raise InvalidHistoryPrintArguments("--limit and --tail can't be combined")
+        return query
 
 
 class HistoryPrint(Command):
@@ -15,32 +99,89 @@ class HistoryPrint(Command):
     # command string regex this plugin will be responsible for
     # ignore leading whitespace, make it case insensitive
     COMMAND_PATTERN = re.compile(r"^\s*history\s*$", re.IGNORECASE)
+    # literal aliases matched by COMMAND_PATTERN, used for indexed dispatch
+    ALIASES = ("history",)
+    SERVICES = ("history",)
 
-    def __init__(self, cmd: CommandInput) -> None:
+    def __init__(self, cmd: CommandInput, history: History | None = None) -> None:
         self.cmd = cmd
-        self.history_file = os.getenv("HISTORY_FILE")
+        self.history = history if history is not None else History()
+        self.query = None
         logging.debug("History print plugin object initialized")
 
 
     @classmethod
     def in_scope(cls, cmd: CommandInput) -> bool:
         """Return T/F if the command is in this plugin's scope"""
-        logging.debug(f"History print scope check for {cmd.command}")
+        logging.debug("History print scope check for %s", cmd.command)
         return bool(cls.COMMAND_PATTERN.match(cmd.command))
 
 
     def validate(self) -> None:
-        """Verify arguments are valid decimals - LBYL"""
-        if len(self.cmd.args.keys()) != 0:
-            raise InvalidHistoryPrintArguments
+        """Verify the options parse - LBYL"""
+        if len(self.cmd.args) != 0:
+            self.query = HistoryQuery.parse(self.cmd.arguments)
+            if self.query.archived and self.history.archive is None:
+                raise InvalidHistoryPrintArguments("--archived needs HISTORY_ARCHIVE set")
 
 
     def get_history(self) -> pd.DataFrame:
-        """Retreive the history from storage"""
-        return pd.read_csv(self.history_file, parse_dates=["start_time", "end_time"], index_col=0)
+        """Retreive the history, numbered the way delete expects"""
+        return self.history.history
+
+
+    def get_matches(self) -> Iterator[tuple[int | str, int, dict]]:
+        """(position, ID, record) of the records matching the query, lazily
+
+        Archived records are older than the retained ones and have no position.
+        """
+        query = self.query
+        newest_first = query.tail is not None
+        ring = self.history.ring
+        retained = ((position, ring.seqs[slot], ring.record(slot)) for position, slot
+                    in ring.select(query.command, query.since, query.until, newest_first))
+        if not query.archived:
+            return retained
+        archived = ((ARCHIVED, *history_log.parse_row(row)) for row in self.history.archive.select(
+            query.command, query.since, query.until, newest_first))
+        if newest_first:
+            return itertools.chain(retained, archived)
+        return itertools.chain(archived, retained)
+
+
+    def get_rows(self) -> Iterator[str]:
+        """Lines for the records matching the query, oldest first, produced lazily
+
+        Records are numbered the way delete expects, followed by the #ID delete --id
+        takes. --tail counts --offset from the newest record, so only the rows being
+        printed are ever held.
+        """
+        query = self.query
+        matches = self.get_matches()
+        page_size = query.tail if query.tail is not None else query.limit
+        stop = None if page_size is None else query.offset + page_size
+        matches = itertools.islice(matches, query.offset, stop)
+        if query.tail is not None:
+            matches = reversed(list(matches))
+
+        found = False
+        for position, seq, record in matches:
+            found = True
+            yield (f"{position:>5} {'#' + str(seq):>7}"
+                   f"  {record['start_time']:%Y-%m-%d %H:%M:%S}"
+                   f"  {record['input']} = {record['output']}")
+        if not found:
+            yield "No matching history"
 
 
     def execute(self) -> CommandOutput:
         """Print the history"""
         logging.debug("Printing history")
-        return CommandOutput(self.get_history())
+        # records other processes added to a shared log show up too
+        self.history.refresh()
+        if self.query is not None and self.query.archived:
+            # records that rolled out but are still in the log go to the archive first
+            self.history.save_history()
+        if self.query is None:
+            return CommandOutput(self.get_history())
+        return CommandOutput(StreamedOutput(self.get_rows()))
@@ -0,0 +1,192 @@
+"""Module with the in-memory ring buffer holding the retained history.
+
+Each field is stored column-wise: command/input/output strings in lists (command
+names are interned, there are only a handful of them) and timestamps as int64
+nanoseconds in arrays, so an entry costs a fixed handful of machine words plus its
+strings. A pandas DataFrame is only built when one is asked for.
+
+Deleting a record only flags its slot. Flagged slots are skipped when reading and
+reclaimed all at once when a record needs a slot and none is free.
+"""
+
+import sys
+import datetime
+import itertools
+from array import array
+from collections.abc import Iterator
+
+
+EPOCH = datetime.datetime(1970, 1, 1)
+
+
+def datetime_to_ns(time: datetime.datetime) -> int:
+    """Naive datetime to integer nanoseconds since the epoch"""
+    delta = time - EPOCH
+    return (delta.days * 86400 + delta.seconds) * 1_000_000_000 + delta.microseconds * 1000
+
+
+def ns_to_datetime(time_ns: int) -> datetime.datetime:
+    """Integer nanoseconds since the epoch back to a naive datetime"""
+    return EPOCH + datetime.timedelta(microseconds=time_ns // 1000)
+
+
+class HistoryRing():  # pylint: disable=too-many-instance-attributes
+    """Fixed capacity ring buffer of history records, oldest overwritten first"""
+    __slots__ = ("capacity", "head", "live", "seqs", "commands", "inputs", "outputs",
+                 "start_ns", "end_ns", "deleted")
+
+    def __init__(self, capacity: int) -> None:
+        self.capacity = capacity
+        # slot the next record goes to once the ring is full
+        self.head = 0
+        # records that aren't deleted
+        self.live = 0
+        self.seqs = array("q")
+        self.commands = []
+        self.inputs = []
+        self.outputs = []
+        self.start_ns = array("q")
+        self.end_ns = array("q")
+        # 1 for a slot whose record was deleted
+        self.deleted = bytearray()
+
+
+    def __len__(self) -> int:
+        return self.live
+
+
+    def full(self) -> bool:
+        """True once every slot holds a record that isn't deleted"""
+        return self.live >= self.capacity
+
+
+    def append(self, seq: int, record: dict) -> None:
+        """Add a record in a new slot, the ring must not be full"""
+        if len(self.seqs) >= self.capacity:
+            # every slot is taken, but some by deleted records
+            self.compact()
+        self.seqs.append(seq)
+        self.commands.append(sys.intern(record["command"]))
+        self.inputs.append(record["input"])
+        self.outputs.append(record["output"])
+        self.start_ns.append(datetime_to_ns(record["start_time"]))
+        self.end_ns.append(datetime_to_ns(record["end_time"]))
+        self.deleted.append(0)
+        self.live += 1
+        self.head = len(self.seqs) % self.capacity
+
+
+    def overwrite(self, slot: int, seq: int, record: dict) -> None:
+        """Replace the record in a slot"""
+        if self.deleted[slot]:
+            self.deleted[slot] = 0
+            self.live += 1
+        self.seqs[slot] = seq
+        self.commands[slot] = sys.intern(record["command"])
+        self.inputs[slot] = record["input"]
+        self.outputs[slot] = record["output"]
+        self.start_ns[slot] = datetime_to_ns(record["start_time"])
+        self.end_ns[slot] = datetime_to_ns(record["end_time"])
+
+
+    def push(self, seq: int, record: dict) -> None:
+        """Add a record, overwriting the oldest one if the ring is full"""
+        if not self.full():
+            self.append(seq, record)
+        else:
+            self.overwrite(self.head, seq, record)
+            self.head = (self.head + 1) % self.capacity
+
+
+    def clear(self) -> None:
+        """Drop every record"""
+        self.head = 0
+        self.live = 0
+        for column in self.__slots__[3:]:
+            del getattr(self, column)[:]
+
+
+    def delete(self, slot: int) -> None:
+        """Mark the record in a slot deleted, its slot is reclaimed by compact"""
+        if not self.deleted[slot]:
+            self.deleted[slot] = 1
+            self.live -= 1
+
+
+    def compact(self) -> None:
+        """Reclaim the slots of deleted records, keeping the rest in order"""
+        order = self.slots()
+        self.seqs = array("q", [self.seqs[i] for i in order])
+        self.commands = [self.commands[i] for i in order]
+        self.inputs = [self.inputs[i] for i in order]
+        self.outputs = [self.outputs[i] for i in order]
+        self.start_ns = array("q", [self.start_ns[i] for i in order])
+        self.end_ns = array("q", [self.end_ns[i] for i in order])
+        self.deleted = bytearray(len(order))
+        self.head = len(self.seqs) % self.capacity
+
+
+    def slots(self) -> list[int]:
+        """Occupied slots from oldest to newest record, skipping deleted ones"""
+        if len(self.seqs) < self.capacity:
+            order = range(len(self.seqs))
+        else:
+            order = itertools.chain(range(self.head, self.capacity), range(self.head))
+        return [slot for slot in order if not self.deleted[slot]]
+
+
+    def find(self, seqs: set[int]) -> list[int]:
+        """Slots of the records with these sequence numbers, oldest first"""
+        return [slot for slot in self.slots() if self.seqs[slot] in seqs]
+
+
+    def select(self, command: str | None = None, since_ns: int | None = None,
+               until_ns: int | None = None,
+               newest_first: bool = False) -> Iterator[tuple[int, int]]:
+        """(position, slot) of matching records, lazily, position counted from the oldest
+
+        command matches case insensitively, since_ns and until_ns bound the start time
+        (inclusive and exclusive).
+        """
+        count = len(self.seqs)
+        first = self.head if count >= self.capacity else 0
+        steps = range(count - 1, -1, -1) if newest_first else range(count)
+        step_position = -1 if newest_first else 1
+        next_position = self.live - 1 if newest_first else 0
+        for step in steps:
+            slot = (first + step) % self.capacity
+            if self.deleted[slot]:
+                continue
+            position = next_position
+            next_position += step_position
+            if command is not None and self.commands[slot].lower() != command:
+                continue
+            start_ns = self.start_ns[slot]
+            if (since_ns is not None and start_ns < since_ns) or \
+                    (until_ns is not None and start_ns >= until_ns):
+                continue
+            yield position, slot
+
+
+    def record(self, slot: int) -> dict:
+        """Record stored in a slot, with datetimes"""
+        return {
+            "command": self.commands[slot],
+            "input": self.inputs[slot],
+            "output": self.outputs[slot],
+            "start_time": ns_to_datetime(self.start_ns[slot]),
+            "end_time": ns_to_datetime(self.end_ns[slot])
+        }
+
+
+    def to_frame(self):
+        """Materialize the records as a DataFrame, oldest first"""
+        import pandas as pd  # pylint: disable=import-outside-toplevel
+        slots = self.slots()
+        return pd.DataFrame({
+            "command": pd.Series([self.commands[i] for i in slots], dtype="str"),
+            "input": pd.Series([self.inputs[i] for i in slots], dtype="str"),
+            "output": pd.Series([self.outputs[i] for i in slots], dtype="str"),
+            "start_time": pd.to_datetime([self.start_ns[i] for i in slots], unit="ns"),
+            "end_time": pd.to_datetime([self.end_ns[i] for i in slots], unit="ns")
+        })
@@ -0,0 +1,238 @@
+"""Module for keeping the history log in an SQLite database.
+
+Selected with HISTORY_BACKEND=sqlite. Records live in one table keyed on a position
+SQLite assigns as they are inserted, with a unique index on their sequence number
+(the record ID), so the newest records, a single record by position and deletes are
+B-tree lookups instead of reading and rewriting a whole CSV file. Record IDs are
+reserved from a counter row updated in a write transaction, so calculators sharing
+a database never insert the same ID. The database runs in WAL mode so readers don't
+block the background writer.
+"""
+
+import os
+import sqlite3
+import logging
+import threading
+
+
+SCHEMA = (
+    """CREATE TABLE IF NOT EXISTS history (
+        pos INTEGER PRIMARY KEY AUTOINCREMENT,
+        seq INTEGER NOT NULL UNIQUE,
+        command TEXT NOT NULL,
+        input TEXT NOT NULL,
+        output TEXT NOT NULL,
+        start_time TEXT NOT NULL,
+        end_time TEXT NOT NULL
+    )""",
+    "CREATE INDEX IF NOT EXISTS history_command ON history (command)",
+    "CREATE INDEX IF NOT EXISTS history_start_time ON history (start_time)",
+    # next record ID no connection has reserved
+    "CREATE TABLE IF NOT EXISTS history_ids (next_id INTEGER NOT NULL)"
+)
+COLUMNS = "seq, command, input, output, start_time, end_time"
+# a duplicate ID is an error, never a silent overwrite
+INSERT_ROW = f"INSERT INTO history ({COLUMNS}) VALUES (?, ?, ?, ?, ?, ?)"
+SELECT_ROWS = f"SELECT {COLUMNS} FROM history"
+# newest records first, walks the primary key backwards
+SELECT_TAIL = f"SELECT pos, {COLUMNS} FROM history ORDER BY pos DESC LIMIT ?"
+SELECT_POS_FROM_END = "SELECT pos FROM history ORDER BY pos DESC LIMIT 1 OFFSET ?"
+
+
+class SQLiteStore():
+    """History log kept in an SQLite database"""
+    def __init__(self, history_file: str, archive=None) -> None:
+        self.history_file = history_file
+        # HistoryArchive taking records that roll out, None to drop them
+        self.archive = archive
+        self._connection = None
+        # the background flusher and the interpreter share the connection
+        self._lock = threading.RLock()
+        # data versions seen by writes since signature_after was last asked
+        self._write_versions = set()
+
+
+    def _connect(self, create: bool = True) -> sqlite3.Connection:
+        """Open the database on first use, FileNotFoundError if it is missing and create is False"""
+        if self._connection is None:
+            if not create and not os.path.exists(self.history_file):
+                raise FileNotFoundError(self.history_file)
+            logging.debug(f"Opening history database {self.history_file}")
+            connection = sqlite3.connect(self.history_file, check_same_thread=False)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            with connection:
+                for statement in SCHEMA:
+                    connection.execute(statement)
+            self._connection = connection
+        return self._connection
+
+
+    def read_tail(self, size: int) -> tuple[list[list], int]:
+        """Newest size rows oldest first and the number of rows in the log"""
+        with self._lock:
+            connection = self._connect(create=False)
+            rows = connection.execute(SELECT_TAIL, (size,)).fetchall()
+            total = connection.execute("SELECT COUNT(*) FROM history").fetchone()[0]
+        return [list(row[1:]) for row in reversed(rows)], total
+
+
+    def signature(self) -> tuple | None:
+        """Data version of the database, it changes when another connection commits"""
+        with self._lock:
+            try:
+                connection = self._connect(create=False)
+            except FileNotFoundError:
+                return None
+            return connection.execute("PRAGMA data_version").fetchone()
+
+
+    def _begin_write(self, connection: sqlite3.Connection) -> None:
+        """Take the write lock and note the data version it was taken at"""
+        connection.execute("BEGIN IMMEDIATE")
+        self._write_versions.add(connection.execute("PRAGMA data_version").fetchone())
+
+
+    def signature_after(self, known: tuple | None) -> tuple | None:
+        """Signature of the database after this store's writes, None if anyone else wrote
+
+        known is the signature before them. Commits of this connection leave the
+        data version alone, so it only still holds if every write found it unchanged.
+        """
+        with self._lock:
+            versions, self._write_versions = self._write_versions, set()
+        if known is None or not versions <= {known}:
+            return None
+        return known
+
+
+    def read_appended(self, known: tuple | None,  # pylint: disable=useless-return
+                      current: tuple | None) -> list[list] | None:
+        """Always None, reading the newest records again is an index walk"""
+        _ = known, current  # prevent unused-argument warning
+        return None
+
+
+    def read_frame(self, size: int):
+        """Newest size records as a DataFrame indexed by sequence number"""
+        import pandas as pd  # pylint: disable=import-outside-toplevel
+        with self._lock:
+            connection = self._connect(create=False)
+            history = pd.read_sql_query(
+                f"SELECT {COLUMNS} FROM ({SELECT_TAIL}) ORDER BY pos", connection,
+                params=(size,), index_col="seq", parse_dates=["start_time", "end_time"]
+            )
+        history.index.name = None
+        return history
+
+
+    def retained(self, size: int) -> int:
+        """Number of records in the retained history"""
+        with self._lock:
+            connection = self._connect(create=False)
+            return connection.execute(
+                "SELECT COUNT(*) FROM (SELECT 1 FROM history ORDER BY pos DESC LIMIT ?)", (size,)
+            ).fetchone()[0]
+
+
+    def append(self, rows: list[list]) -> None:
+        """Insert rows in one transaction"""
+        with self._lock:
+            connection = self._connect()
+            with connection:
+                self._begin_write(connection)
+                connection.executemany(INSERT_ROW, rows)
+
+
+    def rewrite(self, rows: list[list]) -> None:
+        """Replace every record with the given rows"""
+        with self._lock:
+            connection = self._connect()
+            with connection:
+                connection.execute("DELETE FROM history")
+                connection.executemany(INSERT_ROW, rows)
+
+
+    def compact(self, size: int) -> int:
+        """Drop records that rolled out of the retained history, return rows kept"""
+        with self._lock:
+            try:
+                connection = self._connect(create=False)
+            except FileNotFoundError:
+                return 0
+            with connection:
+                self._drop_rolled_out(connection, size)
+            return self.retained(size)
+
+
+    def _drop_rolled_out(self, connection: sqlite3.Connection, size: int) -> None:
+        """Delete records older than the newest size, in the caller's transaction"""
+        if size > 0:
+            oldest = connection.execute(SELECT_POS_FROM_END, (size - 1,)).fetchone()
+            if oldest is None:
+                return
+            where = ("WHERE pos < ?", oldest)
+        else:
+            where = ("", ())
+        if self.archive is not None:
+            rows = connection.execute(f"{SELECT_ROWS} {where[0]} ORDER BY pos", where[1])
+            self.archive.add([list(row) for row in rows])
+        connection.execute(f"DELETE FROM history {where[0]}", where[1])
+
+
+    def delete_ids(self, seqs: list[int], size: int) -> int:
+        """Delete records by sequence number in one transaction, the log gains no rows"""
+        with self._lock:
+            connection = self._connect()
+            with connection:
+                self._begin_write(connection)
+                self._drop_rolled_out(connection, size)
+                connection.executemany("DELETE FROM history WHERE seq = ?",
+                                       [(seq,) for seq in seqs])
+        return 0
+
+
+    def reserve_ids(self, count: int) -> int:
+        """Reserve count record IDs no other connection gets, return the first"""
+        with self._lock:
+            connection = self._connect()
+            with connection:
+                # take the write lock before reading, so no two connections read one counter
+                connection.execute("BEGIN IMMEDIATE")
+                # the counter starts after the highest ID in the database
+                connection.execute(
+                    "INSERT INTO history_ids (next_id) SELECT COALESCE(MAX(seq), -1) + 1"
+                    " FROM history WHERE NOT EXISTS (SELECT 1 FROM history_ids)"
+                )
+                return connection.execute(
+                    "UPDATE history_ids SET next_id = next_id + ? RETURNING next_id - ?",
+                    (count, count)
+                ).fetchall()[0][0]
+
+
+    def release_ids(self, next_id: int, end: int) -> None:
+        """Hand back the unused IDs next_id to end, if nobody reserved any after them"""
+        with self._lock:
+            connection = self._connect()
+            with connection:
+                connection.execute("UPDATE history_ids SET next_id = ? WHERE next_id = ?",
+                                   (next_id, end))
+
+
+    def clear(self) -> None:
+        """Delete every record, FileNotFoundError if there is no database"""
+        with self._lock:
+            connection = self._connect(create=False)
+            # other connections may have the file open, so empty it instead of removing it
+            with connection:
+                connection.execute("DELETE FROM history")
+            if self.archive is not None:
+                self.archive.clear()
+
+
+    def close(self) -> None:
+        """Close the connection, the next call reopens it"""
+        with self._lock:
+            if self._connection is not None:
+                self._connection.close()
+                self._connection = None
@@ -5,57 +5,57 @@ Uses decimal data type.
 
 import re
 import logging
-from decimal import Decimal, InvalidOperation
-from calculator.command import Command
+from collections.abc import Iterable
+from decimal import Decimal
+from calculator import float_backend
+from calculator.command import OperandCommand
 from calculator.command_input import CommandInput
-from calculator.command_output import CommandOutput
 from calculator.commands.multiply.exceptions import (
     InvalidMultiplicationArguments,
     MissingMultiplicationArguments
 )
 
 
-class Multiply(Command):
+class Multiply(OperandCommand):
     """Multiply the arguments together"""
     # command string regex this plugin will be responsible for
     # ignore leading whitespace, make it case insensitive
     COMMAND_PATTERN = re.compile(r"^\s*(multiply|times|\*|multiplication|mult|m)$", re.IGNORECASE)
+    # literal aliases matched by COMMAND_PATTERN, used for indexed dispatch
+    ALIASES = ("multiply", "times", "*", "multiplication", "mult", "m")
+    # results are memoized by the Invoker, with the arguments in any order
+    PURE = True
+    COMMUTATIVE = True
+    MISSING_ARGUMENTS_ERROR = MissingMultiplicationArguments
+    INVALID_ARGUMENTS_ERROR = InvalidMultiplicationArguments
 
     def __init__(self, cmd: CommandInput) -> None:
-        self.cmd = cmd
+        super().__init__(cmd)
         logging.debug("Multiply plugin object initialized")
 
 
     @classmethod
     def in_scope(cls, cmd: CommandInput) -> bool:
         """Return T/F if the command is in this plugin's scope"""
-        logging.debug(f"Multiply plugin scope check for {cmd.command}")
+        logging.debug("Multiply plugin scope check for %s", cmd.command)
         return bool(cls.COMMAND_PATTERN.match(cmd.command))
 
 
-    def validate(self) -> None:
-        """Verify arguments are valid decimals - LBYL"""
-        if len(self.cmd.args.keys()) < 2:
-            raise MissingMultiplicationArguments
-
-        bad_args = []
-        for arg_value in self.cmd.args.values():
-            try:
-                Decimal(arg_value)
-            except (InvalidOperation, ValueError):
-                bad_args.append(arg_value)
-
-        if len(bad_args) > 0:
-            raise InvalidMultiplicationArguments(bad_args)
+    def reduce(self, operands: Iterable[Decimal]) -> Decimal:
+        """Multiply arguments together, return the product"""
+        logging.debug("Multiplying %s", self.cmd.args.values())
 
+        out_product = Decimal(1)
+        for operand in operands:
+            out_product *= operand
 
-    def execute(self) -> CommandOutput:
-        """Multiply arguments together, return CommandOutput with product"""
-        logging.debug(f"Multiplying {self.cmd.args.values()}")
+        logging.debug("Returning difference %s", out_product)
+        return out_product
 
-        out_product = Decimal(1)
-        for i in range(1, self.cmd.num_args + 1):
-            out_product *= Decimal(self.cmd.args[f"argument_{i}"])
 
-        logging.debug(f"Returning difference {out_product}")
-        return CommandOutput(str(out_product))
+    def reduce_float(self, values) -> float | None:
+        """Multiply a float64 array of arguments, None if the product underflowed"""
+        out_product = float_backend.product(values)
+        if out_product == 0 and values.all():
+            return None
+        return out_product
@@ -0,0 +1,9 @@
+"""Module for stats plugin command exceptions"""
+
+from calculator.exceptions import CLIError
+
+
+class InvalidStatsArguments(CLIError):
+    """Error to raise when stats gets wrong args"""
+    def __init__(self) -> None:
+        super().__init__("stats takes no arguments, or reset")
@@ -0,0 +1,46 @@
+"""Module for command to print command latency statistics"""
+
+import re
+import logging
+from calculator.command import Command
+from calculator.command_input import CommandInput
+from calculator.command_output import CommandOutput
+from calculator.stats import Stats
+from calculator.commands.stats.exceptions import InvalidStatsArguments
+
+
+class StatsCommand(Command):
+    """Prints p50/p95/p99 latency per phase and per command"""
+    # command string regex this plugin will be responsible for
+    # ignore leading whitespace, make it case insensitive
+    COMMAND_PATTERN = re.compile(r"^\s*stats\s*$", re.IGNORECASE)
+    # literal aliases matched by COMMAND_PATTERN, used for indexed dispatch
+    ALIASES = ("stats",)
+    SERVICES = ("stats",)
+
+    def __init__(self, cmd: CommandInput, stats: Stats | None = None) -> None:
+        self.cmd = cmd
+        self.stats = stats if stats is not None else Stats()
+        logging.debug("Stats plugin object initialized")
+
+
+    @classmethod
+    def in_scope(cls, cmd: CommandInput) -> bool:
+        """Return T/F if the command is in this plugin's scope"""
+        logging.debug("Stats scope check for %s", cmd.command)
+        return bool(cls.COMMAND_PATTERN.match(cmd.command))
+
+
+    def validate(self) -> None:
+        """Verify there are no arguments, or just reset - LBYL"""
+        args = list(self.cmd.args.values())
+        if args and args != ["reset"]:
+            raise InvalidStatsArguments
+
+
+    def execute(self) -> CommandOutput:
+        """Print the latency table, or clear it with stats reset"""
+        if list(self.cmd.args.values()) == ["reset"]:
+            self.stats.clear()
+            return CommandOutput("Stats reset")
+        return CommandOutput(self.stats.report())
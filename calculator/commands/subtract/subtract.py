@@ -5,57 +5,56 @@ Uses decimal data type.
 
 import re
 import logging
-from decimal import Decimal, InvalidOperation
-from calculator.command import Command
+from collections.abc import Iterable
+from decimal import Decimal
+from calculator import float_backend
+from calculator.command import OperandCommand
 from calculator.command_input import CommandInput
-from calculator.command_output import CommandOutput
 from calculator.commands.subtract.exceptions import (
     InvalidSubtractionArguments,
     MissingSubtractionArguments
 )
 
 
-class Subtract(Command):
+class Subtract(OperandCommand):
     """Subtract the arguments from each other"""
     # command string regex this plugin will be responsible for
     # ignore leading whitespace, make it case insensitive
     COMMAND_PATTERN = re.compile(r"^\s*(subtract|minus|\-|subtraction|sub|s)$", re.IGNORECASE)
+    # literal aliases matched by COMMAND_PATTERN, used for indexed dispatch
+    ALIASES = ("subtract", "minus", "-", "subtraction", "sub", "s")
+    # results are memoized by the Invoker
+    PURE = True
+    MISSING_ARGUMENTS_ERROR = MissingSubtractionArguments
+    INVALID_ARGUMENTS_ERROR = InvalidSubtractionArguments
 
     def __init__(self, cmd: CommandInput) -> None:
-        self.cmd = cmd
+        super().__init__(cmd)
         logging.debug("Subtract plugin object initialized")
 
 
     @classmethod
     def in_scope(cls, cmd: CommandInput) -> bool:
         """Return T/F if the command is in this plugin's scope"""
-        logging.debug(f"Subtract plugin scope check for {cmd.command}")
+        logging.debug("Subtract plugin scope check for %s", cmd.command)
         return bool(cls.COMMAND_PATTERN.match(cmd.command))
 
 
-    def validate(self) -> None:
-        """Verify arguments are valid decimals - LBYL"""
-        if len(self.cmd.args.keys()) < 2:
-            raise MissingSubtractionArguments
+    def reduce(self, operands: Iterable[Decimal]) -> Decimal:
+        """Subtract arguments together, return the difference"""
+        logging.debug("Subtracting %s", self.cmd.args.values())
 
-        bad_args = []
-        for arg_value in self.cmd.args.values():
-            try:
-                Decimal(arg_value)
-            except (InvalidOperation, ValueError):
-                bad_args.append(arg_value)
+        operands = iter(operands)
+        out_diff = next(operands)
+        for operand in operands:
+            out_diff -= operand
 
-        if len(bad_args) > 0:
-            raise InvalidSubtractionArguments(bad_args)
+        logging.debug("Returning difference %s", out_diff)
+        return out_diff
 
 
-    def execute(self) -> CommandOutput:
-        """Subtract arguments together, return CommandOutput with difference"""
-        logging.debug(f"Subtracting {self.cmd.args.values()}")
-
-        out_diff = Decimal(self.cmd.args["argument_1"])
-        for i in range(2, self.cmd.num_args + 1):
-            out_diff -= Decimal(self.cmd.args[f"argument_{i}"])
-
-        logging.debug(f"Returning difference {out_diff}")
-        return CommandOutput(str(out_diff))
+    def reduce_float(self, values) -> float:
+        """Subtract a float64 array of arguments, rounding only once"""
+        values = -values
+        values[0] = -values[0]
+        return float_backend.total(values)
@@ -0,0 +1,64 @@
+"""Module with an optional float64 backend for arithmetic on large operand lists.
+
+Selected with ARITHMETIC_BACKEND=float (or run_calculator --backend float). Operand
+lists of at least FLOAT_BACKEND_MIN_OPERANDS values are parsed and reduced with NumPy
+instead of a Python level Decimal loop. Anything a double can't hold exactly enough
+falls back to the Decimal implementation.
+"""
+
+import os
+import re
+import math
+
+
+BACKENDS = ("decimal", "float")
+DEFAULT_MIN_OPERANDS = 1000
+# a double round trips any decimal with up to 15 significant digits
+MAX_DIGITS = 15
+FLOAT_SAFE_PATTERN = re.compile(rf"[+-]?(?!(?:\D*\d){{{MAX_DIGITS + 1}}})(?:\d+\.?\d*|\.\d+)")
+# deletes every character a plain decimal literal may contain
+PLAIN_DECIMAL_CHARS = str.maketrans("", "", "0123456789+-.")
+
+
+def enabled(num_operands: int) -> bool:
+    """Check if the float backend is selected and worth using for this many operands"""
+    if os.getenv("ARITHMETIC_BACKEND", "decimal") != "float":
+        return False
+    min_operands = int(os.getenv("FLOAT_BACKEND_MIN_OPERANDS", str(DEFAULT_MIN_OPERANDS)))
+    return num_operands >= min_operands
+
+
+def parse_operands(tokens: list[str]):
+    """Convert tokens to a float64 array, or None if any can't be represented exactly enough
+
+    Exponents, NaN/Infinity and malformed tokens also return None so the Decimal
+    path can handle (or report) them with its usual semantics.
+    """
+    if "".join(tokens).translate(PLAIN_DECIMAL_CHARS):
+        return None
+    if max(map(len, tokens)) > MAX_DIGITS and not all(map(FLOAT_SAFE_PATTERN.fullmatch, tokens)):
+        return None
+
+    import numpy as np  # pylint: disable=import-outside-toplevel
+    try:
+        return np.array(tokens, dtype=np.float64)
+    except ValueError:
+        return None
+
+
+def total(values) -> float:
+    """Error compensated sum of an array, correctly rounded like math.fsum"""
+    return math.fsum(values)
+
+
+def product(values) -> float:
+    """Vectorized product of an array, inf or 0 on overflow/underflow"""
+    import numpy as np  # pylint: disable=import-outside-toplevel
+    with np.errstate(over="ignore", under="ignore"):
+        return float(np.prod(values))
+
+
+def format_result(result: float) -> str:
+    """Shortest string that round trips the result, without a trailing .0"""
+    text = repr(result)
+    return text[:-2] if text.endswith(".0") else text
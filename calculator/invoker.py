@@ -1,34 +1,90 @@
 """Module for command invocation."""
 
+import os
+import time
+import decimal
 import logging
-import importlib.metadata
+from calculator import float_backend, operand_stream
 from calculator.command import Command
 from calculator.command_input import CommandInput
 from calculator.command_output import CommandOutput
 from calculator.exceptions import AmbiguousCommandError, MissingCommandError
+from calculator.plugin_manifest import PluginRef, discover_plugins
+from calculator.result_cache import ResultCache
 
 
 
 class Invoker():
     """Command design pattern invoker of commands"""
-    def __init__(self) -> None:
+    def __init__(self, services: dict | None = None) -> None:
         logging.info("Invoker evoked")
+        # shared objects handed to plugins that ask for them through SERVICES
+        self.services = dict(services or {})
+        # memoized outputs of PURE plugins, a cache of its own unless one is shared
+        self.result_cache = self.services.setdefault("result_cache", ResultCache())
+        self._plugin_services = {}
         self._register_commands()
 
 
     def _register_commands(self) -> None:
-        """Load plugins and make Invoker aware of them"""
-        self.commands = []
-        for cmd in importlib.metadata.entry_points(group="calculator.commands"):
-            logging.debug(f"Found entry point {cmd}")
-            self.commands.append(cmd.load())
-        logging.info(f"Plugin commands loaded: {self.commands}")
+        """Find plugins and make Invoker aware of them, importing them lazily"""
+        self.plugins = discover_plugins(os.getenv("PLUGIN_MANIFEST"))
+        logging.info(f"Plugin commands registered: {self.plugins}")
+        self._index_commands()
+
+
+    def _index_commands(self) -> None:
+        """Build the alias -> plugin lookup table, detecting collisions once up front"""
+        self.alias_index = {}
+        self.ambiguous_aliases = {}
+        # plugins without declared aliases can only be found through in_scope,
+        # so they have to be imported right away
+        fallback_refs = [ref for ref in self.plugins if not ref.aliases]
+        self.fallback_commands = [ref.load() for ref in fallback_refs]
+        for ref in self.plugins:
+            for alias in ref.aliases:
+                self._index_alias(alias.lower(), ref)
+
+        # a regex plugin claiming an indexed alias would make that alias ambiguous
+        for alias in list(self.alias_index):
+            alias_input = CommandInput(alias)
+            for ref in fallback_refs:
+                if ref.plugin.in_scope(alias_input):
+                    self._index_alias(alias, ref)
+
+        for alias, collisions in self.ambiguous_aliases.items():
+            logging.warning(f"Command {alias} is claimed by multiple plugins: {collisions}")
+        logging.debug(f"Indexed aliases: {list(self.alias_index)}")
+
+
+    def _index_alias(self, alias: str, ref: PluginRef) -> None:
+        """Map an alias to a plugin, moving it to the ambiguous table on collision"""
+        if alias in self.ambiguous_aliases:
+            if ref not in self.ambiguous_aliases[alias]:
+                self.ambiguous_aliases[alias].append(ref)
+            return
+
+        owner = self.alias_index.get(alias)
+        if owner is None:
+            self.alias_index[alias] = ref
+        elif owner is not ref:
+            del self.alias_index[alias]
+            self.ambiguous_aliases[alias] = [owner, ref]
 
 
     def _choose_command(self, cmd: CommandInput) -> CommandOutput:
         """Select which plugin should be used for command execution"""
+        alias = cmd.command.lower()
+        ref = self.alias_index.get(alias)
+        if ref is not None:
+            return ref.load()
+
+        if alias in self.ambiguous_aliases:
+            raise AmbiguousCommandError(cmd, self.ambiguous_aliases[alias])
+
+        # regex fallback for plugins that could not be indexed
         command_choices = []
-        for pc in self.commands:
+        for pc in self.fallback_commands:
             if pc.in_scope(cmd):
                 command_choices.append(pc)
 
@@ -38,22 +94,95 @@ class Invoker():
         if len(command_choices) == 0:
             raise MissingCommandError(cmd)
 
-        logging.debug(f"Chose {command_choices[0]} for {cmd.command} command")
+        logging.debug("Chose %s for %s command", command_choices[0], cmd.command)
         return command_choices[0]
 
 
+    def _services_for(self, plugin: Command) -> dict:
+        """Keyword arguments with the services a plugin asks for"""
+        services = self._plugin_services.get(plugin)
+        if services is None:
+            services = {
+                name: self.services[name]
+                for name in getattr(plugin, "SERVICES", ())
+                if name in self.services
+            }
+            self._plugin_services[plugin] = services
+        return services
+
+
+    def aliases_using(self, service: str) -> set[str]:
+        """Aliases of the plugins that ask for a shared service, without importing any"""
+        return {
+            alias.lower()
+            for ref in self.plugins
+            if service in ref.services
+            for alias in ref.aliases
+        }
+
+
     def list_commands(self) -> list[Command]:
-        """Return a list of loaded plugins"""
-        return self.commands
+        """Return a list of loaded plugins, importing any that are not loaded yet"""
+        return [ref.load() for ref in self.plugins]
+
+
+    def _result_key(self, plugin: Command, cmd: CommandInput) -> tuple | None:
+        """Result cache key for a command, None if its output can't be memoized"""
+        if not getattr(plugin, "PURE", False) or not self.result_cache.enabled:
+            return None
+        key = self.result_cache.key(plugin, cmd.arguments)
+        # operands read from a file or stdin can change between runs
+        if key is None or operand_stream.has_sources(key[1]):
+            return None
+        return key
+
+
+    def _record_phases(self, plugin: Command, cmd: CommandInput,
+                       times_ns: tuple[int, int, int]) -> None:
+        """Time the phases of a command from its start, dispatch and validation times"""
+        stats = self.services.get("stats")
+        if stats is not None:
+            start_ns, dispatched_ns, validated_ns = times_ns
+            stats.record_command(
+                getattr(plugin, "__name__", type(plugin).__name__),
+                getattr(cmd, "parse_ns", 0),
+                dispatched_ns - start_ns,
+                validated_ns - dispatched_ns,
+                time.perf_counter_ns() - validated_ns
+            )
 
 
     def execute_command(self, cmd: CommandInput) -> CommandOutput:
-        """Execute plugin command"""
+        """Execute plugin command, or reuse the output of an identical pure one"""
+        start_ns = time.perf_counter_ns()
         logging.debug("Choosing plugin")
-        command = self._choose_command(cmd)(cmd)
+        plugin = self._choose_command(cmd)
+        key = self._result_key(plugin, cmd)
+        any_order_key = None
+        if key is not None:
+            any_order_key = self.result_cache.any_order_key(key)
+            cached = self.result_cache.get(key, any_order_key)
+            if cached is not None:
+                output = CommandOutput(cached)
+                now_ns = time.perf_counter_ns()
+                self._record_phases(plugin, cmd, (start_ns, now_ns, now_ns))
+                return output
+        command = plugin(cmd, **self._services_for(plugin))
+        dispatched_ns = time.perf_counter_ns()
         #LBYL - validate command arguments
         logging.debug("Validating arguments")
         command.validate()
+        validated_ns = time.perf_counter_ns()
         # execute command
         logging.debug("Executing command")
-        return command.execute()
+        with decimal.localcontext() as context:
+            context.clear_flags()
+            output = command.execute()
+        if key is not None:
+            # only an exact result is the same whatever order the operands came in
+            exact = not (context.flags[decimal.Inexact] or context.flags[decimal.Rounded]
+                         or float_backend.enabled(len(key[1])))
+            self.result_cache.put(any_order_key if any_order_key and exact else key,
+                                  output.output)
+        self._record_phases(plugin, cmd, (start_ns, dispatched_ns, validated_ns))
+        return output
@@ -0,0 +1,71 @@
+"""Module for writing log records on a background thread.
+
+setup_env configures the file and console handlers from logging.conf, then
+start_log_queue moves them behind a QueueHandler. Logging a record only puts it on
+a queue, and a QueueListener thread does the formatting, file and terminal writes,
+so a slow disk or terminal doesn't hold up commands.
+"""
+
+import os
+import queue
+import atexit
+import logging
+from logging.handlers import QueueHandler, QueueListener
+
+
+# listener serving the root logger's queue, None while logging is synchronous
+_listener = None  # pylint: disable=invalid-name
+
+
+def start_log_queue() -> QueueListener | None:
+    """Move the root logger's handlers behind a queue served by a background thread"""
+    global _listener  # pylint: disable=global-statement
+    stop_log_queue()
+    root = logging.getLogger()
+    handlers = [handler for handler in root.handlers if not isinstance(handler, QueueHandler)]
+    if not handlers:
+        return None
+
+    log_queue = queue.SimpleQueue()
+    for handler in handlers:
+        root.removeHandler(handler)
+    root.addHandler(QueueHandler(log_queue))
+    # each handler keeps filtering on its own level, as it did on the root logger
+    _listener = QueueListener(log_queue, *handlers, respect_handler_level=True)
+    _listener.start()
+    return _listener
+
+
+def stop_log_queue() -> None:
+    """Write out queued records and put the handlers back on the root logger"""
+    global _listener  # pylint: disable=global-statement
+    listener, _listener = _listener, None
+    if listener is None:
+        return
+    listener.stop()
+    root = logging.getLogger()
+    for handler in root.handlers[:]:
+        if isinstance(handler, QueueHandler) and handler.queue is listener.queue:
+            root.removeHandler(handler)
+    for handler in listener.handlers:
+        root.addHandler(handler)
+
+
+def _restart_in_child() -> None:
+    """Give a forked process its own listener thread, threads don't survive fork"""
+    global _listener  # pylint: disable=global-statement
+    if _listener is None:
+        return
+    # records still queued at fork time are the parent's to write
+    while True:
+        try:
+            _listener.queue.get_nowait()
+        except queue.Empty:
+            break
+    _listener = QueueListener(_listener.queue, *_listener.handlers, respect_handler_level=True)
+    _listener.start()
+
+
+os.register_at_fork(after_in_child=_restart_in_child)
+# records logged right before exit must still reach the log file
+atexit.register(stop_log_queue)
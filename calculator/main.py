@@ -1,15 +1,124 @@
 """Module containing main function and application set up"""
 
+import os
+import sys
+import asyncio
 import logging
+import argparse
+from calculator import client, server
 from calculator.setup_env import setup_env
-from calculator.cli import CLI
+from calculator.cli import CLI, HISTORY_POLICIES
+from calculator.float_backend import BACKENDS
 
 
-def main():
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    """Parse run_calculator command line options"""
+    parser = argparse.ArgumentParser(prog="run_calculator", description="Command line calculator")
+    parser.add_argument(
+        "--backend",
+        choices=BACKENDS,
+        help="arithmetic backend for large operand lists (default: $ARITHMETIC_BACKEND or decimal)"
+    )
+    parser.add_argument(
+        "--batch",
+        metavar="FILE",
+        help="run the commands in FILE (- for stdin) without prompting, one per line"
+    )
+    parser.add_argument(
+        "--history-policy",
+        choices=HISTORY_POLICIES,
+        default="bulk",
+        help="how --batch records history: off, every Nth command, or the retained"
+             " commands at the end (default: bulk)"
+    )
+    parser.add_argument(
+        "--history-sample",
+        type=int,
+        default=100,
+        metavar="N",
+        help="record every Nth command with --history-policy sample (default: 100)"
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        metavar="N",
+        help="run --batch commands, or long --serve requests, on N worker processes"
+             " (default: 1)"
+    )
+    parser.add_argument(
+        "--serve",
+        action="store_true",
+        help="answer JSON line requests over TCP and/or a Unix socket instead of prompting"
+    )
+    parser.add_argument("--host", help=f"--serve address (default: {server.DEFAULT_HOST})")
+    parser.add_argument(
+        "--port",
+        type=int,
+        help=f"--serve TCP port (default: {server.DEFAULT_PORT} unless --socket is given)"
+    )
+    parser.add_argument("--socket", metavar="PATH", help="--serve on a Unix domain socket")
+    parser.add_argument(
+        "--daemon",
+        action="store_true",
+        help="--serve on the socket the calc client uses ($CALCULATOR_SOCKET or one per user)"
+    )
+    args = parser.parse_args(argv)
+    if args.daemon:
+        args.serve = True
+        args.socket = args.socket or client.default_socket_path()
+    if args.batch and args.serve:
+        parser.error("--batch and --serve can't be used together")
+    if args.history_sample < 1:
+        parser.error("--history-sample must be at least 1")
+    if args.workers < 1:
+        parser.error("--workers must be at least 1")
+    return args
+
+
+def run_batch(cli: CLI, args: argparse.Namespace) -> None:
+    """Run a batch file or stdin through the CLI"""
+    logging.info(f"Running batch from {args.batch}")
+    if args.batch == "-":
+        cli.run_batch(sys.stdin, sys.stdout, args.history_policy, args.history_sample,
+                      args.workers)
+        return
+    with open(args.batch, encoding="utf-8", buffering=1 << 20) as source:
+        cli.run_batch(source, sys.stdout, args.history_policy, args.history_sample, args.workers)
+
+
+def run_server(cli: CLI, args: argparse.Namespace) -> None:
+    """Serve requests with the CLI's Invoker and History until interrupted"""
+    port = args.port
+    # @file operands would let clients read the server's files
+    os.environ["STREAM_OPERANDS"] = "0"
+    if port is None and args.socket is None:
+        port = server.DEFAULT_PORT
+    calculator_server = server.CalculatorServer(cli.invoker, cli.history, args.workers)
+    try:
+        asyncio.run(calculator_server.serve(args.host, port, args.socket))
+    except KeyboardInterrupt:
+        logging.info("Server stopped")
+    except OSError as exc:
+        logging.error("Could not start server", exc_info=True)
+        print(f"run_calculator: {exc}", file=sys.stderr)
+
+
+def main(argv: list[str] | None = None):
     """Set up environment and run the calculator"""
+    args = parse_args(argv)
+    if args.backend:
+        # command line choice wins over .env for this session
+        os.environ["ARITHMETIC_BACKEND"] = args.backend
     logging.info("Setting up env")
     setup_env()
     c = CLI()
+    if args.batch:
+        run_batch(c, args)
+        return
+    if args.serve:
+        run_server(c, args)
+        return
     logging.info("Starting CLI")
     c.start()
 
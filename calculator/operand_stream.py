@@ -0,0 +1,115 @@
+"""Module reading operands from files and stdin instead of the command line.
+
+An argument like @values.txt (or @- for stdin) stands for every whitespace separated
+token in that file, in order, so add @values.txt sums a file of numbers. Sources are
+read a chunk at a time and tokens are handed out lazily, so memory use doesn't grow
+with the size of the file, only with its longest token.
+
+STREAM_OPERANDS=0 turns sources off, --serve does so because its clients shouldn't
+read the server's files. With STREAM_STRICT=1 a command stops at the first bad token
+instead of reading on to report all of them.
+"""
+
+import os
+import sys
+from collections.abc import Iterable, Iterator
+
+
+SOURCE_PREFIX = "@"
+# @- reads stdin
+STDIN_SOURCE = "-"
+# characters read from a source at a time
+CHUNK_CHARS = 1 << 16
+# operands parsed and checked together before being reduced
+CHUNK_OPERANDS = 4096
+# bad tokens listed in an error, the rest are only counted
+MAX_REPORTED = 20
+
+
+def enabled() -> bool:
+    """Check if @ arguments are read as operand sources"""
+    return os.getenv("STREAM_OPERANDS", "1") != "0"
+
+
+def strict() -> bool:
+    """Check if a command should stop at the first bad token"""
+    return os.getenv("STREAM_STRICT", "0") == "1"
+
+
+def is_source(arg: str) -> bool:
+    """Check if an argument names an operand source"""
+    return len(arg) > 1 and arg[0] == SOURCE_PREFIX
+
+
+def has_sources(arguments: Iterable[str]) -> bool:
+    """Check if any argument names an operand source and sources are enabled"""
+    return any(map(is_source, arguments)) and enabled()
+
+
+def read_tokens(stream, chunk_chars: int = CHUNK_CHARS) -> Iterator[tuple[int, str]]:
+    """(line number, token) for every token of a text stream, read chunk by chunk"""
+    line_number = 1
+    tail = ""
+    while chunk := stream.read(chunk_chars):
+        lines = (tail + chunk).split("\n")
+        # the last line may go on in the next chunk
+        tail = lines.pop()
+        for line in lines:
+            for token in line.split():
+                yield line_number, token
+            line_number += 1
+        # hand out the finished tokens of a long line now, keeping only a partial one
+        if tail[-1:].isspace():
+            finished, tail = tail.split(), ""
+        else:
+            finished = tail.split()
+            tail = finished.pop() if finished else ""
+        for token in finished:
+            yield line_number, token
+    for token in tail.split():
+        yield line_number, token
+
+
+def tokens(arguments: Iterable[str]) -> Iterator[tuple[str, str | None]]:
+    """(token, location) for every operand, location is None for command line ones
+
+    Sources are opened only when they are reached, OSError if one can't be.
+    """
+    for arg in arguments:
+        if not is_source(arg):
+            yield arg, None
+            continue
+        name = arg[len(SOURCE_PREFIX):]
+        if name == STDIN_SOURCE:
+            for line_number, token in read_tokens(sys.stdin):
+                yield token, f"stdin line {line_number}"
+            continue
+        with open(name, encoding="utf-8", errors="replace") as source:
+            for line_number, token in read_tokens(source):
+                yield token, f"{name} line {line_number}"
+
+
+class BadTokens():
+    """Bad tokens with their locations, keeping the first MAX_REPORTED"""
+    __slots__ = ("reported", "count")
+
+    def __init__(self) -> None:
+        self.reported = []
+        self.count = 0
+
+
+    def __bool__(self) -> bool:
+        return self.count > 0
+
+
+    def add(self, token: str, location: str | None) -> None:
+        """Record a token that isn't a number"""
+        self.count += 1
+        if self.count <= MAX_REPORTED:
+            self.reported.append(token if location is None else f"{token} ({location})")
+
+
+    def values(self) -> list[str]:
+        """Reported tokens, with a count of the ones left out"""
+        left_out = self.count - len(self.reported)
+        return self.reported + ([f"... {left_out} more"] if left_out else [])
@@ -0,0 +1,149 @@
+"""Module for discovering plugin commands without importing them.
+
+Importing every plugin at start up is slow (some of them pull in heavy libraries),
+so what each plugin declares (its aliases and the shared services it asks for) is
+cached in a manifest file on disk. The manifest is
+keyed on the installed plugins' versions and module mtimes, and is rebuilt whenever
+any of them change.
+"""
+
+import os
+import json
+import logging
+import importlib.util
+import importlib.metadata
+from calculator.command import Command
+
+
+ENTRY_POINT_GROUP = "calculator.commands"
+MANIFEST_VERSION = 2
+
+
+class PluginRef():
+    """Reference to a plugin command class that is only imported on first use"""
+    def __init__(  # pylint: disable=too-many-arguments,too-many-positional-arguments
+            self, name: str, value: str, aliases: tuple[str, ...],
+            services: tuple[str, ...] = (), plugin: Command | None = None) -> None:
+        self.name = name
+        self.value = value
+        self.aliases = aliases
+        self.services = services
+        self.plugin = plugin
+
+
+    @classmethod
+    def from_entry_point(cls, entry_point: importlib.metadata.EntryPoint) -> "PluginRef":
+        """Import the plugin behind an entry point and read what it declares"""
+        plugin = entry_point.load()
+        aliases = tuple(getattr(plugin, "ALIASES", ()))
+        services = tuple(getattr(plugin, "SERVICES", ()))
+        return cls(entry_point.name, entry_point.value, aliases, services, plugin)
+
+
+    @property
+    def loaded(self) -> bool:
+        """True once the plugin module has been imported"""
+        return self.plugin is not None
+
+
+    def load(self) -> Command:
+        """Import the plugin if needed and return its command class"""
+        if self.plugin is None:
+            logging.debug(f"Importing plugin {self.name} from {self.value}")
+            entry_point = importlib.metadata.EntryPoint(self.name, self.value, ENTRY_POINT_GROUP)
+            self.plugin = entry_point.load()
+        return self.plugin
+
+
+    def to_dict(self) -> dict:
+        """Serializable form of the reference for the manifest"""
+        return {
+            "name": self.name,
+            "value": self.value,
+            "aliases": list(self.aliases),
+            "services": list(self.services)
+        }
+
+
+    def __repr__(self) -> str:
+        return f"<PluginRef {self.name}={self.value}>"
+
+
+def fingerprint(entry_points: list[importlib.metadata.EntryPoint]) -> list[list]:
+    """Summarize installed plugins so a stale manifest can be detected"""
+    parts = []
+    for ep in entry_points:
+        dist = ep.dist
+        module_name = ep.value.partition(":")[0].strip()
+        try:
+            spec = importlib.util.find_spec(module_name)
+            mtime = os.stat(spec.origin).st_mtime_ns if spec and spec.origin else None
+        except (ImportError, OSError, ValueError):
+            mtime = None
+        parts.append([
+            ep.name,
+            ep.value,
+            dist.name if dist else None,
+            dist.version if dist else None,
+            mtime
+        ])
+    return parts
+
+
+def read_manifest(manifest_path: str, key: list[list]) -> list[PluginRef] | None:
+    """Return the cached plugin references, or None if the manifest is missing or stale"""
+    try:
+        with open(manifest_path, encoding="utf-8") as manifest_file:
+            manifest = json.load(manifest_file)
+    except FileNotFoundError:
+        logging.info(f"No plugin manifest found at {manifest_path}")
+        return None
+    except (OSError, ValueError):
+        logging.warning(f"Unreadable plugin manifest at {manifest_path}, rebuilding", exc_info=True)
+        return None
+
+    if manifest.get("version") != MANIFEST_VERSION or manifest.get("fingerprint") != key:
+        logging.info("Plugin manifest is stale, rebuilding")
+        return None
+
+    return [
+        PluginRef(plugin["name"], plugin["value"], tuple(plugin["aliases"]),
+                  tuple(plugin["services"]))
+        for plugin in manifest["plugins"]
+    ]
+
+
+def write_manifest(manifest_path: str, key: list[list], plugins: list[PluginRef]) -> None:
+    """Persist plugin references, replacing the manifest atomically"""
+    manifest = {
+        "version": MANIFEST_VERSION,
+        "fingerprint": key,
+        "plugins": [plugin.to_dict() for plugin in plugins]
+    }
+    tmp_path = f"{manifest_path}.{os.getpid()}.tmp"
+    try:
+        os.makedirs(os.path.dirname(manifest_path) or ".", exist_ok=True)
+        with open(tmp_path, "w", encoding="utf-8") as manifest_file:
+            json.dump(manifest, manifest_file)
+        os.replace(tmp_path, manifest_path)
+        logging.debug(f"Plugin manifest written to {manifest_path}")
+    except OSError:
+        # the manifest is only a cache, running without it is fine
+        logging.warning(f"Could not write plugin manifest to {manifest_path}", exc_info=True)
+
+
+def discover_plugins(manifest_path: str | None = None) -> list[PluginRef]:
+    """Find plugin commands, importing them only if no valid manifest exists"""
+    entry_points = list(importlib.metadata.entry_points(group=ENTRY_POINT_GROUP))
+    for ep in entry_points:
+        logging.debug(f"Found entry point {ep}")
+
+    if not manifest_path:
+        return [PluginRef.from_entry_point(ep) for ep in entry_points]
+
+    key = fingerprint(entry_points)
+    plugins = read_manifest(manifest_path, key)
+    if plugins is None:
+        plugins = [PluginRef.from_entry_point(ep) for ep in entry_points]
+        write_manifest(manifest_path, key, plugins)
+    return plugins
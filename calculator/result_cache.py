@@ -0,0 +1,98 @@
+"""Module for memoizing the results of pure commands.
+
+Plugins marked PURE always give the same output for the same arguments, so the
+Invoker keeps their outputs in a bounded LRU keyed on the plugin and the argument
+strings. A repeated command is answered from the cache without parsing a single
+Decimal. A command always runs on its arguments as given. For COMMUTATIVE plugins
+an exact result is kept under the sorted arguments instead, so any order of them
+reuses it, but a rounded one is not: Decimal rounds every partial sum or product
+to 28 digits, so its value depends on the order the operands were combined in.
+"""
+
+import os
+from collections import OrderedDict
+
+
+# results kept, RESULT_CACHE_SIZE=0 turns memoization off
+DEFAULT_SIZE = 4096
+# commands with more arguments than this aren't worth hashing and keeping
+MAX_OPERANDS = 256
+
+
+def result_cache_size() -> int:
+    """Number of results memoized"""
+    return int(os.getenv("RESULT_CACHE_SIZE", str(DEFAULT_SIZE)))
+
+
+class ResultCache():
+    """LRU of command outputs with hit, miss and eviction counts"""
+    def __init__(self, max_size: int | None = None) -> None:
+        self.max_size = result_cache_size() if max_size is None else max_size
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+
+    @property
+    def enabled(self) -> bool:
+        """False when RESULT_CACHE_SIZE is 0"""
+        return self.max_size > 0
+
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+
+    @staticmethod
+    def key(plugin, arguments: tuple[str, ...]) -> tuple | None:
+        """Cache key for a command, None if it has too many arguments to memoize"""
+        if len(arguments) > MAX_OPERANDS:
+            return None
+        return (plugin, arguments)
+
+
+    @staticmethod
+    def any_order_key(key: tuple) -> tuple | None:
+        """Key shared by every order of a commutative command's arguments, else None"""
+        plugin, arguments = key
+        if not getattr(plugin, "COMMUTATIVE", False) or len(arguments) < 2:
+            return None
+        return (plugin, tuple(sorted(arguments)))
+
+
+    def get(self, key: tuple, *other_keys: tuple | None):
+        """Memoized output for the first key found, None on a miss"""
+        for candidate in (key, *other_keys):
+            if candidate is not None and candidate in self.entries:
+                self.entries.move_to_end(candidate)
+                self.hits += 1
+                return self.entries[candidate]
+        self.misses += 1
+        return None
+
+
+    def put(self, key: tuple, output) -> None:
+        """Memoize an output, evicting the least recently used one if full"""
+        self.entries[key] = output
+        self.entries.move_to_end(key)
+        if len(self.entries) > self.max_size:
+            self.entries.popitem(last=False)
+            self.evictions += 1
+
+
+    def clear(self) -> None:
+        """Forget every result and reset the counters"""
+        self.entries.clear()
+        self.hits = self.misses = self.evictions = 0
+
+
+    def report(self) -> str:
+        """Hit, miss and eviction counts"""
+        if not self.enabled:
+            return "Result cache is off (RESULT_CACHE_SIZE=0)"
+        lookups = self.hits + self.misses
+        hit_rate = self.hits * 100 / lookups if lookups else 0.0
+        return (f"Result cache: {self.hits} hits, {self.misses} misses"
+                f" ({hit_rate:.1f}% hit rate), {self.evictions} evictions,"
+                f" {len(self.entries)}/{self.max_size} entries")
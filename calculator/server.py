@@ -0,0 +1,203 @@
+"""Module for serving the calculator over TCP or a Unix domain socket.
+
+Clients send newline delimited JSON requests {"id": .., "input": "add 1 2"} and get
+{"id": .., "output": .., "error": ..} back for each one. Requests on a connection
+are pipelined: a client can keep sending while earlier requests run, up to
+SERVE_MAX_IN_FLIGHT at a time, after which the server stops reading from it.
+Commands with long inputs run in a process pool so they can't stall the event loop
+for everyone else, which means their replies can overtake earlier ones; clients
+match replies to requests by id.
+"""
+
+import os
+import json
+import errno
+import socket
+import asyncio
+import logging
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from calculator import batch_pool
+from calculator.exceptions import CLIError
+from calculator.invoker import Invoker
+from calculator.commands.history.history import History
+
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+DEFAULT_MAX_IN_FLIGHT = 64
+# inputs at least this long are run in the process pool
+DEFAULT_OFFLOAD_CHARS = 4096
+# longest request line accepted
+MAX_LINE_BYTES = 16 * 1024 * 1024
+
+
+def reply(request_id, output: str | None = None, error: str | None = None) -> bytes:
+    """Encode one response line"""
+    return json.dumps({"id": request_id, "output": output, "error": error}).encode() + b"\n"
+
+
+def socket_in_use(socket_path: str) -> bool:
+    """Check if something accepts connections on a Unix socket"""
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as probe:
+        try:
+            probe.connect(socket_path)
+        except OSError:
+            return False
+    return True
+
+
+class CalculatorServer():
+    """Answers JSON line requests with a shared Invoker and History"""
+    def __init__(self, invoker: Invoker, history: History, workers: int = 1) -> None:
+        self.invoker = invoker
+        self.history = history
+        self.workers = workers
+        self.max_in_flight = int(os.getenv("SERVE_MAX_IN_FLIGHT", str(DEFAULT_MAX_IN_FLIGHT)))
+        self.offload_chars = int(os.getenv("SERVE_OFFLOAD_CHARS", str(DEFAULT_OFFLOAD_CHARS)))
+        # commands using the shared history or stats must run here, never in the pool
+        self.local_aliases = invoker.aliases_using("history") | invoker.aliases_using("stats")
+        self.executor = None
+
+
+    def _offload(self, text: str) -> bool:
+        """Check if a command is expensive enough to run in the process pool"""
+        if len(text) < self.offload_chars:
+            return False
+        words = text.split(None, 1)
+        return bool(words) and words[0].lower() not in self.local_aliases
+
+
+    async def run_command(self, text: str) -> tuple[str | None, str | None]:
+        """Run one command, returning (output, error)"""
+        if self._offload(text):
+            if self.executor is None:
+                self.executor = ProcessPoolExecutor(self.workers,
+                                                    initializer=batch_pool.init_worker)
+            loop = asyncio.get_running_loop()
+            try:
+                outcomes, histograms = await loop.run_in_executor(
+                    self.executor, batch_pool.run_chunk, [(0, text)], True
+                )
+            except BrokenProcessPool:
+                # a worker died, start a fresh pool for the next long command
+                self.executor.shutdown(wait=False, cancel_futures=True)
+                self.executor = None
+                raise
+            # the worker timed the command, count it alongside the local ones
+            stats = self.invoker.services.get("stats")
+            if stats is not None:
+                stats.merge(histograms)
+            _, output, record, error = outcomes[0]
+        else:
+            try:
+                output, record = batch_pool.execute_line(self.invoker, text, True)
+                error = None
+            except CLIError as exc:
+                output, record, error = None, None, f"{type(exc).__name__}: {exc}"
+
+        if error is None:
+            self.history.add_record(record)
+        return output, error
+
+
+    async def handle_request(self, line: bytes, writer: asyncio.StreamWriter,
+                             in_flight: asyncio.Semaphore) -> None:
+        """Answer one request line and free its in-flight slot"""
+        request_id = None
+        try:
+            request = json.loads(line)
+            request_id = request.get("id")
+            text = request["input"]
+            if not isinstance(text, str) or not text.strip():
+                raise ValueError("input must be a non-empty string")
+            output, error = await self.run_command(text)
+            writer.write(reply(request_id, output, error))
+        except (ValueError, KeyError, AttributeError, TypeError) as exc:
+            logging.info("Bad request", exc_info=True)
+            writer.write(reply(request_id, error=f"Invalid request: {exc}"))
+        except Exception as exc:  # pylint: disable=broad-exception-caught
+            # every request gets exactly one reply, whatever went wrong
+            logging.exception(f"Request {request_id} failed")
+            writer.write(reply(request_id, error=f"{type(exc).__name__}: {exc}"))
+        finally:
+            in_flight.release()
+        try:
+            await writer.drain()
+        except ConnectionError:
+            logging.debug("Client went away before its reply was sent")
+
+
+    async def handle_connection(self, reader: asyncio.StreamReader,
+                                writer: asyncio.StreamWriter) -> None:
+        """Read pipelined requests from one client until it disconnects"""
+        logging.info(f"Client connected: {writer.get_extra_info('peername')}")
+        in_flight = asyncio.Semaphore(self.max_in_flight)
+        tasks = set()
+        try:
+            while True:
+                # backpressure: stop reading while too many requests are running
+                await in_flight.acquire()
+                try:
+                    line = await reader.readline()
+                except (ValueError, ConnectionError):
+                    logging.warning("Dropping client after an unreadable request", exc_info=True)
+                    in_flight.release()
+                    break
+                if not line:
+                    in_flight.release()
+                    break
+                if not line.strip():
+                    in_flight.release()
+                    continue
+                task = asyncio.create_task(self.handle_request(line, writer, in_flight))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+            if tasks:
+                await asyncio.gather(*tasks)
+        finally:
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except ConnectionError:
+                pass
+            logging.info("Client disconnected")
+
+
+    async def serve(self, host: str | None = None, port: int | None = None,
+                    socket_path: str | None = None) -> None:
+        """Listen on a TCP port and/or a Unix socket until cancelled"""
+        if socket_path is not None and os.path.exists(socket_path):
+            if socket_in_use(socket_path):
+                raise OSError(errno.EADDRINUSE, f"Already serving on {socket_path}")
+            # left behind by a server that didn't shut down cleanly
+            os.remove(socket_path)
+
+        servers = []
+        if port is not None:
+            servers.append(await asyncio.start_server(
+                self.handle_connection, host or DEFAULT_HOST, port, limit=MAX_LINE_BYTES
+            ))
+            logging.info(f"Serving on {host or DEFAULT_HOST}:{port}")
+        if socket_path is not None:
+            servers.append(await asyncio.start_unix_server(
+                self.handle_connection, socket_path, limit=MAX_LINE_BYTES
+            ))
+            logging.info(f"Serving on {socket_path}")
+
+        try:
+            await asyncio.gather(*(server.serve_forever() for server in servers))
+        finally:
+            for server in servers:
+                server.close()
+            if socket_path is not None and os.path.exists(socket_path):
+                os.remove(socket_path)
+            self.close()
+
+
+    def close(self) -> None:
+        """Stop the process pool and write out history"""
+        if self.executor is not None:
+            self.executor.shutdown(cancel_futures=True)
+            self.executor = None
+        self.history.close()
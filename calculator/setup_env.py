@@ -4,6 +4,9 @@ import os
 import logging.config
 from pathlib import Path
 from dotenv import load_dotenv
+from calculator.log_queue import start_log_queue
+from calculator.float_backend import BACKENDS
+from calculator.commands.history.history_log import BACKENDS as HISTORY_BACKENDS
 
 
 def setup_env() -> None:
@@ -17,7 +20,20 @@ def setup_env() -> None:
     log_config = base_path / log_config_name
     logs_path = base_path.parent / log_dir_name
     history_path = base_path.parent / os.getenv("HISTORY_DIR_NAME")
-    os.environ["HISTORY_FILE"] = str(history_path / os.getenv("HISTORY_NAME"))
+    # storage for the history log, a CSV file or an SQLite database
+    history_backend = os.getenv("HISTORY_BACKEND", "csv").lower()
+    unknown_history_backend = None
+    if history_backend not in HISTORY_BACKENDS:
+        unknown_history_backend, history_backend = history_backend, "csv"
+    os.environ["HISTORY_BACKEND"] = history_backend
+    history_name = os.getenv("HISTORY_NAME")
+    if history_backend == "sqlite":
+        # don't open an existing CSV history as a database
+        history_name = Path(history_name).with_suffix(".db").name
+    os.environ["HISTORY_FILE"] = str(history_path / history_name)
+    # cache of plugin aliases so plugins are only imported when first used
+    cache_path = base_path.parent / os.getenv("CACHE_DIR_NAME", ".cache")
+    os.environ["PLUGIN_MANIFEST"] = str(cache_path / "plugin_manifest.json")
     os.makedirs(logs_path, exist_ok = True)
     os.makedirs(history_path, exist_ok = True)
 
@@ -29,5 +45,16 @@ def setup_env() -> None:
     log_level_str = os.getenv("LOG_LEVEL", "INFO").upper()
     log_level = getattr(logging, log_level_str, logging.INFO)
     logging.getLogger().setLevel(log_level)
+    # file and console writes happen on a background thread from here on
+    start_log_queue()
+
+    # arithmetic backend used for large operand lists, see calculator.float_backend
+    backend = os.getenv("ARITHMETIC_BACKEND", "decimal").lower()
+    if backend not in BACKENDS:
+        logging.warning(f"Unknown ARITHMETIC_BACKEND {backend}, using decimal")
+        backend = "decimal"
+    os.environ["ARITHMETIC_BACKEND"] = backend
+    if unknown_history_backend:
+        logging.warning(f"Unknown HISTORY_BACKEND {unknown_history_backend}, using csv")
 
     logging.debug("Initialized environment")
@@ -0,0 +1,162 @@
+"""Module for timing the phases of each command.
+
+Every phase (parse, dispatch, validate, execute, history, output) is timed with
+time.perf_counter_ns and recorded in a latency histogram per plugin. Histograms
+use HDR style log-linear buckets: each power of two is split into the same number
+of sub-buckets, so recording is O(1), memory stays a few KB per histogram and any
+percentile is accurate to within about 3%.
+"""
+
+import time
+from collections import defaultdict
+
+
+PHASES = ("parse", "dispatch", "validate", "execute", "history", "output")
+# values below 2 ** SUB_BUCKET_BITS get a bucket each, above that every power of
+# two is split into 2 ** (SUB_BUCKET_BITS - 1) buckets
+SUB_BUCKET_BITS = 6
+SUB_BUCKET_HALF = 1 << (SUB_BUCKET_BITS - 1)
+
+
+def bucket_index(value: int) -> int:
+    """Histogram bucket holding a non-negative value"""
+    if value < 2 * SUB_BUCKET_HALF:
+        return value
+    shift = value.bit_length() - SUB_BUCKET_BITS
+    return shift * SUB_BUCKET_HALF + (value >> shift)
+
+
+def bucket_value(index: int) -> int:
+    """Highest value that falls in a bucket"""
+    if index < 2 * SUB_BUCKET_HALF:
+        return index
+    shift, offset = divmod(index - SUB_BUCKET_HALF, SUB_BUCKET_HALF)
+    return ((offset + SUB_BUCKET_HALF + 1) << shift) - 1
+
+
+def format_ns(value: float) -> str:
+    """Human readable duration"""
+    for unit, scale in (("s", 1e9), ("ms", 1e6), ("µs", 1e3)):
+        if value >= scale:
+            return f"{value / scale:.1f}{unit}"
+    return f"{value:.0f}ns"
+
+
+class LatencyHistogram():
+    """Log-linear histogram of nanosecond latencies"""
+    __slots__ = ("counts", "count", "total", "max")
+
+    def __init__(self) -> None:
+        self.counts = []
+        self.count = 0
+        self.total = 0
+        self.max = 0
+
+
+    def record(self, value: int) -> None:
+        """Add one measurement"""
+        value = max(value, 0)
+        index = bucket_index(value)
+        if index >= len(self.counts):
+            self.counts.extend([0] * (index + 1 - len(self.counts)))
+        self.counts[index] += 1
+        self.count += 1
+        self.total += value
+        self.max = max(self.max, value)
+
+
+    def merge(self, other: "LatencyHistogram") -> None:
+        """Add every measurement of another histogram"""
+        if len(other.counts) > len(self.counts):
+            self.counts.extend([0] * (len(other.counts) - len(self.counts)))
+        for index, count in enumerate(other.counts):
+            self.counts[index] += count
+        self.count += other.count
+        self.total += other.total
+        self.max = max(self.max, other.max)
+
+
+    def percentile(self, percent: float) -> int:
+        """Value at or below which percent of the measurements fall, 0 if there are none"""
+        if self.count == 0:
+            return 0
+        # rank of the measurement asked for, at least the first one
+        rank = max(1, -(-self.count * percent // 100))
+        seen = 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            if seen >= rank:
+                return min(bucket_value(index), self.max)
+        return self.max
+
+
+class Stats():
+    """Phase latency histograms per plugin, shared as the "stats" service"""
+    def __init__(self) -> None:
+        self.histograms = defaultdict(LatencyHistogram)
+        # plugin the phases recorded without one belong to, set by the Invoker
+        self.current = None
+
+
+    @staticmethod
+    def clock() -> int:
+        """Monotonic timestamp in nanoseconds"""
+        return time.perf_counter_ns()
+
+
+    def record(self, phase: str, elapsed_ns: int, command: str | None = None) -> None:
+        """Record one phase of the current, or the given, command"""
+        command = command or self.current
+        if command is not None:
+            self.histograms[(command, phase)].record(elapsed_ns)
+
+
+    def record_command(self, command: str, *phase_ns: int) -> None:
+        """Record the parse, dispatch, validate and execute phases of a command"""
+        self.current = command
+        for phase, elapsed_ns in zip(PHASES, phase_ns):
+            self.histograms[(command, phase)].record(elapsed_ns)
+
+
+    def merge(self, histograms: dict[tuple[str, str], LatencyHistogram]) -> None:
+        """Add histograms recorded elsewhere, e.g. by a batch worker process"""
+        for key, histogram in histograms.items():
+            self.histograms[key].merge(histogram)
+
+
+    def by_phase(self) -> dict[str, LatencyHistogram]:
+        """Histograms of every plugin merged per phase"""
+        merged = defaultdict(LatencyHistogram)
+        for (_, phase), histogram in self.histograms.items():
+            merged[phase].merge(histogram)
+        return merged
+
+
+    def clear(self) -> None:
+        """Forget every measurement"""
+        self.histograms.clear()
+        self.current = None
+
+
+    def report(self) -> str:
+        """Table of p50/p95/p99 per phase for all commands, then per command"""
+        if not self.histograms:
+            return "No commands timed yet"
+        rows = [("command", "phase", "count", "p50", "p95", "p99", "max")]
+        merged = self.by_phase()
+        keys = [("all", phase, merged[phase]) for phase in PHASES if phase in merged]
+        keys += [
+            (command, phase, self.histograms[(command, phase)])
+            for command in sorted({command for command, _ in self.histograms})
+            for phase in PHASES
+            if (command, phase) in self.histograms
+        ]
+        for command, phase, histogram in keys:
+            rows.append((command, phase, str(histogram.count),
+                         *(format_ns(histogram.percentile(p)) for p in (50, 95, 99)),
+                         format_ns(histogram.max)))
+        widths = [max(len(row[i]) for row in rows) for i in range(len(rows[0]))]
+        return "\n".join(
+            "  ".join(cell.ljust(width) for cell, width in zip(row, widths)).rstrip()
+            for row in rows
+        )
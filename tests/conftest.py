@@ -21,6 +21,13 @@ def patch_env_for_tests(monkeypatch, tmp_path):
     """Get a dummy history file to use for all tests"""
     test_history_path = tmp_path / "test_history.csv"
     monkeypatch.setenv("HISTORY_FILE", str(test_history_path))
+    # plugins are loaded eagerly unless a test opts in to the manifest cache
+    monkeypatch.delenv("PLUGIN_MANIFEST", raising=False)
+    monkeypatch.delenv("HISTORY_BACKEND", raising=False)
+    monkeypatch.delenv("HISTORY_ARCHIVE", raising=False)
+    # set rather than deleted so values written by main() are undone after each test
+    monkeypatch.setenv("STREAM_OPERANDS", "1")
+    monkeypatch.setenv("STREAM_STRICT", "0")
 
 
 def gen_rnd_cmd():
@@ -0,0 +1,78 @@
+"""Tests for running batch commands on a process pool."""
+
+import io
+from importlib.metadata import EntryPoint
+from unittest.mock import patch
+import pytest
+from calculator.cli import CLI
+from calculator.plugin_manifest import ENTRY_POINT_GROUP
+
+
+PLUGINS = {
+    "add_plugin": "calculator.commands.add.add:Add",
+    "multiply_plugin": "calculator.commands.multiply.multiply:Multiply",
+    "historyprint_plugin": "calculator.commands.history.history_print:HistoryPrint",
+    "historydelete_plugin": "calculator.commands.history.history_delete:HistoryDelete",
+    "stats_plugin": "calculator.commands.stats.stats:StatsCommand",
+}
+
+
+@pytest.fixture(name="plugin_entry_points", autouse=True)
+def fixture_plugin_entry_points():
+    """Register the real plugins, forked workers inherit the patch"""
+    entry_points = [EntryPoint(name, value, ENTRY_POINT_GROUP) for name, value in PLUGINS.items()]
+    with patch("importlib.metadata.entry_points", return_value=entry_points):
+        yield
+
+
+def run_batch(lines: list[str], **kwargs) -> tuple[CLI, list[str]]:
+    """Run lines through a CLI batch, return the CLI and the output lines"""
+    cli = CLI()
+    sink = io.StringIO()
+    with patch("sys.stderr", new_callable=io.StringIO):
+        cli.run_batch(io.StringIO("".join(f"{line}\n" for line in lines)), sink, **kwargs)
+    return cli, sink.getvalue().splitlines()
+
+
+def test_parallel_output_matches_serial():
+    """Test results come back in input order, skipping failed lines like serial mode"""
+    lines = [f"add {i} {i}" for i in range(500)] + ["add 1 x", "nope 1"]
+    lines += [f"multiply {i} 3" for i in range(500)]
+    cli, serial = run_batch(lines)
+    _, parallel = run_batch(lines, workers=3)
+    assert parallel == serial
+    assert len(parallel) == 1000
+    assert cli.commands_run == 1000
+
+
+def test_unexpected_errors_skip_the_line():
+    """Test a line raising something other than CLIError is skipped like a failed one"""
+    lines = ["add 1 1", "multiply 1e999999 10", "add 2 2"]
+    _, serial = run_batch(lines)
+    _, parallel = run_batch(lines, workers=2)
+    assert serial == parallel == ["2", "4"]
+
+
+@patch("calculator.batch_pool.DEFAULT_CHUNK_LINES", 7)
+def test_parallel_history_is_deterministic():
+    """Test sampled history is merged in input order whatever the chunking"""
+    lines = [f"add {i} 0" for i in range(100)]
+    cli, _ = run_batch(lines, workers=2, history_policy="sample", sample_every=10)
+    assert list(cli.history.history["output"]) == ["59", "69", "79", "89", "99"]
+
+
+def test_history_commands_run_in_order():
+    """Test history commands run in the parent after the lines before them"""
+    lines = ["add 1 0", "add 2 0", "delete 0", "add 3 0", "exit", "add 4 0"]
+    cli, output = run_batch(lines, workers=2, history_policy="bulk")
+    assert output == ["1", "2", "Deleted", "3"]
+    assert cli.commands_run == 4
+
+
+def test_parallel_stats_cover_worker_lines():
+    """Test worker timings are merged so stats in the batch sees every line before it"""
+    lines = [f"add {i} 1" for i in range(20)] + ["stats"]
+    cli, output = run_batch(lines, workers=2)
+    assert "No commands timed yet" not in output
+    assert cli.stats.histograms[("Add", "execute")].count == 20
+    assert any(line.split()[:3] == ["Add", "execute", "20"] for line in output)
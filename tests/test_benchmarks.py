@@ -0,0 +1,122 @@
+"""Unit tests for the benchmark harness and its command line."""
+
+import os
+import json
+from importlib.metadata import EntryPoint
+from unittest.mock import patch
+import pytest
+from benchmarks import harness, suites
+from benchmarks.__main__ import main
+
+
+ADD_PLUGIN = EntryPoint("add_plugin", "calculator.commands.add.add:Add", "calculator.commands")
+HISTORY_PLUGIN = EntryPoint("historyprint_plugin",
+                            "calculator.commands.history.history_print:HistoryPrint",
+                            "calculator.commands")
+
+
+def result(p50_ns: int) -> dict:
+    """Benchmark result with a given median"""
+    return {"calls": 10, "ops_per_call": 1, "mean_ns": p50_ns, "p50_ns": p50_ns,
+            "p95_ns": p50_ns, "p99_ns": p50_ns, "max_ns": p50_ns, "ops_per_sec": 1e9 / p50_ns}
+
+
+def test_measure_calls_setup_before_every_call():
+    """Test a case is warmed up, set up before each call and timed at least min_calls times."""
+    calls = []
+    case = harness.Case(lambda: calls.append("run"), before=lambda: calls.append("before"),
+                        ops=4, min_calls=5)
+    measured = harness.measure(case, min_time_s=0)
+    assert measured["calls"] == 5
+    assert calls == ["before", "run"] * 6
+    assert measured["ops_per_call"] == 4
+    assert 0 <= measured["p50_ns"] <= measured["p99_ns"] <= measured["max_ns"]
+    assert measured["ops_per_sec"] > 0
+
+
+def test_measure_cold_case_skips_warmup():
+    """Test a case without warmup is only called for the timed calls."""
+    calls = []
+    harness.measure(harness.Case(lambda: calls.append(1), warmup=False, min_calls=2), 0)
+    assert len(calls) == 2
+
+
+def test_compare_flags_regressions_beyond_threshold():
+    """Test only benchmarks slower than the threshold are regressions."""
+    baseline = {"fast": result(1000), "same": result(1000), "slow": result(1000),
+                "gone": result(1000)}
+    current = {"fast": result(500), "same": result(1050), "slow": result(1200),
+               "added": result(1000)}
+    rows = {row["name"]: row for row in harness.compare(baseline, current, threshold=10)}
+    assert list(rows) == ["fast", "same", "slow", "gone", "added"]
+    assert rows["fast"]["change"] == pytest.approx(-50)
+    assert not rows["same"]["regression"]
+    assert rows["slow"]["regression"]
+    assert rows["gone"]["current"] is None and not rows["gone"]["regression"]
+    assert rows["added"]["baseline"] is None and not rows["added"]["regression"]
+
+
+def test_results_round_trip(tmp_path):
+    """Test saved results load back with the environment they were taken in."""
+    path = tmp_path / "baseline.json"
+    harness.save_results(str(path), {"parse/2": result(100)})
+    assert harness.load_results(str(path)) == {"parse/2": result(100)}
+    assert json.loads(path.read_text())["meta"]["python"]
+
+
+def test_all_benchmarks_limits_operand_counts():
+    """Test --max-operands leaves out the larger operand counts."""
+    names = [name for name, _ in suites.all_benchmarks(max_operands=100)]
+    assert "add/100" in names and "divide/2" in names
+    assert "add/1000" not in names and "parse/1000000" not in names
+    assert "history_add/sqlite/10000" in names and "startup" in names
+    assert len(names) == len(set(names))
+
+
+@pytest.mark.parametrize("command", suites.ARITHMETIC_COMMANDS)
+def test_gen_operands_are_safe_for_large_counts(command):
+    """Test generated operands are repeatable and never zero."""
+    operands = suites.gen_operands(command, 1000)
+    assert operands == suites.gen_operands(command, 1000)
+    assert all(float(operand) != 0 for operand in operands)
+
+
+def test_history_env_restores_environment(monkeypatch):
+    """Test benchmarks get a scratch history and leave the environment as it was."""
+    monkeypatch.setenv("HISTORY_SIZE", "7")
+    with suites.history_env(100, "sqlite") as history_file:
+        assert os.environ["HISTORY_SIZE"] == "100"
+        assert os.environ["HISTORY_FILE"] == history_file
+        assert history_file.endswith(".db")
+    assert os.environ["HISTORY_SIZE"] == "7"
+    assert "HISTORY_BACKEND" not in os.environ
+
+
+@patch("importlib.metadata.entry_points")
+def test_run_and_compare(mock_entry_points, tmp_path, capsys):
+    """Test the command line runs the selected benchmarks and compares saved runs."""
+    mock_entry_points.return_value = [ADD_PLUGIN, HISTORY_PLUGIN]
+    baseline = tmp_path / "baseline.json"
+    assert main(["run", "--filter", "add/2", "--filter", "history_print/csv/5",
+                 "--min-time", "0", "--out", str(baseline)]) == 0
+    assert set(harness.load_results(str(baseline))) == {"add/2", "history_print/csv/5"}
+    assert "add/2" in capsys.readouterr().out
+
+    assert main(["compare", str(baseline), str(baseline)]) == 0
+    slower = tmp_path / "slower.json"
+    harness.save_results(str(slower), {
+        name: {**measured, "p50_ns": measured["p50_ns"] * 2 + 1}
+        for name, measured in harness.load_results(str(baseline)).items()
+    })
+    assert main(["compare", str(baseline), str(slower), "--threshold", "50"]) == 1
+    assert "REGRESSION" in capsys.readouterr().out
+
+
+@patch("importlib.metadata.entry_points")
+def test_run_reports_missing_plugins(mock_entry_points, capsys):
+    """Test a benchmark whose plugin isn't registered fails without stopping the run."""
+    mock_entry_points.return_value = []
+    assert main(["run", "--filter", "add/2", "--filter", "parse/2", "--min-time", "0"]) == 1
+    captured = capsys.readouterr()
+    assert "add/2 failed: MissingCommandError" in captured.err
+    assert "parse/2" in captured.out
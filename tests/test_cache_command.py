@@ -0,0 +1,44 @@
+"""Tests for the cache command plugin."""
+
+import pytest
+from calculator.command_input import CommandInput
+from calculator.commands.cache.cache import CacheCommand
+from calculator.commands.cache.exceptions import InvalidCacheArguments
+from calculator.result_cache import ResultCache
+
+
+@pytest.fixture(name="result_cache")
+def fixture_result_cache():
+    """Result cache with one hit."""
+    result_cache = ResultCache(10)
+    result_cache.put("key", "3")
+    result_cache.get("key")
+    return result_cache
+
+
+def test_in_scope():
+    """Test the cache command is matched."""
+    assert CacheCommand.in_scope(CommandInput("cache"))
+    assert not CacheCommand.in_scope(CommandInput("cached"))
+
+
+def test_validate_rejects_arguments(result_cache):
+    """Test only clear is accepted as an argument."""
+    CacheCommand(CommandInput("cache"), result_cache).validate()
+    CacheCommand(CommandInput("cache clear"), result_cache).validate()
+    with pytest.raises(InvalidCacheArguments):
+        CacheCommand(CommandInput("cache all"), result_cache).validate()
+
+
+def test_execute_prints_counters(result_cache):
+    """Test the counters of the shared cache are the output."""
+    output = CacheCommand(CommandInput("cache"), result_cache).execute().output
+    assert "1 hits" in output
+    assert "1/10 entries" in output
+
+
+def test_clear(result_cache):
+    """Test cache clear empties the cache."""
+    output = CacheCommand(CommandInput("cache clear"), result_cache).execute().output
+    assert output == "Result cache cleared"
+    assert len(result_cache) == 0
@@ -1,10 +1,12 @@
 """Module for testing CLI class"""
 
+import io
+import re
 from unittest.mock import patch, MagicMock
 import pytest
 from calculator.cli import CLI
 from calculator.command_input import CommandInput
-from calculator.command_output import CommandOutput
+from calculator.command_output import CommandOutput, StreamedOutput
 from calculator.exceptions import CLIExit, CLIError
 
 
@@ -26,6 +28,9 @@ def test_check_for_exit_does_nothing():
     """Test CLI exit doesn't raise on non exit input"""
     cli = CLI()
     cli._check_for_exit(CommandInput("add"))  # pylint: disable=protected-access
+    # commands that merely start like an exit command are not one
+    for command in ("eval", "expr", "quotient"):
+        cli._check_for_exit(CommandInput(command))  # pylint: disable=protected-access
 
 
 @patch("calculator.cli.pprintrd", return_value="1 second")
@@ -35,7 +40,9 @@ def test_print_exit_msg(mock_pprintrd):  # pylint: disable=unused-argument,prote
     cli.commands_run = 1
     with patch("builtins.print") as mock_print:
         cli._print_exit_msg()  # pylint: disable=protected-access
-    mock_print.assert_called_once_with("Ran 1 command in 1 second")
+    mock_print.assert_called_once()
+    assert re.fullmatch(r"Ran 1 command in 1 second \([\d,.]+ commands/sec\)",
+                        mock_print.call_args.args[0])
 
 
 @patch("calculator.cli.pprintrd", return_value="42 seconds")
@@ -68,6 +75,23 @@ def test_cli_runs_one_command_and_exits(monkeypatch):
     assert any("Ran 1 command in" in str(call) for call in mock_print.call_args_list)
 
 
+def test_cli_prints_streamed_output_line_by_line(monkeypatch):
+    """Test streamed output is printed a line at a time and recorded by its size"""
+    cli = CLI()
+    inputs = iter(["history --limit 2", "exit"])
+    monkeypatch.setattr("builtins.input", lambda _: next(inputs))
+    cli.invoker.execute_command = MagicMock(
+        return_value=CommandOutput(StreamedOutput(iter(["row 1", "row 2"])))
+    )
+
+    with patch("builtins.print") as mock_print:
+        cli.start()
+
+    printed_values = [str(call.args[0]) for call in mock_print.call_args_list]
+    assert printed_values[:2] == ["row 1", "row 2"]
+    assert cli.history.ring.record(cli.history.ring.slots()[-1])["output"] == "(2 lines)"
+
+
 def test_cli_handles_clierror_and_continues(monkeypatch):
     """Test errors"""
     cli = CLI()
@@ -95,3 +119,96 @@ def test_cli_quits_on_keyboard_interrupt(monkeypatch):
         cli.start()
 
     assert any("Ran 0 command" in str(call) for call in mock_print.call_args_list)
+
+
+def test_cli_flushes_history_on_exit(monkeypatch, tmp_path):
+    """Test buffered history is written out when the CLI exits"""
+    history_file = tmp_path / "history.csv"
+    monkeypatch.setenv("HISTORY_FILE", str(history_file))
+    monkeypatch.setenv("HISTORY_FLUSH_INTERVAL_MS", "60000")
+    cli = CLI()
+
+    inputs = iter(["add 2 3", "exit"])
+    monkeypatch.setattr("builtins.input", lambda _: next(inputs))
+    cli.invoker.execute_command = MagicMock(return_value=CommandOutput("5"))
+
+    with patch("builtins.print"):
+        cli.start()
+
+    rows = history_file.read_text().splitlines()[1:]
+    assert len(rows) == 1
+    assert "add 2 3" in rows[0]
+    assert not cli.history.pending
+
+
+def test_cli_shares_history_with_plugins():
+    """Test the history plugins get the History the CLI records to"""
+    cli = CLI()
+    assert cli.invoker.services["history"] is cli.history
+
+
+def run_batch(lines: str, **kwargs) -> tuple[CLI, str, str]:
+    """Run a batch through a CLI with stub commands, return it with stdout and stderr"""
+    cli = CLI()
+    cli.invoker.execute_command = lambda cmd: CommandOutput(cmd.input_string.upper())
+    sink = io.StringIO()
+    with patch("sys.stderr", new_callable=io.StringIO) as stderr:
+        cli.run_batch(io.StringIO(lines), sink, **kwargs)
+    return cli, sink.getvalue(), stderr.getvalue()
+
+
+def test_run_batch_writes_results_in_order():
+    """Test batch mode runs every line and keeps the summary out of the results"""
+    cli, out, err = run_batch("add 1 2\n\nsub 3 4\nexit\nmul 5 6\n")
+    assert out == "ADD 1 2\nSUB 3 4\n"
+    assert cli.commands_run == 2
+    assert "Ran 2 commands in" in err
+    assert "commands/sec" in err
+
+
+def test_run_batch_skips_errors():
+    """Test a failing line is logged and the batch carries on"""
+    cli = CLI()
+    cli.invoker.execute_command = MagicMock(side_effect=[CLIError, CommandOutput("ok")])
+    sink = io.StringIO()
+    with patch("sys.stderr", new_callable=io.StringIO), patch("logging.info") as mock_log:
+        cli.run_batch(io.StringIO("bad\nadd 1 1\n"), sink)
+    assert sink.getvalue() == "ok\n"
+    mock_log.assert_any_call("Batch line 1 failed", exc_info=True)
+
+
+def test_run_batch_chunks_output():
+    """Test results are written in chunks rather than per line"""
+    sink = MagicMock()
+    cli = CLI()
+    cli.invoker.execute_command = lambda cmd: CommandOutput("1")
+    with patch("sys.stderr", new_callable=io.StringIO):
+        cli.run_batch(io.StringIO("add 1 0\n" * 3000), sink)
+    assert sink.write.call_count == 3
+
+
+@pytest.mark.parametrize("policy, expected", [
+    ("off", []),
+    ("sample", ["ADD 3", "ADD 6", "ADD 9"]),
+    ("bulk", ["ADD 5", "ADD 6", "ADD 7", "ADD 8", "ADD 9"])
+])
+def test_run_batch_history_policies(policy, expected):
+    """Test each history policy records the expected commands"""
+    lines = "".join(f"add {i}\n" for i in range(1, 10))
+    cli, _, _ = run_batch(lines, history_policy=policy, sample_every=3)
+    assert list(cli.history.history["output"]) == expected
+
+
+def test_cli_times_output_and_history(monkeypatch):
+    """Test the CLI records output and history phases for the command it ran"""
+    cli = CLI()
+    inputs = iter(["add 2 3", "exit"])
+    monkeypatch.setattr("builtins.input", lambda _: next(inputs))
+    cli.invoker.execute_command = MagicMock(return_value=CommandOutput("5"))
+    cli.stats.current = "Add"
+
+    with patch("builtins.print"):
+        cli.start()
+
+    assert cli.stats.histograms[("Add", "output")].count == 1
+    assert cli.stats.histograms[("Add", "history")].count == 1
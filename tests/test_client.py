@@ -0,0 +1,149 @@
+"""Tests for the thin calculator daemon client."""
+
+import io
+import sys
+import json
+import socket
+import asyncio
+import threading
+import subprocess
+from pathlib import Path
+from importlib.metadata import EntryPoint
+from unittest.mock import patch
+import pytest
+from calculator import client
+from calculator.invoker import Invoker
+from calculator.plugin_manifest import ENTRY_POINT_GROUP
+from calculator.server import CalculatorServer
+from calculator.commands.history.history import History
+
+
+@pytest.fixture(name="socket_path")
+def fixture_socket_path(tmp_path):
+    """Short socket path, Unix socket paths are limited to about 100 characters"""
+    return str(tmp_path / "c.sock")
+
+
+@pytest.fixture(name="start_server")
+def fixture_start_server():
+    """Returns a function starting a daemon stand-in on a background event loop"""
+    entry_points = [EntryPoint("add_plugin", "calculator.commands.add.add:Add", ENTRY_POINT_GROUP)]
+    loop = asyncio.new_event_loop()
+    thread = threading.Thread(target=loop.run_forever, daemon=True)
+    thread.start()
+
+    def start(socket_path: str) -> None:
+        with patch("importlib.metadata.entry_points", return_value=entry_points):
+            history = History()
+            server = CalculatorServer(Invoker({"history": history}), history)
+        coroutine = server.serve(socket_path=socket_path)
+        asyncio.run_coroutine_threadsafe(coroutine, loop)
+
+    yield start
+
+    async def shutdown():
+        """Cancel the daemons and let them clean up before the loop stops"""
+        tasks = asyncio.all_tasks() - {asyncio.current_task()}
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    asyncio.run_coroutine_threadsafe(shutdown(), loop).result(10)
+    loop.call_soon_threadsafe(loop.stop)
+    thread.join()
+    loop.close()
+
+
+def test_default_socket_path(monkeypatch):
+    """Test CALCULATOR_SOCKET overrides the per-user socket"""
+    monkeypatch.delenv("CALCULATOR_SOCKET", raising=False)
+    monkeypatch.setenv("XDG_RUNTIME_DIR", "/run/user/1000")
+    assert client.default_socket_path().startswith("/run/user/1000/calculator-")
+    monkeypatch.setenv("CALCULATOR_SOCKET", "/tmp/calc.sock")
+    assert client.default_socket_path() == "/tmp/calc.sock"
+
+
+def test_run_prints_replies_in_order(start_server, socket_path):
+    """Test commands are answered in order with errors on stderr"""
+    stdout, stderr = io.StringIO(), io.StringIO()
+    with patch("calculator.client.start_daemon", side_effect=start_server) as mock_start:
+        status = client.run(["add 1 2", "nope", "add 2 2"], socket_path, stdout, stderr)
+        mock_start.assert_called_once_with(socket_path)
+        # the second call finds the daemon already running
+        assert client.run(["add 5 5"], socket_path, stdout, stderr) == 0
+        mock_start.assert_called_once()
+    assert status == 1
+    assert stdout.getvalue() == "3\n4\n10\n"
+    assert stderr.getvalue().startswith("MissingCommandError")
+
+
+def test_many_stdin_lines(start_server, socket_path):
+    """Test a long stream of commands doesn't deadlock against unread replies"""
+    start_server(socket_path)
+    stdout = io.StringIO()
+    lines = (f"add {i} 1" for i in range(5000))
+    assert client.run(lines, socket_path, stdout, io.StringIO()) == 0
+    assert stdout.getvalue().split() == [str(i + 1) for i in range(5000)]
+
+
+def answer_some(listener: socket.socket, replies: dict) -> None:
+    """Daemon stand-in reading every request, answering the ids in replies, then hanging up"""
+    conn, _ = listener.accept()
+    with conn, conn.makefile("r", encoding="utf-8") as requests:
+        for _ in requests:
+            pass
+        for request_id, (output, error) in replies.items():
+            reply = {"id": request_id, "output": output, "error": error}
+            conn.sendall(json.dumps(reply).encode() + b"\n")
+
+
+def test_missing_replies_fail_the_run(socket_path):
+    """Test replies parked behind a missing one are printed and the missing id reported"""
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as listener:
+        listener.bind(socket_path)
+        listener.listen()
+        replies = {3: (None, "Overflow: boom"), 0: ("a", None), 2: ("c", None)}
+        daemon = threading.Thread(target=answer_some, args=(listener, replies))
+        daemon.start()
+        stdout, stderr = io.StringIO(), io.StringIO()
+        status = client.run(["add 1 1"] * 5, socket_path, stdout, stderr)
+        daemon.join()
+    assert status == 1
+    assert stdout.getvalue() == "a\nc\n"
+    assert stderr.getvalue() == "Overflow: boom\ncalc: no reply to 2 requests, ids 1, 4\n"
+
+
+def test_daemon_start_timeout(socket_path):
+    """Test the client gives up if the daemon never starts listening"""
+    with patch("calculator.client.start_daemon"):
+        with pytest.raises(ConnectionError):
+            client.connect_or_start(socket_path, timeout=0.1)
+
+
+def test_main_forwards_argv(monkeypatch):
+    """Test argv is sent as a single command"""
+    monkeypatch.setenv("CALCULATOR_SOCKET", "/tmp/calc.sock")
+    with patch("calculator.client.run", return_value=0) as mock_run:
+        assert client.main(["add", "1", "2"]) == 0
+    mock_run.assert_called_once_with(["add 1 2"], "/tmp/calc.sock")
+
+
+def test_main_reports_connection_errors():
+    """Test a daemon that can't be reached gives exit status 2"""
+    with patch("calculator.client.run", side_effect=ConnectionError("down")), \
+         patch("sys.stderr", new_callable=io.StringIO) as stderr:
+        assert client.main(["add", "1", "2"]) == 2
+    assert "down" in stderr.getvalue()
+
+
+def test_client_imports_nothing_heavy():
+    """Test importing the client leaves dotenv, pandas and the plugins alone"""
+    loaded = subprocess.run(
+        [sys.executable, "-c",
+         "import sys, calculator.client; print(' '.join(sorted(sys.modules)))"],
+        capture_output=True, text=True, check=True, cwd=Path(__file__).resolve().parents[1]
+    ).stdout.split()
+    assert "calculator.client" in loaded
+    heavy = [m for m in loaded if m.split(".")[0] in ("pandas", "numpy", "dotenv", "asyncio")
+             or m in ("calculator.invoker", "calculator.setup_env", "logging.config")]
+    assert not heavy
@@ -1,8 +1,12 @@
 """Base Command class test module."""
 
+from decimal import Decimal
+from unittest.mock import patch
 import pytest
 from calculator.command_input import CommandInput
 from calculator.command import Command
+from calculator.commands.add.add import Add
+from calculator.commands.add.exceptions import InvalidAdditionArguments
 
 
 class DummyCommand(Command):
@@ -30,3 +34,21 @@ def test_dummy_plugin_behavior():
 
     with pytest.raises(NotImplementedError):
         plugin.execute()  # pylint: disable=useless-parent-delegation
+
+
+def test_operands_parsed_once_for_validate_and_execute():
+    """validate() and execute() share a single conversion of the arguments"""
+    plugin = Add(CommandInput("add 1 2 3.5"))
+    with patch.object(Add, "parse_operands", wraps=plugin.parse_operands) as mock_parse:
+        plugin.validate()
+        output = plugin.execute()
+    mock_parse.assert_called_once()
+    assert plugin.operands == [Decimal("1"), Decimal("2"), Decimal("3.5")]
+    assert str(output) == "6.5"
+
+
+def test_operand_errors_raised_without_validate():
+    """Plugin specific errors still surface if execute() parses the operands"""
+    with pytest.raises(InvalidAdditionArguments) as exc:
+        Add(CommandInput("add 1 x 2 y")).execute()
+    assert "['x', 'y']" in str(exc.value)
@@ -1,5 +1,8 @@
 """Test CommandInput with a random set of commands and arguments."""
 
+import datetime
+from unittest.mock import patch
+import pytest
 from calculator.command_input import CommandInput
 
 
@@ -12,3 +15,49 @@ def test_command_input_with_random_cli_commands(cli_input):
     for i in range(1, cli_input["num_args"] + 1):
         assert parsed_command.args[f"argument_{i}"] == \
             cli_input["args"][f"argument_{i}"], f"arg{i}"
+
+
+def test_command_input_keeps_arguments_in_a_tuple():
+    """Test arguments are stored positionally with no per-instance dict"""
+    parsed_command = CommandInput("add 1 2 3")
+    assert parsed_command.arguments == ("1", "2", "3")
+    assert not hasattr(parsed_command, "__dict__")
+    assert parsed_command.args.values() is parsed_command.arguments
+
+
+def test_command_input_args_view():
+    """Test the args view behaves like the old argument_N dict, read-only"""
+    args = CommandInput("add 1 2").args
+    assert dict(args) == {"argument_1": "1", "argument_2": "2"}
+    assert len(args) == 2
+    assert "argument_2" in args
+    for missing in ("argument_3", "argument_0", "argument_01", "other", 1):
+        assert missing not in args
+    with pytest.raises(KeyError):
+        _ = args["argument_3"]
+    with pytest.raises(TypeError):
+        args["argument_1"] = "5"  # pylint: disable=unsupported-assignment-operation
+
+
+def test_command_input_args_setter():
+    """Test assigning a dict replaces the arguments in order"""
+    parsed_command = CommandInput("delete")
+    parsed_command.args = {"argument_1": "4", "extra": "5"}
+    assert parsed_command.num_args == 2
+    assert parsed_command.args["argument_2"] == "5"
+
+
+def test_command_input_time():
+    """Test time is the wall clock reading the command was entered at"""
+    entered = datetime.datetime(2025, 3, 30, 2, 30, 15)
+    with patch("time.time_ns", return_value=int(entered.timestamp()) * 10 ** 9):
+        parsed_command = CommandInput("add 1 2")
+    assert parsed_command.time == entered
+    # the monotonic stamp for durations never runs backwards, whatever the wall clock does
+    assert CommandInput("add 1 2").timestamp_ns >= parsed_command.timestamp_ns
+
+
+def test_command_input_empty():
+    """Test a blank line has no command"""
+    with pytest.raises(StopIteration):
+        CommandInput("   ")
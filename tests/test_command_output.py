@@ -1,7 +1,7 @@
 """Test CommandOutput with a random set of output strings."""
 
 import datetime
-from calculator.command_output import CommandOutput
+from calculator.command_output import CommandOutput, StreamedOutput
 
 
 def test_command_output_with_random_strings(cli_input):
@@ -11,3 +11,15 @@ def test_command_output_with_random_strings(cli_input):
     assert isinstance(parsed_output.time, datetime.datetime)
     assert len(parsed_output.get_stats()) != 0
     assert len(str(parsed_output)) != 0
+
+
+def test_streamed_output():
+    """Test a streamed output prints line by line, or joined when read as a string"""
+    assert list(CommandOutput("5").lines()) == ["5"]
+    streamed = CommandOutput(StreamedOutput(iter(["a", "b"])))
+    assert list(streamed.lines()) == ["a", "b"]
+    # the lines are gone once printed
+    assert str(streamed) == "(2 lines)"
+    joined = CommandOutput(StreamedOutput(iter(["a", "b"])))
+    assert str(joined) == "a\nb"
+    assert str(joined) == "a\nb"
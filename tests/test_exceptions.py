@@ -29,6 +29,7 @@ from calculator.commands.history.exceptions import (
     InvalidHistoryPrintArguments,
     InvalidHistoryClearArguments,
     InvalidHistoryDeleteArguments,
+    InvalidHistoryDeleteId,
     InvalidHistoryDeleteIndex
 )
 from calculator.command_input import CommandInput
@@ -166,7 +167,7 @@ def test_history_print_invalid_args_error():
     error = InvalidHistoryPrintArguments()
 
     assert isinstance(error, CLIError)
-    assert "history print takes no arguments" in str(error)
+    assert "Invalid history arguments (unexpected argument)" in str(error)
 
 
 def test_history_clear_invalid_args_error():
@@ -182,7 +183,7 @@ def test_history_delete_invalid_args_error():
     error = InvalidHistoryDeleteArguments()
 
     assert isinstance(error, CLIError)
-    assert "history delete takes 1 argument (index)" in str(error)
+    assert "delete takes indices like 3, 3,7,9 or 10-500" in str(error)
 
 
 def test_history_clear_invalid_index_error():
@@ -191,3 +192,11 @@ def test_history_clear_invalid_index_error():
 
     assert isinstance(error, CLIError)
     assert "Deletion index must be between 0 and len(history) - 1" in str(error)
+
+
+def test_history_delete_unknown_id_error():
+    """Test history delete unknown ID exception"""
+    error = InvalidHistoryDeleteId(42)
+
+    assert isinstance(error, CLIError)
+    assert "No retained history record has ID 42" in str(error)
@@ -0,0 +1,99 @@
+"""Tests for the eval plugin and its expression compiler"""
+
+from decimal import Decimal
+import pytest
+from calculator.command_input import CommandInput
+from calculator.commands.expression import compiler
+from calculator.commands.expression.expression import Expression
+from calculator.commands.expression.exceptions import (
+    ExpressionArithmeticError,
+    InvalidExpression,
+    MissingExpression
+)
+
+
+def evaluate(text: str) -> str:
+    """Run eval on an expression and return its output"""
+    command = Expression(CommandInput(f"eval {text}"))
+    command.validate()
+    return command.execute().output
+
+
+@pytest.mark.parametrize("cmd", ["eval", "EVAL", "expr", "Expression", "="])
+def test_valid_command_strings(cmd):
+    """Verify expected strings are accepted by regex"""
+    assert Expression.in_scope(CommandInput(cmd))
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("(3.5 + 4) * 2 / 7 - 1", str((Decimal("3.5") + 4) * 2 / 7 - 1)),
+    ("1 + 2 * 3", "7"),
+    ("(1 + 2) * 3", "9"),
+    ("10 - 4 - 3", "3"),
+    ("2 ** 3 ** 2", "512"),
+    ("-2 ** 2", "-4"),
+    ("2 ** -1", "0.5"),
+    ("--3", "3"),
+    ("7 // 2", "3"),
+    ("-7 // 2", "-3"),
+    ("-7 % 3", "-1"),
+    ("1e3 + .5", "1000.5"),
+    ("2*(3+4)*-1", "-14"),
+    ("0.1 + 0.2", "0.3")
+])
+def test_evaluation(text, expected):
+    """Verify precedence, associativity and Decimal semantics"""
+    assert evaluate(text) == expected
+
+
+@pytest.mark.parametrize("text, position", [
+    ("(1 + 2", 6),
+    ("1 2", 2),
+    ("1 +", 3),
+    ("3 $ 4", 2),
+    (")", 0),
+    ("1 + * 2", 4)
+])
+def test_invalid_expressions(text, position):
+    """Verify syntax errors are raised by validate with their position"""
+    with pytest.raises(InvalidExpression) as error:
+        Expression(CommandInput(f"eval {text}")).validate()
+    assert error.value.position == position
+
+
+def test_missing_expression():
+    """Verify eval without an expression is caught"""
+    with pytest.raises(MissingExpression):
+        Expression(CommandInput("eval")).validate()
+
+
+@pytest.mark.parametrize("text", ["1 / 0", "1 / (2 - 2)", "0 / 0", "(-8) ** 0.5"])
+def test_arithmetic_errors(text):
+    """Verify failing operations are reported when the expression runs"""
+    command = Expression(CommandInput(f"eval {text}"))
+    command.validate()
+    with pytest.raises(ExpressionArithmeticError):
+        command.execute()
+
+
+def test_deep_nesting():
+    """Verify deeply nested input is rejected instead of crashing"""
+    with pytest.raises(InvalidExpression):
+        compiler.compile_expression("(" * 10000 + "1" + ")" * 10000)
+
+
+def test_constant_folding():
+    """Verify operations on constants are done while parsing"""
+    assert compiler.Parser(compiler.tokenize("(3.5 + 4) * 2")).parse() == Decimal(15)
+    # dividing by 0 is left for the evaluator to report
+    tree = compiler.Parser(compiler.tokenize("2 * 1 / 0")).parse()
+    assert isinstance(tree, tuple) and tree[1] == Decimal(2)
+
+
+def test_evaluator_cache():
+    """Verify the same expression, however spaced, is only compiled once"""
+    evaluator = compiler.compile_expression("40 +  2")
+    hits = compiler.cache_info().hits
+    assert compiler.compile_expression(" 40 + 2 ") is evaluator
+    assert compiler.cache_info().hits == hits + 1
+    assert evaluator() == 42
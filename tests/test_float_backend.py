@@ -0,0 +1,117 @@
+"""Tests for the float64 arithmetic backend."""
+
+from decimal import Decimal
+import pytest
+from calculator import float_backend
+from calculator.command_input import CommandInput
+from calculator.commands.add.add import Add
+from calculator.commands.subtract.subtract import Subtract
+from calculator.commands.multiply.multiply import Multiply
+from calculator.commands.divide.divide import Divide
+from calculator.commands.add.exceptions import InvalidAdditionArguments
+from calculator.commands.divide.exceptions import DivisionZeroArgument
+
+
+@pytest.fixture(name="float_mode")
+def fixture_float_mode(monkeypatch):
+    """Select the float backend for every operand count"""
+    monkeypatch.setenv("ARITHMETIC_BACKEND", "float")
+    monkeypatch.setenv("FLOAT_BACKEND_MIN_OPERANDS", "2")
+
+
+def run(plugin, input_string):
+    """Validate and execute a plugin on an input line"""
+    command = plugin(CommandInput(input_string))
+    command.validate()
+    return str(command.execute())
+
+
+def test_backend_disabled_by_default(monkeypatch):
+    """The Decimal path is used unless the float backend is selected"""
+    monkeypatch.delenv("ARITHMETIC_BACKEND", raising=False)
+    assert not float_backend.enabled(10**6)
+    assert Add(CommandInput("add 1 2")).float_operands is None
+
+
+def test_backend_threshold(monkeypatch):
+    """Small operand lists stay on Decimal even in float mode"""
+    monkeypatch.setenv("ARITHMETIC_BACKEND", "float")
+    monkeypatch.setenv("FLOAT_BACKEND_MIN_OPERANDS", "5")
+    assert not float_backend.enabled(4)
+    assert float_backend.enabled(5)
+
+
+@pytest.mark.parametrize("tokens", [
+    ["1", "2.5", "-.5", "+3."],
+    ["123456789012345", "-0.00000000000001"]
+])
+def test_parse_float_safe_tokens(tokens):
+    """Plain decimals with up to 15 digits convert to a float64 array"""
+    values = float_backend.parse_operands(tokens)
+    assert values.tolist() == [float(token) for token in tokens]
+
+
+@pytest.mark.parametrize("tokens", [
+    ["1", "1234567890123456"],
+    ["1", "0.1234567890123456"],
+    ["1", "1e5"],
+    ["1", "NaN"],
+    ["1", "abc"],
+    ["1", "1.2.3"]
+])
+def test_parse_falls_back_to_decimal(tokens):
+    """Too precise, exponent, special and malformed tokens are left to Decimal"""
+    assert float_backend.parse_operands(tokens) is None
+
+
+@pytest.mark.usefixtures("float_mode")
+@pytest.mark.parametrize("plugin,input_string,expected", [
+    (Add, "add 0.1 0.2 0.3", "0.6"),
+    (Add, "add 1 2 3", "6"),
+    (Subtract, "sub 10 0.5 2.25 7", "0.25"),
+    (Multiply, "mult 1.5 4 -2", "-12"),
+    (Divide, "div 1 4 5", "0.05")
+])
+def test_float_results(plugin, input_string, expected):
+    """Float reductions give correctly rounded results"""
+    assert run(plugin, input_string) == expected
+
+
+@pytest.mark.usefixtures("float_mode")
+def test_float_sum_is_compensated():
+    """Summation doesn't accumulate rounding error like a naive loop would"""
+    args = " ".join(["0.1"] * 10)
+    assert run(Add, f"add {args}") == "1"
+
+
+@pytest.mark.usefixtures("float_mode")
+def test_precise_inputs_use_decimal():
+    """Inputs a double can't hold fall back to exact Decimal arithmetic"""
+    assert run(Add, "add 0.1000000000000000001 0.2") == "0.3000000000000000001"
+
+
+@pytest.mark.usefixtures("float_mode")
+def test_overflow_falls_back_to_decimal():
+    """A product beyond the float64 range is recomputed with Decimal"""
+    args = " ".join(["999999999999999"] * 30)
+    expected = Decimal(1)
+    for _ in range(30):
+        expected *= Decimal("999999999999999")
+    assert run(Multiply, f"mult {args}") == str(expected)
+
+
+@pytest.mark.usefixtures("float_mode")
+def test_underflow_falls_back_to_decimal():
+    """A product that underflows to zero is recomputed with Decimal"""
+    args = " ".join(["0.000000000001"] * 30)
+    assert run(Multiply, f"mult {args}") == "1E-360"
+    assert run(Divide, f"div 1 {args}") == "1E+360"
+
+
+@pytest.mark.usefixtures("float_mode")
+def test_float_mode_keeps_validation_errors():
+    """Argument errors are the plugin's own exceptions in float mode too"""
+    with pytest.raises(InvalidAdditionArguments):
+        run(Add, "add 1 x")
+    with pytest.raises(DivisionZeroArgument):
+        run(Divide, "div 1 2 0")
@@ -1,10 +1,13 @@
 """Unit tests for the History module."""
 
 import os
-from unittest.mock import Mock
+import time
+import multiprocessing
+from unittest.mock import Mock, patch
 import pytest
-from calculator.commands.history.history import History, HISTORY_SIZE
-from calculator.commands.history.exceptions import HistoryOverflow
+from calculator.commands.history import history_log
+from calculator.commands.history.history import History, HISTORY_SIZE, read_history
+from calculator.commands.history.history_ring import HistoryRing
 from calculator.command_input import CommandInput
 from calculator.command_output import CommandOutput
 
@@ -35,46 +38,6 @@ def test_initial_state(history_instance):
     assert history_instance.history.empty
 
 
-def test_add_row_to_history(history_instance, command_pair):
-    """Test adding a single row to history."""
-    cmd_in, cmd_out = command_pair
-    row = History.form_history_record(cmd_in, cmd_out)
-    history_instance.add_row(row)
-    assert len(history_instance.history) == 1
-    assert history_instance.history.iloc[0]["command"] == "add"
-
-
-def test_overflow_error_on_add_row(history_instance, command_pair):
-    """Test that HistoryOverflow is raised after max size."""
-    cmd_in, cmd_out = command_pair
-    row = History.form_history_record(cmd_in, cmd_out)
-    for _ in range(HISTORY_SIZE):
-        history_instance.add_row(row)
-    with pytest.raises(HistoryOverflow):
-        history_instance.add_row(row)
-
-
-def test_overwrite_row(history_instance, command_pair):
-    """Test that overwriting a row works."""
-    cmd_in, cmd_out = command_pair
-    row = History.form_history_record(cmd_in, cmd_out)
-    history_instance.add_row(row)
-
-    updated_output = CommandOutput("999")
-    new_row = History.form_history_record(cmd_in, updated_output)
-    history_instance.overwrite_row(0, new_row)
-
-    assert history_instance.history.iloc[0]["output"] == "999"
-
-
-def test_overwrite_row_invalid_index(history_instance, command_pair):
-    """Test that invalid index raises HistoryOverflow."""
-    cmd_in, cmd_out = command_pair
-    row = History.form_history_record(cmd_in, cmd_out)
-    with pytest.raises(HistoryOverflow):
-        history_instance.overwrite_row(HISTORY_SIZE, row)
-
-
 def test_add_method_rolls_over(history_instance, command_pair):
     """Test add() rolls over to start when full."""
     cmd_in, cmd_out = command_pair
@@ -100,68 +63,312 @@ def test_save_and_load_persistence(temp_history_path, command_pair):
     assert str(h2.history.iloc[0]["output"]) == "3"
 
 
-def test_add_overwrites_and_increments_index(history_instance, command_pair):
-    """Test that add() overwrites current index and increments it (first overwrite block)."""
-    cmd_in, cmd_out = command_pair
-    for _ in range(HISTORY_SIZE):
-        history_instance.add(cmd_in, cmd_out)
-    history_instance.cur_index = 2
-    history_instance.load_history = lambda: None  # prevent reset
-    history_instance.add(cmd_in, cmd_out)
-    assert history_instance.cur_index == 3
+def test_add_overwrites_at_cur_index(history_instance, command_pair):
+    """Ensure add() overwrites the slot at cur_index once history is full."""
+    cmd_in, _ = command_pair
+    for i in range(HISTORY_SIZE):
+        history_instance.add(cmd_in, CommandOutput(str(i)))
 
+    with patch.object(HistoryRing, "push", autospec=True,
+                      side_effect=HistoryRing.push) as mock_push:
+        history_instance.add(cmd_in, CommandOutput("new"))
 
-def test_add_executes_first_overwrite_block_only(history_instance, command_pair):
-    """Ensure add() hits only the first overwrite block."""
-    cmd_in, cmd_out = command_pair
-    row = History.form_history_record(cmd_in, cmd_out)
+    mock_push.assert_called_once()
+    assert history_instance.ring.outputs[0] == "new"
+    assert history_instance.cur_index == 1
 
-    for _ in range(HISTORY_SIZE):
-        history_instance.add_row(row)
 
-    history_instance.cur_index = 2
-    history_instance.load_history = lambda: None  # prevent reset
+def test_add_wraps_after_last_slot(history_instance, command_pair):
+    """Test that add() moves back to the first slot after writing the last one."""
+    cmd_in, _ = command_pair
+    for i in range(2 * HISTORY_SIZE - 1):
+        history_instance.add(cmd_in, CommandOutput(str(i)))
+    assert history_instance.cur_index == HISTORY_SIZE - 1
 
-    original_overwrite = history_instance.overwrite_row
-    mock = Mock(wraps=original_overwrite)
+    history_instance.add(cmd_in, CommandOutput("last"))
 
-    def side_effect(index, row):
-        if index != 2:
-            raise AssertionError("Should not hit fallback overwrite block.")
-        return original_overwrite(index, row)
+    assert history_instance.ring.outputs[HISTORY_SIZE - 1] == "last"
+    assert history_instance.cur_index == 0
+    assert list(history_instance.history["output"])[-1] == "last"
 
-    mock.side_effect = side_effect
-    history_instance.overwrite_row = mock
 
-    history_instance.add(cmd_in, cmd_out)
+def read_log(path):
+    """Return the data rows of a history log file"""
+    return path.read_text().splitlines()[1:]
 
-    mock.assert_called_once_with(2, History.form_history_record(cmd_in, cmd_out))
-    assert history_instance.cur_index == 3
 
+def test_add_appends_without_rewriting(history_instance, temp_history_path, command_pair):
+    """Test add() appends one row per command and never reloads the file."""
+    cmd_in, cmd_out = command_pair
+    history_instance.load_history = Mock(side_effect=AssertionError("no reload expected"))
+    for _ in range(3):
+        history_instance.add(cmd_in, cmd_out)
+    history_instance.flush()
+    rows = read_log(temp_history_path)
+    assert [row.split(",")[0] for row in rows] == ["0", "1", "2"]
+
+
+def test_log_is_compacted_periodically(history_instance, temp_history_path, command_pair):
+    """Test the log only grows to twice the retained size before compaction."""
+    cmd_in, _ = command_pair
+    for i in range(4 * HISTORY_SIZE + 1):
+        history_instance.add(cmd_in, CommandOutput(str(i)))
+        assert len(read_log(temp_history_path)) < 2 * HISTORY_SIZE
+
+    # closing hands back the unused IDs, so the next History carries on from them
+    history_instance.close()
+    reloaded = History()
+    assert list(reloaded.history["output"]) == [
+        str(i) for i in range(3 * HISTORY_SIZE + 1, 4 * HISTORY_SIZE + 1)
+    ]
+    reloaded.add(cmd_in, CommandOutput("next"))
+    assert reloaded.ids()[-1] == 4 * HISTORY_SIZE + 1
+    reloaded.close()
+
+
+def test_reload_keeps_newest_in_order(temp_history_path, command_pair):
+    """Test a reload rolls over from the oldest retained record."""
+    cmd_in, _ = command_pair
+    h1 = History()
+    for i in range(HISTORY_SIZE + 2):
+        h1.add(cmd_in, CommandOutput(str(i)))
 
-def test_add_triggers_fallback_overwrite(history_instance, command_pair):
-    """Test that add() triggers fallback overwrite block."""
+    h2 = History()
+    assert list(h2.history["output"]) == [str(i) for i in range(2, HISTORY_SIZE + 2)]
+    assert h2.cur_index == 0
+    h2.add(cmd_in, CommandOutput("new"))
+    h2.flush()
+    assert h2.history.iloc[-1]["output"] == "new"
+    assert h2.history.iloc[0]["output"] == "3"
+    assert len(read_log(temp_history_path)) == HISTORY_SIZE + 3
+
+
+def test_append_after_file_removed(history_instance, temp_history_path, command_pair):
+    """Test appending recreates the log with a header if it was cleared."""
     cmd_in, cmd_out = command_pair
-    record = History.form_history_record(cmd_in, cmd_out)
+    os.remove(temp_history_path)
+    history_instance.add(cmd_in, cmd_out)
+    history_instance.flush()
+    assert temp_history_path.read_text().startswith(",command,input,output")
+    assert len(History().history) == 1
 
-    for _ in range(HISTORY_SIZE):
-        history_instance.add_row(record)
 
-    original = history_instance.overwrite_row
-    calls = []
+def wait_for(condition, timeout=5.0):
+    """Poll until condition() is true or the timeout expires"""
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            return False
+        time.sleep(0.01)
+    return True
 
-    def flaky_overwrite(index, row):
-        calls.append(index)
-        if len(calls) == 1:
-            raise HistoryOverflow
-        return original(index, row)
 
-    history_instance.cur_index = 4
-    history_instance.overwrite_row = flaky_overwrite
-    history_instance.load_history = lambda: None  # prevent reset
+@pytest.fixture(name="buffered_history")
+def fixture_buffered_history(monkeypatch, temp_history_path):
+    """History that only flushes when told to or after 4 records"""
+    _ = temp_history_path
+    monkeypatch.setenv("HISTORY_FLUSH_INTERVAL_MS", "60000")
+    monkeypatch.setenv("HISTORY_FLUSH_EVERY", "4")
+    history = History()
+    yield history
+    history.close()
 
-    history_instance.add(cmd_in, cmd_out)
 
-    assert calls == [4, 0]
-    assert history_instance.cur_index == 0
-    assert history_instance.history.iloc[0]["command"] == "add"
+def test_add_buffers_records(buffered_history, temp_history_path, command_pair):
+    """Test add() leaves disk I/O to the flusher."""
+    cmd_in, cmd_out = command_pair
+    buffered_history.add(cmd_in, cmd_out)
+    assert len(buffered_history.pending) == 1
+    assert not read_log(temp_history_path)
+    assert len(buffered_history.history) == 1
+
+
+def test_record_count_wakes_flusher(buffered_history, temp_history_path, command_pair):
+    """Test the background thread flushes once enough records are buffered."""
+    cmd_in, cmd_out = command_pair
+    for _ in range(4):
+        buffered_history.add(cmd_in, cmd_out)
+    assert wait_for(lambda: len(read_log(temp_history_path)) == 4)
+    assert buffered_history.pending == []
+
+
+def test_interval_flushes(monkeypatch, temp_history_path, command_pair):
+    """Test the background thread flushes on its interval."""
+    monkeypatch.setenv("HISTORY_FLUSH_INTERVAL_MS", "10")
+    monkeypatch.setenv("HISTORY_FLUSH_EVERY", "1000")
+    history = History()
+    history.add(*command_pair)
+    assert wait_for(lambda: len(read_log(temp_history_path)) == 1)
+    history.close()
+
+
+def test_zero_interval_writes_through(monkeypatch, temp_history_path, command_pair):
+    """Test a flush interval of 0 writes every record immediately."""
+    monkeypatch.setenv("HISTORY_FLUSH_INTERVAL_MS", "0")
+    history = History()
+    history.add(*command_pair)
+    assert len(read_log(temp_history_path)) == 1
+    assert history.writer._flusher is None  # pylint: disable=protected-access
+
+
+def test_close_flushes_and_stops(buffered_history, temp_history_path, command_pair):
+    """Test close() writes buffered records and stops the flusher thread."""
+    buffered_history.add(*command_pair)
+    flusher = buffered_history.writer._flusher  # pylint: disable=protected-access
+    buffered_history.close()
+    assert not flusher.is_alive()
+    assert len(read_log(temp_history_path)) == 1
+    buffered_history.add(*command_pair)
+    assert len(read_log(temp_history_path)) == 2
+
+
+def test_readers_see_buffered_records(buffered_history, temp_history_path, command_pair):
+    """Test reading the log flushes records other History objects have buffered."""
+    buffered_history.add(*command_pair)
+    assert len(read_history(str(temp_history_path))) == 1
+
+
+def test_history_size_env(temp_history_path, monkeypatch, command_pair):
+    """Test that HISTORY_SIZE configures how many records are retained."""
+    _ = temp_history_path
+    monkeypatch.setenv("HISTORY_SIZE", "2")
+    history = History()
+    for _ in range(4):
+        history.add(*command_pair)
+    assert len(history.history) == 2
+    history.close()
+    assert len(History().history) == 2
+
+
+def test_wraparound_keeps_newest(history_instance, command_pair):
+    """Test the ring keeps the newest records after wrapping around more than once."""
+    cmd_in, _ = command_pair
+    for i in range(3 * HISTORY_SIZE + 2):
+        history_instance.add(cmd_in, CommandOutput(str(i)))
+    expected = [str(i) for i in range(2 * HISTORY_SIZE + 2, 3 * HISTORY_SIZE + 2)]
+    assert list(history_instance.history["output"]) == expected
+
+
+def test_refresh_skips_unchanged_log(history_instance, command_pair, monkeypatch):
+    """Test that refresh doesn't read a log nobody else changed."""
+    history_instance.add(*command_pair)
+    history_instance.flush()
+    store = history_instance.store
+    monkeypatch.setattr(store, "read_tail", Mock(side_effect=AssertionError("reloaded")))
+    monkeypatch.setattr(store, "read_appended", Mock(side_effect=AssertionError("read")))
+    assert not history_instance.refresh()
+    history_instance.add(*command_pair)
+    assert not history_instance.refresh()
+    assert len(history_instance) == 2
+
+
+def test_refresh_reads_appended_rows(temp_history_path, command_pair, monkeypatch):
+    """Test that rows another writer appended are read without reloading the log."""
+    _ = temp_history_path
+    monkeypatch.setenv("HISTORY_FLUSH_INTERVAL_MS", "0")
+    reader, other = History(), History()
+    reader.add(CommandInput("add 2 2"), CommandOutput("4"))
+    other.add(*command_pair)
+    other.add(CommandInput("add 3 3"), CommandOutput("6"))
+    with patch.object(reader.store, "read_tail", side_effect=AssertionError("reloaded")):
+        assert reader.refresh()
+    assert list(reader.history["output"]) == ["4", "3", "6"]
+    assert not reader.refresh()
+
+    # a write landing after someone else's can't tell their rows from its own
+    other.add(*command_pair)
+    reader.add(CommandInput("add 4 4"), CommandOutput("8"))
+    assert reader.refresh()
+    assert list(reader.history["output"]) == ["4", "3", "6", "3", "8"]
+
+
+def test_refresh_reloads_rewritten_log(temp_history_path, command_pair, monkeypatch):
+    """Test that a log replaced by another writer is read again."""
+    _ = temp_history_path
+    monkeypatch.setenv("HISTORY_FLUSH_INTERVAL_MS", "0")
+    reader, other = History(), History()
+    for i in range(3):
+        other.add(command_pair[0], CommandOutput(str(i)))
+    assert reader.refresh()
+    other.delete_ids(other.ids()[:1])
+    assert reader.refresh()
+    assert list(reader.history["output"]) == ["1", "2"]
+    other.clear()
+    assert reader.refresh()
+    assert reader.history.empty
+
+
+def test_delete_ids_tombstones_records(history_instance, temp_history_path):
+    """Test records are deleted by ID with tombstones and physically dropped on compaction."""
+    for i in range(4):
+        history_instance.add(CommandInput(f"add {i} 0"), CommandOutput(str(i)))
+    ids = history_instance.ids()
+    with patch.object(history_log, "replace_rows", side_effect=AssertionError("rewritten")):
+        assert history_instance.delete_ids([ids[0], ids[2], 99]) == 2
+    assert list(history_instance.history["output"]) == ["1", "3"]
+    assert history_instance.ids() == [ids[1], ids[3]]
+    rows = history_log.read_rows(str(temp_history_path))
+    assert sum(map(history_log.is_tombstone, rows)) == 2
+    assert list(History().history["output"]) == ["1", "3"]
+    history_instance.save_history()
+    assert [row[3] for row in history_log.read_rows(str(temp_history_path))] == ["1", "3"]
+
+
+def test_refresh_reads_tombstones(temp_history_path, command_pair, monkeypatch):
+    """Test that records another writer deleted are dropped without reloading the log."""
+    _ = temp_history_path
+    monkeypatch.setenv("HISTORY_FLUSH_INTERVAL_MS", "0")
+    reader, other = History(), History()
+    for i in range(3):
+        other.add(command_pair[0], CommandOutput(str(i)))
+    assert reader.refresh()
+    other.delete_ids(other.ids()[:2])
+    with patch.object(reader.store, "read_tail", side_effect=AssertionError("reloaded")):
+        assert reader.refresh()
+    assert list(reader.history["output"]) == ["2"]
+
+
+@pytest.mark.parametrize("backend", ["csv", "sqlite"])
+def test_refresh_sees_rows_written_alongside(tmp_path, monkeypatch, backend):
+    """Test a record another writer adds while this one writes is not hidden by its signature."""
+    monkeypatch.setenv("HISTORY_FILE", str(tmp_path / "history.db"))
+    monkeypatch.setenv("HISTORY_BACKEND", backend)
+    monkeypatch.setenv("HISTORY_FLUSH_INTERVAL_MS", "0")
+    reader, other = History(), History()
+    reader.add(CommandInput("add 1 0"), CommandOutput("1"))
+    assert not reader.refresh()
+    append = reader.store.append
+
+    def append_after_other(rows):
+        other.add(CommandInput("add 2 0"), CommandOutput("2"))
+        append(rows)
+
+    with patch.object(reader.store, "append", side_effect=append_after_other):
+        reader.add(CommandInput("add 3 0"), CommandOutput("3"))
+    assert reader.refresh()
+    assert sorted(reader.history["output"]) == ["1", "2", "3"]
+    reader.close()
+    other.close()
+
+
+def add_records(writer: int, count: int) -> None:
+    """Record commands in a History of this process's own"""
+    history = History()
+    for number in range(count):
+        history.add(CommandInput(f"add {writer} {number}"), CommandOutput(str(number)))
+    history.close()
+
+
+def test_calculators_share_a_log(temp_history_path, monkeypatch):
+    """Test records from several calculators writing one log at once all reach it."""
+    monkeypatch.setenv("HISTORY_SIZE", "1000")
+    monkeypatch.setenv("HISTORY_FLUSH_EVERY", "8")
+    context = multiprocessing.get_context("fork")
+    writers = [context.Process(target=add_records, args=(writer, 100)) for writer in range(4)]
+    for writer in writers:
+        writer.start()
+    for writer in writers:
+        writer.join(60)
+        assert writer.exitcode == 0
+    inputs = [row[2] for row in history_log.read_rows(str(temp_history_path))]
+    assert sorted(inputs) == sorted(f"add {w} {n}" for w in range(4) for n in range(100))
@@ -0,0 +1,151 @@
+"""Unit tests for the segmented history archive."""
+
+import datetime
+from unittest.mock import patch
+import pandas as pd
+import pytest
+from calculator.command_input import CommandInput
+from calculator.command_output import CommandOutput
+from calculator.commands.history import history_archive, history_log
+from calculator.commands.history.history import History
+from calculator.commands.history.history_archive import HistoryArchive, open_archive
+from calculator.commands.history.history_clear import HistoryClear
+from calculator.commands.history.history_print import HistoryPrint
+from calculator.commands.history.history_ring import datetime_to_ns
+from calculator.commands.history.exceptions import InvalidHistoryPrintArguments
+
+
+START = datetime.datetime(2025, 1, 1, 12, 0, 0)
+
+
+def make_row(seq: int) -> list:
+    """Build a log row a minute after the previous one, every fourth a divide"""
+    time = START + datetime.timedelta(minutes=seq)
+    command = "divide" if seq % 4 == 3 else "add"
+    record = {
+        "command": command,
+        "input": f"{command} {seq} 1",
+        "output": str(seq),
+        "start_time": time,
+        "end_time": time
+    }
+    return history_log.format_row(seq, record)
+
+
+@pytest.fixture(name="archive", params=["gzip", "lzma"])
+def fixture_archive(request, tmp_path):
+    """Archive with segments of four records holding records 0 to 9."""
+    archive = HistoryArchive(str(tmp_path / "history.csv"), request.param, 4)
+    archive.add([make_row(seq) for seq in range(6)])
+    archive.add([make_row(seq) for seq in range(6, 10)])
+    return archive
+
+
+@pytest.mark.parametrize("value, compression", [
+    ("", None), ("off", None), ("zip", None), ("gzip", "gzip"), ("lzma", "lzma")
+])
+def test_open_archive(monkeypatch, tmp_path, value, compression):
+    """Test HISTORY_ARCHIVE selects the compression or turns archiving off."""
+    monkeypatch.setenv("HISTORY_ARCHIVE", value)
+    monkeypatch.setenv("HISTORY_SEGMENT_ROWS", "16")
+    archive = open_archive(str(tmp_path / "history.csv"))
+    if compression is None:
+        assert archive is None
+    else:
+        assert (archive.compression, archive.segment_rows) == (compression, 16)
+
+
+def test_segments_are_sealed(archive):
+    """Test full segments are compressed with summaries and the rest stay active."""
+    summaries = archive.summaries()
+    assert [summary["rows"] for summary in summaries] == [4, 4]
+    assert summaries[1]["first_ns"] == datetime_to_ns(START + datetime.timedelta(minutes=4))
+    assert summaries[1]["last_ns"] == datetime_to_ns(START + datetime.timedelta(minutes=7))
+    assert summaries[0]["commands"] == {"add": 3, "divide": 1}
+    segment = pd.read_csv(f"{archive.directory}/{summaries[0]['file']}", index_col=0)
+    assert list(segment.index) == [0, 1, 2, 3]
+    assert [row[0] for row in history_archive.read_segment(archive.active_file)] == ["8", "9"]
+    assert [int(row[0]) for row in archive.select()] == list(range(10))
+    assert [int(row[0]) for row in archive.select(newest_first=True)] == list(range(9, -1, -1))
+
+
+def test_select_opens_matching_segments(archive):
+    """Test a query only decompresses the segments its summary says can match."""
+    since = datetime_to_ns(START + datetime.timedelta(minutes=5))
+    until = datetime_to_ns(START + datetime.timedelta(minutes=7))
+    with patch.object(history_archive, "read_segment",
+                      side_effect=history_archive.read_segment) as mock_read:
+        assert [row[0] for row in archive.select(since_ns=since, until_ns=until)] == ["5", "6"]
+    opened = [call.args[0] for call in mock_read.call_args_list]
+    # the active segment is unsealed, so it is always read
+    assert opened == [archive.active_file,
+                      f"{archive.directory}/{archive.summaries()[1]['file']}"]
+
+    with patch.object(history_archive, "read_segment",
+                      side_effect=history_archive.read_segment) as mock_read:
+        assert [row[0] for row in archive.select("subtract")] == []
+    assert [call.args[0] for call in mock_read.call_args_list] == [archive.active_file]
+
+
+def test_clear_removes_segments(archive):
+    """Test clearing drops every archived record."""
+    archive.clear()
+    assert archive.summaries() == []
+    assert not list(archive.select())
+
+
+def test_cleared_archive_reads_new_summaries(tmp_path):
+    """Test segments sealed after a clear are found, even on the old summary's inode."""
+    archive = HistoryArchive(str(tmp_path / "history.csv"), "gzip", 2)
+    for _ in range(5):
+        archive.add([make_row(seq) for seq in (0, 1)])
+        assert len(list(archive.select("add"))) == 2
+        archive.clear()
+        archive.add([make_row(seq) for seq in (3, 7)])
+        assert [row[1] for row in archive.select("divide")] == ["divide", "divide"]
+        archive.clear()
+    cached = history_archive._summaries  # pylint: disable=protected-access
+    assert not any(key[0].startswith(archive.directory) for key in cached)
+
+
+def history_lines(history: History, options: str) -> list[str]:
+    """Streamed lines of a history command."""
+    plugin = HistoryPrint(CommandInput(f"history {options}"), history)
+    plugin.validate()
+    return list(plugin.execute().output)
+
+
+@pytest.mark.parametrize("backend", ["csv", "sqlite"])
+def test_history_archives_rolled_out_records(monkeypatch, tmp_path, backend):
+    """Test records rolling out are archived and found by history --archived."""
+    monkeypatch.setenv("HISTORY_FILE", str(tmp_path / "history.db"))
+    monkeypatch.setenv("HISTORY_BACKEND", backend)
+    monkeypatch.setenv("HISTORY_ARCHIVE", "gzip")
+    monkeypatch.setenv("HISTORY_SEGMENT_ROWS", "3")
+    monkeypatch.setenv("HISTORY_SIZE", "2")
+    monkeypatch.setenv("HISTORY_FLUSH_INTERVAL_MS", "0")
+    history = History()
+    for i in range(12):
+        history.add(CommandInput(f"add {i} 0"), CommandOutput(str(i)))
+        if i == 2:
+            # deleted records are never archived
+            history.delete_ids(history.ids()[:1])
+
+    lines = history_lines(history, "--archived")
+    assert [line.rsplit(" = ", 1)[1] for line in lines] == \
+        ["0", "2", "3", "4", "5", "6", "7", "8", "9", "10", "11"]
+    assert [line.split()[0] for line in lines[-3:]] == ["-", "0", "1"]
+    assert history.archive.summaries()
+    tail = history_lines(history, "--archived --tail 3 --offset 1")
+    assert [line.rsplit(" = ", 1)[1] for line in tail] == ["8", "9", "10"]
+
+    HistoryClear(CommandInput("clear"), history).execute()
+    assert not list(history.archive.select())
+    history.close()
+
+
+def test_archived_needs_archive(monkeypatch, tmp_path):
+    """Test --archived is rejected when nothing is archived."""
+    monkeypatch.setenv("HISTORY_FILE", str(tmp_path / "history.csv"))
+    with pytest.raises(InvalidHistoryPrintArguments):
+        HistoryPrint(CommandInput("history --archived"), History()).validate()
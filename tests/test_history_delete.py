@@ -5,9 +5,11 @@ import pytest
 
 from calculator.command_input import CommandInput
 from calculator.command_output import CommandOutput
+from calculator.commands.history.history import History, read_history
 from calculator.commands.history.history_delete import HistoryDelete
 from calculator.commands.history.exceptions import (
     InvalidHistoryDeleteArguments,
+    InvalidHistoryDeleteId,
     InvalidHistoryDeleteIndex,
 )
 
@@ -76,19 +78,6 @@ def test_validate_out_of_bounds(monkeypatch, tmp_path):
         plugin.validate()
 
 
-def test_delete_history_row(monkeypatch, tmp_path):
-    """Test delete_history() removes a row and shifts the others."""
-    history_file = history_file_with_data(tmp_path)
-    monkeypatch.setenv("HISTORY_FILE", str(history_file))
-    cmd = CommandInput("delete")
-    cmd.args = {"argument_1": "0"}
-    plugin = HistoryDelete(cmd)
-    plugin.delete_history(0)
-    result = pd.read_csv(history_file, index_col=0)
-    assert len(result) == 1
-    assert "add 1 2" not in result["input"].values
-
-
 def test_execute_method(monkeypatch, tmp_path):
     """Test the execute() method deletes and returns output."""
     history_file = history_file_with_data(tmp_path)
@@ -101,14 +90,104 @@ def test_execute_method(monkeypatch, tmp_path):
     assert output.output == "Deleted"
 
 
-def test_load_history_file_not_found(monkeypatch, tmp_path):
-    """Test load_history raises if the history file does not exist."""
+def test_missing_history_file_is_empty(monkeypatch, tmp_path):
+    """Test a missing history file means there is nothing to delete."""
     fake_path = tmp_path / "missing.csv"
     monkeypatch.setenv("HISTORY_FILE", str(fake_path))
     cmd = CommandInput("delete")
     cmd.args = {"argument_1": "0"}
-    with pytest.raises(FileNotFoundError):
-        HistoryDelete(cmd)
+    plugin = HistoryDelete(cmd)
+    with pytest.raises(InvalidHistoryDeleteIndex):
+        plugin.validate()
+
+
+def test_shared_history_service(monkeypatch, tmp_path):
+    """Test deleting through an injected History updates it in place."""
+    history_file = history_file_with_data(tmp_path)
+    monkeypatch.setenv("HISTORY_FILE", str(history_file))
+    history = History()
+    history.add(CommandInput("multiply 2 3"), CommandOutput("6"))
+    cmd = CommandInput("delete")
+    cmd.args = {"argument_1": "1"}
+    plugin = HistoryDelete(cmd, history=history)
+    assert plugin.history is history
+    plugin.validate()
+    plugin.execute()
+    assert list(history.history["output"]) == ["3", "6"]
+    assert list(read_history(str(history_file))["output"]) == ["3", "6"]
+    history.close()
+
+
+@pytest.fixture(name="filled_history")
+def fixture_filled_history(monkeypatch, tmp_path):
+    """History of ten records, every third one a divide, with IDs 0 to 9."""
+    monkeypatch.setenv("HISTORY_FILE", str(tmp_path / "history.csv"))
+    monkeypatch.setenv("HISTORY_SIZE", "20")
+    history = History()
+    for i in range(10):
+        command = "divide" if i % 3 == 0 else "add"
+        history.add(CommandInput(f"{command} {i} 1"), CommandOutput(str(i)))
+    yield history
+    history.close()
+
+
+@pytest.mark.parametrize("arguments, remaining", [
+    ("2-5", [0, 1, 6, 7, 8, 9]),
+    ("0,1", [2, 3, 4, 5, 6, 7, 8, 9]),
+    ("3,7,9", [0, 1, 2, 4, 5, 6, 8]),
+    ("1,8-9 4", [0, 2, 3, 5, 6, 7]),
+    ("--command DIVIDE", [1, 2, 4, 5, 7, 8]),
+    ("0 --command=divide", [1, 2, 4, 5, 7, 8]),
+    ("--command mul", list(range(10))),
+    ("--id 4", [0, 1, 2, 3, 5, 6, 7, 8, 9]),
+    ("--id=2-4,9", [0, 1, 5, 6, 7, 8])
+])
+def test_bulk_selections(filled_history, arguments, remaining):
+    """Test ranges, lists, --command and --id select records numbered before the delete."""
+    plugin = HistoryDelete(CommandInput(f"delete {arguments}"), filled_history)
+    plugin.validate()
+    deleted = 10 - len(remaining)
+    expected = "Deleted" if deleted == 1 else f"Deleted {deleted} records"
+    assert plugin.execute().output == expected
+    assert list(filled_history.history["output"]) == [str(i) for i in remaining]
+
+
+@pytest.mark.parametrize("arguments, error", [
+    ("5-2", InvalidHistoryDeleteArguments),
+    ("1,,2", InvalidHistoryDeleteArguments),
+    ("-1", InvalidHistoryDeleteArguments),
+    ("--colour red", InvalidHistoryDeleteArguments),
+    ("--id", InvalidHistoryDeleteArguments),
+    ("8-10", InvalidHistoryDeleteIndex),
+    ("--id 42", InvalidHistoryDeleteId)
+])
+def test_bad_selections(filled_history, arguments, error):
+    """Test bad selections are rejected before anything is deleted."""
+    with pytest.raises(error):
+        HistoryDelete(CommandInput(f"delete {arguments}"), filled_history).validate()
+    assert len(filled_history) == 10
+
+
+@pytest.mark.parametrize("backend", ["csv", "sqlite"])
+def test_delete_by_id_spares_other_writers(monkeypatch, tmp_path, backend):
+    """Test calculators sharing history give records distinct IDs, so a delete removes one."""
+    monkeypatch.setenv("HISTORY_FILE", str(tmp_path / "history.db"))
+    monkeypatch.setenv("HISTORY_BACKEND", backend)
+    monkeypatch.setenv("HISTORY_FLUSH_INTERVAL_MS", "0")
+    first, second = History(), History()
+    first.add(CommandInput("add 1 2"), CommandOutput("3"))
+    second.add(CommandInput("subtract 5 3"), CommandOutput("2"))
+    first.refresh()
+    assert len(set(first.ids())) == 2
+
+    plugin = HistoryDelete(CommandInput("delete 0"), first)
+    plugin.validate()
+    assert plugin.execute().output == "Deleted"
+    assert list(first.history["output"]) == ["2"]
+    second.refresh()
+    assert list(second.history["output"]) == ["2"]
+    first.close()
+    second.close()
 
 
 # Local fixture helper for use in test bodies
@@ -0,0 +1,187 @@
+"""Unit tests for the append-only history log helpers."""
+
+import datetime
+import multiprocessing
+import pandas as pd
+from calculator.commands.history import history_log
+
+
+# stress test: writer processes, rows each writer appends, rows deleted meanwhile
+WRITERS = 4
+ROWS_PER_WRITER = 200
+DELETED_ROWS = 20
+
+
+def make_row(seq: int) -> list:
+    """Build a log row with a given sequence number"""
+    time = datetime.datetime(2025, 1, 1, 12, 0, 0)
+    record = {
+        "command": "add",
+        "input": f"add {seq} 0",
+        "output": str(seq),
+        "start_time": time,
+        "end_time": time
+    }
+    return history_log.format_row(seq, record)
+
+
+def test_timestamps_always_include_microseconds():
+    """Test rows format times uniformly so pandas parses them consistently."""
+    row = make_row(0)
+    assert row[4] == "2025-01-01 12:00:00.000000"
+
+
+def test_append_writes_header_once(tmp_path):
+    """Test the header is only written for a new file."""
+    path = tmp_path / "history.csv"
+    history_log.append_rows(str(path), [make_row(0)])
+    history_log.append_rows(str(path), [make_row(1), make_row(2)])
+    lines = path.read_text().splitlines()
+    assert lines[0] == ",command,input,output,start_time,end_time"
+    assert len(lines) == 4
+
+
+def test_log_readable_by_pandas(tmp_path):
+    """Test the log stays a CSV the pandas based readers understand."""
+    path = tmp_path / "history.csv"
+    history_log.append_rows(str(path), [make_row(7)])
+    df = pd.read_csv(path, index_col=0, parse_dates=["start_time", "end_time"])
+    assert list(df.index) == [7]
+    assert df.iloc[0]["start_time"] == pd.Timestamp("2025-01-01 12:00:00")
+
+
+def test_compact_keeps_newest_rows(tmp_path):
+    """Test compaction rewrites the log with only the retained records."""
+    path = tmp_path / "history.csv"
+    history_log.append_rows(str(path), [make_row(i) for i in range(10)])
+    assert history_log.compact(str(path), 3) == 3
+    assert [row[0] for row in history_log.read_rows(str(path))] == ["7", "8", "9"]
+    assert not list(tmp_path.glob("*.tmp"))
+
+
+def test_compact_missing_file(tmp_path):
+    """Test compacting a log that doesn't exist is a no-op."""
+    assert history_log.compact(str(tmp_path / "missing.csv"), 3) == 0
+
+
+def test_reserve_ids(tmp_path):
+    """Test reserved ID blocks start after the log's highest ID and are handed out once."""
+    path = str(tmp_path / "history.csv")
+    assert history_log.reserve_ids(path, 4) == 0
+    history_log.append_rows(str(tmp_path / "other.csv"), [make_row(7)])
+    assert history_log.reserve_ids(str(tmp_path / "other.csv"), 4) == 8
+    assert history_log.reserve_ids(path, 4) == 4
+    history_log.release_ids(path, 5, 8)
+    assert history_log.reserve_ids(path, 1) == 5
+    # IDs reserved after a block stop it from being handed back
+    history_log.release_ids(path, 2, 4)
+    assert history_log.reserve_ids(path, 1) == 6
+
+
+def test_signature_tracks_writes(tmp_path):
+    """Test the signature changes with every write, even one keeping the size."""
+    store = history_log.CSVStore(str(tmp_path / "history.csv"))
+    assert store.signature() is None
+    store.append([make_row(0)])
+    first = store.signature()
+    store.rewrite([make_row(0)])
+    second = store.signature()
+    assert second != first
+    assert second[1] == first[1]
+    store.append([make_row(1), make_row(2)])
+    assert [row[0] for row in store.read_appended(second, store.signature())] == ["1", "2"]
+    # a replaced file can't be read from where it was left
+    assert store.read_appended(first, store.signature()) is None
+
+
+def test_signature_after_own_appends(tmp_path):
+    """Test the signature only moves past appends when nobody else appended alongside."""
+    path = str(tmp_path / "history.csv")
+    store, other = history_log.CSVStore(path), history_log.CSVStore(path)
+    store.append([make_row(0)])
+    assert store.signature_after(None) is None
+    known = store.signature()
+    store.append([make_row(1)])
+    store.delete_ids([0], 4)
+    known = store.signature_after(known)
+    assert known == store.signature()
+    store.append([make_row(2)])
+    other.append([make_row(3)])
+    assert store.signature_after(known) is None
+
+
+def append_as_writer(path: str, writer: int) -> None:
+    """Append rows one by one, the way each calculator's flusher does"""
+    store = history_log.CSVStore(path)
+    for number in range(ROWS_PER_WRITER):
+        row = make_row(number)
+        row[2] = f"writer {writer} row {number}"
+        store.append([row])
+
+
+def delete_seeded(path: str) -> None:
+    """Delete the seeded rows one at a time, compacting the log after each tombstone"""
+    store = history_log.CSVStore(path)
+    for seq in range(-DELETED_ROWS, 0):
+        store.delete_ids([seq], 10 ** 6)
+        store.compact(10 ** 6)
+
+
+def test_concurrent_writers_lose_nothing(tmp_path):
+    """Test appends from many processes all survive each other and concurrent rewrites."""
+    path = str(tmp_path / "history.csv")
+    history_log.append_rows(path, [make_row(seq) for seq in range(-DELETED_ROWS, 0)])
+    context = multiprocessing.get_context("fork")
+    processes = [context.Process(target=append_as_writer, args=(path, writer))
+                 for writer in range(WRITERS)]
+    processes.append(context.Process(target=delete_seeded, args=(path,)))
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join(60)
+        assert process.exitcode == 0
+
+    rows = history_log.read_rows(path)
+    assert all(len(row) == len(history_log.HISTORY_HEADER) for row in rows)
+    assert sorted(row[2] for row in rows) == sorted(
+        f"writer {writer} row {number}"
+        for writer in range(WRITERS) for number in range(ROWS_PER_WRITER)
+    )
+
+
+def test_lock_excludes_appenders(tmp_path):
+    """Test an append waits while a rewrite holds the lock, even in a child forked then."""
+    path = str(tmp_path / "history.csv")
+    history_log.append_rows(path, [make_row(0)])
+    context = multiprocessing.get_context("fork")
+    with history_log.locked(path, exclusive=True):
+        appender = context.Process(target=history_log.append_rows, args=(path, [make_row(1)]))
+        appender.start()
+        appender.join(0.5)
+        assert appender.is_alive()
+        assert len(history_log.read_rows(path)) == 1
+    appender.join(10)
+    assert appender.exitcode == 0
+    assert len(history_log.read_rows(path)) == 2
+
+
+def test_replay_applies_tombstones():
+    """Test a tombstone frees its record's place without bringing back rolled out ones."""
+    rows = [make_row(i) for i in range(5)] + [history_log.tombstone_row(3), make_row(5)]
+    assert [row[0] for row in history_log.replay(rows, 3)] == [2, 4, 5]
+    assert not history_log.replay(rows, 0)
+
+
+def test_csv_store_delete_ids(tmp_path):
+    """Test deletes append tombstones and compaction drops them with their records."""
+    path = str(tmp_path / "history.csv")
+    store = history_log.CSVStore(path)
+    store.append([make_row(i) for i in range(4)])
+    assert store.delete_ids([1, 2], 4) == 2
+    rows, total = store.read_tail(4)
+    assert [row[0] for row in rows] == ["0", "3"]
+    assert total == 6
+    assert store.retained(4) == 2
+    assert list(store.read_frame(4)["output"]) == ["0", "3"]
+    assert store.compact(4) == 2
+    assert [row[0] for row in history_log.read_rows(path)] == ["0", "3"]
@@ -1,12 +1,16 @@
 """Unit tests for the HistoryPrint command."""
 
 import os
+import datetime
+from unittest.mock import patch
 import pandas as pd
 import pytest
 from calculator.command_input import CommandInput
-from calculator.command_output import CommandOutput
+from calculator.command_output import CommandOutput, StreamedOutput
 from calculator.commands.history.history_print import HistoryPrint
 from calculator.commands.history.exceptions import InvalidHistoryPrintArguments
+from calculator.commands.history.history import History
+from calculator.commands.history.history_ring import HistoryRing
 
 
 @pytest.fixture(name="history_file_path")
@@ -42,6 +46,15 @@ def test_validate_raises_on_args():
         cmd.validate()
 
 
+@pytest.mark.parametrize("options", [
+    "--limit", "--limit x", "--offset -1", "--since yesterday", "--limit 1 --tail 1", "--all 1"
+])
+def test_validate_raises_on_bad_options(options):
+    """Test that validate() rejects options that don't parse."""
+    with pytest.raises(InvalidHistoryPrintArguments):
+        HistoryPrint(CommandInput(f"history {options}"), History()).validate()
+
+
 def test_get_history_reads_csv(history_file_path):
     """Test that get_history() loads the history from CSV correctly."""
     _ = history_file_path  # prevent unused-argument warning
@@ -70,3 +83,59 @@ def test_validate_passes_with_no_args():
     cmd = HistoryPrint(cmd_input)
     # This should not raise anything
     cmd.validate()
+
+
+@pytest.fixture(name="filled_history")
+def fixture_filled_history(monkeypatch):
+    """History of ten commands a minute apart, alternating add and sub."""
+    monkeypatch.setenv("HISTORY_SIZE", "10")
+    history = History()
+    for number in range(10):
+        command = "add" if number % 2 == 0 else "sub"
+        time = datetime.datetime(2025, 1, 1, 12, number)
+        history.add_record({"command": command, "input": f"{command} {number} 1",
+                            "output": str(number), "start_time": time, "end_time": time})
+    yield history
+    history.close()
+
+
+def history_lines(history: History, options: str) -> list[str]:
+    """Streamed lines of a history command."""
+    plugin = HistoryPrint(CommandInput(f"history {options}"), history)
+    plugin.validate()
+    output = plugin.execute().output
+    assert isinstance(output, StreamedOutput)
+    return list(output)
+
+
+@pytest.mark.parametrize("options, outputs", [
+    ("--limit 3", ["0", "1", "2"]),
+    ("--offset 8", ["8", "9"]),
+    ("--limit=2 --offset=4", ["4", "5"]),
+    ("--tail 3", ["7", "8", "9"]),
+    ("--tail 2 --offset 1", ["7", "8"]),
+    ("--command SUB --tail 2", ["7", "9"]),
+    ("--since 2025-01-01T12:05 --until 2025-01-01T12:07", ["5", "6"]),
+    ("--command add --since 2025-01-01T12:05 --limit 1", ["6"])
+])
+def test_options_select_rows(filled_history, options, outputs):
+    """Test that options page and filter the rows, numbered the way delete expects."""
+    lines = history_lines(filled_history, options)
+    assert [line.rsplit(" = ", 1)[1] for line in lines] == outputs
+    assert [int(line.split()[0]) for line in lines] == [int(output) for output in outputs]
+
+
+def test_rows_are_streamed(filled_history):
+    """Test that rows are produced as they are read, not all at once."""
+    plugin = HistoryPrint(CommandInput("history --limit 5"), filled_history)
+    plugin.validate()
+    rows = plugin.execute().output
+    with patch.object(HistoryRing, "record", autospec=True,
+                      side_effect=HistoryRing.record) as mock_record:
+        assert next(iter(rows)).startswith("    0      #0  2025-01-01 12:00:00  add 0 1 = 0")
+    mock_record.assert_called_once()
+
+
+def test_no_matching_rows(filled_history):
+    """Test that an empty selection says so."""
+    assert history_lines(filled_history, "--command mul") == ["No matching history"]
@@ -0,0 +1,101 @@
+"""Unit tests for the history ring buffer."""
+
+import datetime
+import pytest
+from calculator.commands.history.history_ring import HistoryRing, datetime_to_ns, ns_to_datetime
+
+
+@pytest.fixture(name="ring")
+def fixture_ring():
+    """Returns an empty ring with three slots."""
+    return HistoryRing(3)
+
+
+def make_record(value: str) -> dict:
+    """Build a history record with a distinct output."""
+    time = datetime.datetime(2025, 3, 1, 12, 0, 0, 123456)
+    return {"command": "add", "input": "add 1 2", "output": value,
+            "start_time": time, "end_time": time}
+
+
+def test_ns_round_trip():
+    """Test that timestamps survive conversion to nanoseconds and back."""
+    time = datetime.datetime(2025, 3, 1, 12, 30, 45, 987654)
+    assert ns_to_datetime(datetime_to_ns(time)) == time
+
+
+def test_push_overwrites_oldest(ring):
+    """Test that pushing past capacity drops the oldest records."""
+    for seq in range(5):
+        ring.push(seq, make_record(str(seq)))
+    assert len(ring) == 3
+    assert ring.full()
+    assert [ring.seqs[slot] for slot in ring.slots()] == [2, 3, 4]
+    assert [ring.record(slot)["output"] for slot in ring.slots()] == ["2", "3", "4"]
+
+
+def test_append_sets_head(ring):
+    """Test that head points at the next slot to overwrite."""
+    ring.append(0, make_record("0"))
+    assert ring.head == 1
+    ring.append(1, make_record("1"))
+    ring.append(2, make_record("2"))
+    assert ring.head == 0
+
+
+def test_overwrite_slot(ring):
+    """Test replacing the record in a given slot."""
+    ring.append(0, make_record("0"))
+    ring.overwrite(0, 7, make_record("7"))
+    assert ring.seqs[0] == 7
+    assert ring.record(0)["output"] == "7"
+
+
+def test_clear(ring):
+    """Test that clearing empties every column."""
+    ring.push(0, make_record("0"))
+    ring.clear()
+    assert len(ring) == 0
+    assert ring.head == 0
+    assert not ring.inputs
+
+
+def test_to_frame(ring):
+    """Test materializing the ring as a DataFrame in chronological order."""
+    for seq in range(4):
+        ring.push(seq, make_record(str(seq)))
+    frame = ring.to_frame()
+    assert list(frame["output"]) == ["1", "2", "3"]
+    assert list(frame.columns) == ["command", "input", "output", "start_time", "end_time"]
+    assert frame["start_time"].iloc[0] == make_record("1")["start_time"]
+
+
+def test_select_filters_in_ring_order(ring):
+    """Test select walks a wrapped ring oldest or newest first, numbering from the oldest."""
+    for seq in range(5):
+        record = make_record(str(seq))
+        record["command"] = "ADD" if seq % 2 else "sub"
+        record["start_time"] += datetime.timedelta(minutes=seq)
+        ring.push(seq, record)
+    assert list(ring.select()) == [(0, 2), (1, 0), (2, 1)]
+    assert list(ring.select(newest_first=True)) == [(2, 1), (1, 0), (0, 2)]
+    assert [ring.seqs[slot] for _, slot in ring.select(command="add")] == [3]
+    since = datetime_to_ns(make_record("")["start_time"] + datetime.timedelta(minutes=3))
+    assert [ring.seqs[slot] for _, slot in ring.select(since_ns=since)] == [3, 4]
+    assert [ring.seqs[slot] for _, slot in ring.select(until_ns=since)] == [2]
+
+
+def test_delete_reclaims_slots_lazily(ring):
+    """Test that deleted records are skipped and their slots reclaimed when needed."""
+    for seq in range(3):
+        ring.push(seq, make_record(str(seq)))
+    ring.delete(1)
+    ring.delete(1)
+    assert len(ring) == 2 and not ring.full()
+    assert [(position, ring.seqs[slot]) for position, slot in ring.select()] == [(0, 0), (1, 2)]
+    assert [position for position, _ in ring.select(newest_first=True)] == [1, 0]
+    ring.push(3, make_record("3"))
+    assert ring.full()
+    assert [ring.seqs[slot] for slot in ring.slots()] == [0, 2, 3]
+    assert ring.find({2, 3, 9}) == [1, 2]
+    assert list(ring.to_frame()["output"]) == ["0", "2", "3"]
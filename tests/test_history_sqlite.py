@@ -0,0 +1,225 @@
+"""Unit tests for the SQLite history backend."""
+
+import sqlite3
+import datetime
+import multiprocessing
+import pytest
+from calculator.command_input import CommandInput
+from calculator.command_output import CommandOutput
+from calculator.commands.history import history_log
+from calculator.commands.history.history import History, read_history
+from calculator.commands.history.history_clear import HistoryClear
+from calculator.commands.history.history_delete import HistoryDelete
+from calculator.commands.history.history_sqlite import SQLiteStore
+from calculator.commands.history.exceptions import InvalidHistoryDeleteIndex
+
+
+# stress test: writer processes, records each writer adds, records deleted meanwhile
+WRITERS = 4
+ROWS_PER_WRITER = 200
+DELETED_ROWS = 20
+
+
+def make_row(seq: int) -> list:
+    """Build a log row with a given sequence number"""
+    time = datetime.datetime(2025, 1, 1, 12, 0, 0)
+    record = {
+        "command": "add",
+        "input": f"add {seq} 0",
+        "output": str(seq),
+        "start_time": time,
+        "end_time": time
+    }
+    return history_log.format_row(seq, record)
+
+
+@pytest.fixture(name="db_path")
+def fixture_db_path(monkeypatch, tmp_path):
+    """Selects the SQLite backend with a temporary database"""
+    path = tmp_path / "history.db"
+    monkeypatch.setenv("HISTORY_BACKEND", "sqlite")
+    monkeypatch.setenv("HISTORY_FILE", str(path))
+    monkeypatch.setenv("HISTORY_FLUSH_INTERVAL_MS", "0")
+    return path
+
+
+@pytest.fixture(name="store")
+def fixture_store(db_path):
+    """SQLite store holding ten records"""
+    store = SQLiteStore(str(db_path))
+    store.append([make_row(i) for i in range(10)])
+    yield store
+    store.close()
+
+
+def test_open_store_selects_backend(db_path, monkeypatch):
+    """Test HISTORY_BACKEND picks the store implementation."""
+    assert isinstance(history_log.open_store(str(db_path)), SQLiteStore)
+    monkeypatch.setenv("HISTORY_BACKEND", "csv")
+    assert isinstance(history_log.open_store(str(db_path)), history_log.CSVStore)
+
+
+def test_schema_wal_and_indexes(store, db_path):
+    """Test the database is in WAL mode with indexes on command and start_time."""
+    _ = store
+    connection = sqlite3.connect(db_path)
+    assert connection.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+    indexes = {row[1] for row in connection.execute("PRAGMA index_list(history)")}
+    assert {"history_command", "history_start_time"} <= indexes
+    connection.close()
+
+
+def test_read_tail(store):
+    """Test reading the newest rows oldest first with the total row count."""
+    rows, total = store.read_tail(3)
+    assert [row[0] for row in rows] == [7, 8, 9]
+    assert rows[0][1:] == make_row(7)[1:]
+    assert total == 10
+
+
+def test_read_frame(store):
+    """Test the retained records come back as a DataFrame indexed by sequence number."""
+    frame = store.read_frame(3)
+    assert list(frame.index) == [7, 8, 9]
+    assert frame.index.name is None
+    assert frame.iloc[0]["start_time"] == datetime.datetime(2025, 1, 1, 12, 0, 0)
+
+
+def test_missing_database(tmp_path):
+    """Test reads raise FileNotFoundError like the CSV log does."""
+    store = SQLiteStore(str(tmp_path / "missing.db"))
+    with pytest.raises(FileNotFoundError):
+        store.read_tail(3)
+    assert store.compact(3) == 0
+    assert not (tmp_path / "missing.db").exists()
+
+
+def test_compact(store):
+    """Test compaction keeps the newest rows."""
+    assert store.compact(4) == 4
+    rows, total = store.read_tail(4)
+    assert [row[0] for row in rows] == [6, 7, 8, 9]
+    assert total == 4
+
+
+def test_delete_ids(store):
+    """Test records are deleted by sequence number and rolled out ones don't come back."""
+    assert store.delete_ids([7, 9], 4) == 0
+    rows, total = store.read_tail(4)
+    assert [row[0] for row in rows] == [6, 8]
+    assert total == 2
+
+
+def test_clear_keeps_database(store, db_path):
+    """Test clearing empties the table without removing the file."""
+    store.clear()
+    assert store.read_tail(5) == ([], 0)
+    assert db_path.exists()
+
+
+def test_history_round_trip(db_path):
+    """Test History writes to and reloads from the database."""
+    _ = db_path
+    history = History()
+    for i in range(7):
+        history.add(CommandInput(f"add {i} 0"), CommandOutput(str(i)))
+    history.close()
+    assert list(History().history["output"]) == ["2", "3", "4", "5", "6"]
+    assert list(read_history(str(db_path))["output"]) == ["2", "3", "4", "5", "6"]
+
+
+def test_history_plugins(db_path):
+    """Test delete and clear work against the database."""
+    history = History()
+    for i in range(3):
+        history.add(CommandInput(f"add {i} 0"), CommandOutput(str(i)))
+
+    cmd = CommandInput("delete")
+    cmd.args = {"argument_1": "1"}
+    plugin = HistoryDelete(cmd)
+    plugin.validate()
+    plugin.execute()
+    assert list(read_history(str(db_path))["output"]) == ["0", "2"]
+
+    cmd.args = {"argument_1": "2"}
+    with pytest.raises(InvalidHistoryDeleteIndex):
+        HistoryDelete(cmd).validate()
+
+    HistoryClear(CommandInput("clear")).execute()
+    assert read_history(str(db_path)).empty
+    history.close()
+
+
+def test_signature_changes_on_other_commits(store, db_path):
+    """Test another connection's commit changes the signature and this one's don't."""
+    signature = store.signature()
+    store.append([make_row(10)])
+    assert store.signature() == signature
+    other = SQLiteStore(str(db_path))
+    other.append([make_row(11)])
+    other.close()
+    assert store.signature() != signature
+    assert store.read_appended(signature, store.signature()) is None
+
+
+def test_calculators_keep_each_others_records(db_path):
+    """Test two calculators sharing a database never overwrite each other's records."""
+    first, second = History(), History()
+    first.add(CommandInput("add 1 2"), CommandOutput("3"))
+    second.add(CommandInput("sub 5 1"), CommandOutput("4"))
+    first.close()
+    second.close()
+    history = read_history(str(db_path))
+    assert sorted(history["input"]) == ["add 1 2", "sub 5 1"]
+    assert history.index.is_unique
+
+
+def test_reserve_ids(store):
+    """Test reserved ID blocks start after the highest ID and are handed out once."""
+    assert store.reserve_ids(5) == 10
+    assert store.reserve_ids(5) == 15
+    store.release_ids(17, 20)
+    assert store.reserve_ids(1) == 17
+    # IDs reserved after a block stop it from being handed back
+    store.release_ids(12, 15)
+    assert store.reserve_ids(1) == 18
+
+
+def add_records(writer: int) -> None:
+    """Record commands in a History of this process's own"""
+    history = History()
+    for number in range(ROWS_PER_WRITER):
+        history.add(CommandInput(f"add {writer} {number}"), CommandOutput(str(number)))
+    history.close()
+
+
+def delete_seeded(path: str) -> None:
+    """Delete the seeded records one at a time"""
+    store = SQLiteStore(path)
+    for seq in range(-DELETED_ROWS, 0):
+        store.delete_ids([seq], 10 ** 6)
+    store.close()
+
+
+def test_concurrent_writers_lose_nothing(db_path, monkeypatch):
+    """Test records from many processes all survive each other and concurrent deletes."""
+    monkeypatch.setenv("HISTORY_SIZE", str(10 ** 6))
+    monkeypatch.setenv("HISTORY_FLUSH_INTERVAL_MS", "5")
+    seeded = SQLiteStore(str(db_path))
+    seeded.append([make_row(seq) for seq in range(-DELETED_ROWS, 0)])
+    seeded.close()
+    context = multiprocessing.get_context("fork")
+    processes = [context.Process(target=add_records, args=(writer,))
+                 for writer in range(WRITERS)]
+    processes.append(context.Process(target=delete_seeded, args=(str(db_path),)))
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join(60)
+        assert process.exitcode == 0
+
+    rows = sqlite3.connect(db_path).execute("SELECT seq, input FROM history").fetchall()
+    assert len({seq for seq, _ in rows}) == len(rows)
+    assert sorted(text for _, text in rows) == sorted(
+        f"add {writer} {number}" for writer in range(WRITERS) for number in range(ROWS_PER_WRITER)
+    )
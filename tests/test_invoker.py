@@ -4,9 +4,21 @@ from unittest.mock import patch, MagicMock
 import pytest
 from calculator.invoker import Invoker
 from calculator.command_input import CommandInput
-from calculator.exceptions import AmbiguousCommandError, MissingCommandError
+from calculator.exceptions import AmbiguousCommandError, CLIError, MissingCommandError
 from calculator.command_output import CommandOutput
 from calculator.command import Command
+from calculator.commands.add.add import Add
+from calculator.commands.subtract.subtract import Subtract
+from calculator.commands.multiply.multiply import Multiply
+from calculator.commands.divide.divide import Divide
+from calculator.commands.history.history_print import HistoryPrint
+from calculator.commands.history.history_clear import HistoryClear
+from calculator.commands.history.history_delete import HistoryDelete
+from calculator.commands.stats.stats import StatsCommand
+from calculator.commands.expression.expression import Expression
+from calculator.commands.cache.cache import CacheCommand
+from calculator.result_cache import ResultCache
+from calculator.stats import Stats
 
 
 class DummyCommand(Command):
@@ -16,11 +28,17 @@ class DummyCommand(Command):
     Args:
         name (str): A label to identify the command.
         match (bool): Whether this command should report in_scope for a given input.
+        aliases (tuple): Literal command strings to register in the alias index.
+        services (tuple): Names of shared services to receive from the Invoker.
     """
 
-    def __init__(self, name: str, match: bool = False):
+    def __init__(self, name: str, match: bool = False, aliases: tuple = (),
+                 services: tuple = ()):
         self.name = name
         self.match = match
+        self.ALIASES = aliases  # pylint: disable=invalid-name
+        self.SERVICES = services  # pylint: disable=invalid-name
+        self.received = None
 
     def in_scope(self, cmd):  # pylint: disable=arguments-differ
         """Return whether this dummy command is considered in scope."""
@@ -30,8 +48,9 @@ class DummyCommand(Command):
         """Return whether this dummy command has valid arguments"""
         return self.match
 
-    def __call__(self, cmd):
+    def __call__(self, cmd, **services):
         """Simulate plugin instantiation."""
+        self.received = services
         return self
 
     def execute(self) -> CommandOutput:
@@ -114,3 +133,190 @@ def test_invoker_raises_ambiguous_command(mock_entry_points):
     with pytest.raises(AmbiguousCommandError) as exc:
         invoker.execute_command(CommandInput("duplicate"))
     assert "multiple plugins" in str(exc.value)
+
+
+@patch("importlib.metadata.entry_points")
+def test_invoker_dispatches_by_alias_without_scope_scan(mock_entry_points):
+    """
+    Test that plugins declaring ALIASES are found through the alias index.
+
+    in_scope is never consulted for indexed plugins, and lookups ignore case.
+    """
+    aliased = DummyCommand("aliased", aliases=("sum", "+"))
+    mock_entry = MagicMock()
+    mock_entry.load.return_value = aliased
+    mock_entry_points.return_value = [mock_entry]
+
+    invoker = Invoker()
+
+    assert invoker.execute_command(CommandInput("SUM 1 2")).output == "Executed by aliased"
+    assert invoker.execute_command(CommandInput("+")).output == "Executed by aliased"
+    with pytest.raises(MissingCommandError):
+        invoker.execute_command(CommandInput("summary"))
+
+
+@patch("importlib.metadata.entry_points")
+def test_invoker_detects_alias_collisions_at_registration(mock_entry_points):
+    """
+    Test that two plugins declaring the same alias are flagged when registering.
+
+    The collision is surfaced as AmbiguousCommandError only for the shared alias.
+    """
+    first = DummyCommand("first", aliases=("dup", "one"))
+    second = DummyCommand("second", aliases=("DUP",))
+    mock_entry1 = MagicMock()
+    mock_entry2 = MagicMock()
+    mock_entry1.load.return_value = first
+    mock_entry2.load.return_value = second
+    mock_entry_points.return_value = [mock_entry1, mock_entry2]
+
+    invoker = Invoker()
+
+    assert list(invoker.ambiguous_aliases) == ["dup"]
+    assert [ref.load() for ref in invoker.ambiguous_aliases["dup"]] == [first, second]
+    with pytest.raises(AmbiguousCommandError):
+        invoker.execute_command(CommandInput("dup"))
+    assert invoker.execute_command(CommandInput("one")).output == "Executed by first"
+
+
+@patch("importlib.metadata.entry_points")
+def test_invoker_injects_requested_services(mock_entry_points):
+    """Test plugins get only the shared services they list in SERVICES."""
+    wants = DummyCommand("wants", aliases=("wants",), services=("history", "missing"))
+    plain = DummyCommand("plain", aliases=("plain",))
+    entries = [MagicMock(), MagicMock()]
+    entries[0].load.return_value = wants
+    entries[1].load.return_value = plain
+    mock_entry_points.return_value = entries
+
+    history = object()
+    invoker = Invoker({"history": history, "other": object()})
+    invoker.execute_command(CommandInput("wants"))
+    invoker.execute_command(CommandInput("plain"))
+
+    assert wants.received == {"history": history}
+    assert plain.received == {}
+
+
+@patch("importlib.metadata.entry_points")
+def test_invoker_times_phases(mock_entry_points):
+    """Test execute_command records parse, dispatch, validate and execute timings."""
+    timed = DummyCommand("timed", match=True, aliases=("timed",))
+    entry = MagicMock()
+    entry.load.return_value = timed
+    mock_entry_points.return_value = [entry]
+
+    stats = Stats()
+    invoker = Invoker({"stats": stats})
+    invoker.execute_command(CommandInput("timed 1"))
+
+    assert stats.current == "DummyCommand"
+    assert {phase for _, phase in stats.histograms} == {"parse", "dispatch", "validate", "execute"}
+    assert all(histogram.count == 1 for histogram in stats.histograms.values())
+
+
+@patch("importlib.metadata.entry_points")
+def test_invoker_detects_fallback_claiming_alias(mock_entry_points):
+    """
+    Test that a regex-only plugin matching an indexed alias makes that alias ambiguous.
+    """
+    aliased = DummyCommand("aliased", aliases=("add",))
+    greedy = DummyCommand("greedy", match=True)
+    mock_entry1 = MagicMock()
+    mock_entry2 = MagicMock()
+    mock_entry1.load.return_value = aliased
+    mock_entry2.load.return_value = greedy
+    mock_entry_points.return_value = [mock_entry1, mock_entry2]
+
+    invoker = Invoker()
+
+    assert "add" in invoker.ambiguous_aliases
+    with pytest.raises(AmbiguousCommandError):
+        invoker.execute_command(CommandInput("add 1 2"))
+    assert invoker.execute_command(CommandInput("other")).output == "Executed by greedy"
+
+
+@pytest.mark.parametrize("plugin", [
+    Add, Subtract, Multiply, Divide, HistoryPrint, HistoryClear, HistoryDelete, StatsCommand,
+    Expression, CacheCommand
+])
+def test_plugin_aliases_match_command_pattern(plugin):
+    """Verify every declared alias is also accepted by the plugin's own regex"""
+    assert plugin.ALIASES
+    for alias in plugin.ALIASES:
+        assert plugin.in_scope(CommandInput(alias))
+
+
+def arithmetic_entry_points(*plugins) -> list[MagicMock]:
+    """Entry points loading real plugin classes"""
+    entries = []
+    for plugin in plugins:
+        entry = MagicMock()
+        entry.load.return_value = plugin
+        entries.append(entry)
+    return entries
+
+
+@patch("importlib.metadata.entry_points")
+def test_invoker_memoizes_pure_commands(mock_entry_points):
+    """Test a repeated pure command is answered without parsing its operands again."""
+    mock_entry_points.return_value = arithmetic_entry_points(Add, Subtract)
+    invoker = Invoker()
+    with patch.object(Add, "parse_operands", autospec=True,
+                      side_effect=Add.parse_operands) as mock_parse:
+        assert invoker.execute_command(CommandInput("add 1 2 3")).output == "6"
+        assert invoker.execute_command(CommandInput("add 1 2 3")).output == "6"
+        # operand order doesn't matter for add
+        assert invoker.execute_command(CommandInput("add 3 2 1")).output == "6"
+    assert mock_parse.call_count == 1
+    assert (invoker.result_cache.hits, invoker.result_cache.misses) == (2, 1)
+
+    # but it does for subtract
+    assert invoker.execute_command(CommandInput("sub 5 1")).output == "4"
+    assert invoker.execute_command(CommandInput("sub 1 5")).output == "-4"
+    assert invoker.result_cache.misses == 3
+
+
+@patch("importlib.metadata.entry_points")
+def test_invoker_rounded_results_keep_their_order(mock_entry_points):
+    """Test orders of the same operands share a result only if it wasn't rounded."""
+    mock_entry_points.return_value = arithmetic_entry_points(Add)
+    invoker = Invoker()
+    assert invoker.execute_command(CommandInput("add 1e30 1 -1e30")).output == "0E+3"
+    assert invoker.execute_command(CommandInput("add 1e30 -1e30 1")).output == "1"
+    assert invoker.execute_command(CommandInput("add 1e30 1 -1e30")).output == "0E+3"
+    assert invoker.result_cache.hits == 1
+
+    assert invoker.execute_command(CommandInput("add 1 2 3")).output == "6"
+    assert invoker.execute_command(CommandInput("add 3 1 2")).output == "6"
+    assert invoker.result_cache.hits == 2
+
+
+@patch("importlib.metadata.entry_points")
+def test_invoker_does_not_memoize_errors_or_impure_commands(mock_entry_points):
+    """Test failed commands and plugins that aren't pure always run."""
+    impure = DummyCommand("impure", aliases=("impure",))
+    mock_entry_points.return_value = arithmetic_entry_points(Add, impure)
+    invoker = Invoker()
+    for _ in range(2):
+        with pytest.raises(CLIError):
+            invoker.execute_command(CommandInput("add 1 x"))
+        invoker.execute_command(CommandInput("impure 1"))
+    assert len(invoker.result_cache) == 0
+
+
+@patch("importlib.metadata.entry_points")
+def test_invoker_result_cache_can_be_off_or_shared(mock_entry_points, monkeypatch):
+    """Test RESULT_CACHE_SIZE=0 disables memoization and a shared cache is used."""
+    mock_entry_points.return_value = arithmetic_entry_points(Add, CacheCommand)
+    monkeypatch.setenv("RESULT_CACHE_SIZE", "0")
+    invoker = Invoker()
+    invoker.execute_command(CommandInput("add 1 2"))
+    invoker.execute_command(CommandInput("add 1 2"))
+    assert invoker.result_cache.hits == invoker.result_cache.misses == 0
+
+    shared = ResultCache(8)
+    invoker = Invoker({"result_cache": shared})
+    invoker.execute_command(CommandInput("add 1 2"))
+    assert invoker.execute_command(CommandInput("cache")).output == shared.report()
+    assert len(shared) == 1
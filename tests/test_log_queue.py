@@ -0,0 +1,109 @@
+"""Unit tests for background log writing and lazy log formatting."""
+
+import logging
+from decimal import Decimal
+from logging.handlers import QueueHandler
+import pytest
+from calculator import log_queue
+from calculator.command_input import CommandInput
+from calculator.commands.add.add import Add
+
+
+class ListHandler(logging.Handler):
+    """Handler keeping the messages it was given"""
+    def __init__(self, level: int = logging.NOTSET) -> None:
+        super().__init__(level)
+        self.messages = []
+
+
+    def emit(self, record: logging.LogRecord) -> None:
+        self.messages.append(record.getMessage())
+
+
+class CountedRepr():  # pylint: disable=too-few-public-methods
+    """Value counting how often it was formatted"""
+    formatted = 0
+
+    def __repr__(self) -> str:
+        CountedRepr.formatted += 1
+        return "1"
+
+
+@pytest.fixture(name="root_logger")
+def fixture_root_logger():
+    """Root logger at debug level, put back as it was afterwards"""
+    root = logging.getLogger()
+    saved_handlers, saved_level = root.handlers[:], root.level
+    root.setLevel(logging.DEBUG)
+    yield root
+    log_queue.stop_log_queue()
+    root.handlers = saved_handlers
+    root.setLevel(saved_level)
+
+
+def test_records_are_written_by_the_listener(root_logger):
+    """Test handlers move behind a queue and still get every record."""
+    handler = ListHandler()
+    root_logger.addHandler(handler)
+    listener = log_queue.start_log_queue()
+    assert handler in listener.handlers
+    assert [type(h) for h in root_logger.handlers] == [QueueHandler]
+
+    logging.info("answer %d", 42)
+    log_queue.stop_log_queue()
+    assert handler.messages == ["answer 42"]
+    assert handler in root_logger.handlers
+    assert not any(isinstance(h, QueueHandler) for h in root_logger.handlers)
+
+
+def test_handler_levels_still_apply(root_logger):
+    """Test a handler behind the queue skips records below its own level."""
+    handler = ListHandler(logging.WARNING)
+    root_logger.addHandler(handler)
+    log_queue.start_log_queue()
+    logging.info("quiet")
+    logging.warning("loud")
+    log_queue.stop_log_queue()
+    assert handler.messages == ["loud"]
+
+
+def test_start_twice_keeps_one_queue(root_logger):
+    """Test starting the queue again doesn't wrap the queue in another queue."""
+    handler = ListHandler()
+    root_logger.addHandler(handler)
+    log_queue.start_log_queue()
+    log_queue.start_log_queue()
+    assert len(root_logger.handlers) == 1
+    logging.info("once")
+    log_queue.stop_log_queue()
+    assert handler.messages == ["once"]
+
+
+def test_forked_child_gets_its_own_listener(root_logger):
+    """Test a forked process drops the parent's queued records and starts a listener."""
+    handler = ListHandler()
+    root_logger.addHandler(handler)
+    parent = log_queue.start_log_queue()
+    # a forked child has the parent's queue but not its thread
+    parent.stop()
+    parent.queue.put(logging.makeLogRecord({"msg": "parent's"}))
+    log_queue._restart_in_child()  # pylint: disable=protected-access
+    child = log_queue._listener  # pylint: disable=protected-access
+    assert child is not parent and child.queue is parent.queue
+    logging.info("child's")
+    log_queue.stop_log_queue()
+    assert handler.messages == ["child's"]
+
+
+def test_debug_messages_are_not_formatted_above_debug(root_logger):
+    """Test plugins leave their debug arguments unformatted when debug is off."""
+    root_logger.addHandler(ListHandler())
+    cmd = CommandInput("add 1 1")
+    cmd.args = {"argument_1": CountedRepr(), "argument_2": CountedRepr()}
+    CountedRepr.formatted = 0
+    root_logger.setLevel(logging.INFO)
+    Add(cmd).reduce([Decimal(1), Decimal(1)])
+    assert CountedRepr.formatted == 0
+    root_logger.setLevel(logging.DEBUG)
+    Add(cmd).reduce([Decimal(1), Decimal(1)])
+    assert CountedRepr.formatted > 0
@@ -1,7 +1,11 @@
 """Tests for the main entrypoint of the calculator application."""
 
+import io
+import os
+import sys
 from unittest.mock import patch
-from calculator.main import main
+import pytest
+from calculator.main import main, parse_args
 
 
 @patch("calculator.main.setup_env")
@@ -18,10 +22,101 @@ def test_main_runs_all_components(mock_logging, mock_cli_class, mock_setup_env):
     """
     mock_cli_instance = mock_cli_class.return_value
 
-    main()
+    main([])
 
     mock_logging.info.assert_any_call("Setting up env")
     mock_logging.info.assert_any_call("Starting CLI")
     mock_setup_env.assert_called_once()
     mock_cli_class.assert_called_once()
     mock_cli_instance.start.assert_called_once()
+
+
+@patch("calculator.main.setup_env")
+@patch("calculator.main.CLI")
+def test_main_backend_option_sets_env(mock_cli_class, mock_setup_env, monkeypatch):
+    """Test that --backend selects the arithmetic backend for the session."""
+    _ = mock_cli_class, mock_setup_env  # prevent unused-argument warning
+    monkeypatch.setenv("ARITHMETIC_BACKEND", "decimal")
+    main(["--backend", "float"])
+    assert os.environ["ARITHMETIC_BACKEND"] == "float"
+
+
+@patch("calculator.main.setup_env")
+@patch("calculator.main.CLI")
+def test_main_batch_from_file(mock_cli_class, mock_setup_env, tmp_path):
+    """Test --batch runs the file through the CLI instead of the prompt."""
+    _ = mock_setup_env  # prevent unused-argument warning
+    batch_file = tmp_path / "commands.txt"
+    batch_file.write_text("add 1 2\n")
+    main(["--batch", str(batch_file), "--history-policy", "sample", "--history-sample", "5"])
+
+    cli = mock_cli_class.return_value
+    cli.start.assert_not_called()
+    source, _, policy, sample_every, workers = cli.run_batch.call_args.args
+    assert source.name == str(batch_file)
+    assert (policy, sample_every, workers) == ("sample", 5, 1)
+
+
+@patch("calculator.main.setup_env")
+@patch("calculator.main.CLI")
+def test_main_batch_from_stdin(mock_cli_class, mock_setup_env):
+    """Test --batch - reads commands from stdin."""
+    _ = mock_setup_env  # prevent unused-argument warning
+    main(["--batch", "-", "--workers", "4"])
+    source, sink, policy, _, workers = mock_cli_class.return_value.run_batch.call_args.args
+    assert (source, sink, policy, workers) == (sys.stdin, sys.stdout, "bulk", 4)
+
+
+@pytest.mark.parametrize("option", ["--history-sample", "--workers"])
+def test_counts_must_be_positive(option):
+    """Test --history-sample and --workers reject values below 1."""
+    with pytest.raises(SystemExit):
+        parse_args([option, "0"])
+
+
+@patch("calculator.main.setup_env")
+@patch("calculator.main.CLI")
+@patch("calculator.main.server.CalculatorServer")
+def test_main_serve(mock_server_class, mock_cli_class, mock_setup_env):
+    """Test --serve runs the server on the CLI's Invoker and History."""
+    _ = mock_setup_env  # prevent unused-argument warning
+    with patch("calculator.main.asyncio.run") as mock_run:
+        main(["--serve", "--socket", "/tmp/calc.sock"])
+    cli = mock_cli_class.return_value
+    mock_server_class.assert_called_once_with(cli.invoker, cli.history, 1)
+    mock_server_class.return_value.serve.assert_called_once_with(None, None, "/tmp/calc.sock")
+    mock_run.assert_called_once()
+    cli.start.assert_not_called()
+    # clients can't read the server's files through @file operands
+    assert os.environ["STREAM_OPERANDS"] == "0"
+
+
+@patch("calculator.main.setup_env")
+@patch("calculator.main.CLI")
+@patch("calculator.main.server.CalculatorServer")
+def test_main_serve_default_port(mock_server_class, mock_cli_class, mock_setup_env):
+    """Test --serve listens on the default TCP port without --port or --socket."""
+    _ = mock_cli_class, mock_setup_env  # prevent unused-argument warning
+    with patch("calculator.main.asyncio.run", side_effect=KeyboardInterrupt):
+        main(["--serve"])
+    mock_server_class.return_value.serve.assert_called_once_with(None, 8765, None)
+
+
+def test_batch_and_serve_exclusive():
+    """Test --batch and --serve can't be combined."""
+    with pytest.raises(SystemExit):
+        parse_args(["--batch", "-", "--serve"])
+
+
+@patch("calculator.main.setup_env")
+@patch("calculator.main.CLI")
+@patch("calculator.main.server.CalculatorServer")
+def test_main_daemon(mock_server_class, mock_cli_class, mock_setup_env, monkeypatch):
+    """Test --daemon serves on the socket the calc client connects to."""
+    _ = mock_cli_class, mock_setup_env  # prevent unused-argument warning
+    monkeypatch.setenv("CALCULATOR_SOCKET", "/tmp/calc.sock")
+    with patch("calculator.main.asyncio.run", side_effect=OSError("in use")), \
+         patch("sys.stderr", new_callable=io.StringIO) as stderr:
+        main(["--daemon"])
+    mock_server_class.return_value.serve.assert_called_once_with(None, None, "/tmp/calc.sock")
+    assert "in use" in stderr.getvalue()
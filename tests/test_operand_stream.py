@@ -0,0 +1,153 @@
+"""Tests for operands streamed from files and stdin"""
+
+import io
+from unittest.mock import patch, MagicMock
+import pytest
+from calculator import operand_stream
+from calculator.command_input import CommandInput
+from calculator.commands.add.add import Add
+from calculator.commands.add.exceptions import InvalidAdditionArguments, MissingAdditionArguments
+from calculator.commands.subtract.subtract import Subtract
+from calculator.commands.multiply.multiply import Multiply
+from calculator.commands.divide.divide import Divide
+from calculator.commands.divide.exceptions import DivisionZeroArgument
+from calculator.invoker import Invoker
+
+
+@pytest.fixture(name="values_file")
+def fixture_values_file(tmp_path):
+    """File of operands spread over several lines"""
+    path = tmp_path / "values.txt"
+    path.write_text("1 2\n\n  3\t4\r\n5", encoding="utf-8")
+    return path
+
+
+def run(text: str) -> str:
+    """Run an arithmetic command the way the Invoker does"""
+    plugins = {"add": Add, "sub": Subtract, "mul": Multiply, "div": Divide}
+    cmd = CommandInput(text)
+    command = plugins[cmd.command](cmd)
+    command.validate()
+    return command.execute().output
+
+
+@pytest.mark.parametrize("chunk_chars", [1, 2, 3, 7, 1 << 16])
+def test_read_tokens_across_chunks(chunk_chars):
+    """Verify tokens and line numbers don't depend on where chunks are cut"""
+    text = "12 345\n6\n\n78 9 10\n  11"
+    tokens = list(operand_stream.read_tokens(io.StringIO(text), chunk_chars))
+    assert tokens == [(1, "12"), (1, "345"), (2, "6"), (4, "78"), (4, "9"), (4, "10"),
+                      (5, "11")]
+
+
+def test_read_tokens_long_line():
+    """Verify a long line is handed out while it's being read, not once it ends"""
+    stream = io.StringIO("1 " * 1000)
+    tokens = operand_stream.read_tokens(stream, 10)
+    assert next(tokens) == (1, "1")
+    assert stream.tell() == 10
+
+
+def test_sources(monkeypatch):
+    """Verify @ arguments are only sources when there's a name and they're enabled"""
+    assert operand_stream.has_sources(("1", "@values.txt"))
+    assert operand_stream.has_sources(("@-",))
+    assert not operand_stream.has_sources(("1", "@"))
+    monkeypatch.setenv("STREAM_OPERANDS", "0")
+    assert not operand_stream.has_sources(("@values.txt",))
+    with pytest.raises(InvalidAdditionArguments):
+        run("add 1 @values.txt")
+
+
+def test_reduce_file(values_file):
+    """Verify file operands are reduced in order along with command line ones"""
+    assert run(f"add @{values_file}") == "15"
+    assert run(f"add 10 @{values_file} 10") == "35"
+    assert run(f"sub 100 @{values_file}") == "85"
+    assert run(f"mul @{values_file} @{values_file}") == "14400"
+    assert run(f"div @{values_file}") == str(run("div 1 2 3 4 5"))
+
+
+def test_reduce_stdin(monkeypatch):
+    """Verify @- reads operands from stdin"""
+    monkeypatch.setattr("sys.stdin", io.StringIO("2\n3 4\n"))
+    assert run("mul @-") == "24"
+
+
+def test_reduce_in_chunks(tmp_path, monkeypatch):
+    """Verify operands are checked and reduced a chunk at a time"""
+    monkeypatch.setattr(operand_stream, "CHUNK_OPERANDS", 3)
+    path = tmp_path / "many.txt"
+    path.write_text("\n".join(["1"] * 10), encoding="utf-8")
+    with patch.object(Add, "check_operands") as mock_check:
+        assert run(f"add @{path}") == "10"
+    assert [len(call.args[0]) for call in mock_check.call_args_list] == [3, 3, 3, 1]
+
+
+def test_bad_tokens_reported_with_lines(tmp_path):
+    """Verify every bad token is reported with its line once the stream is read"""
+    path = tmp_path / "bad.txt"
+    path.write_text("1 x\n2\ny 3", encoding="utf-8")
+    with pytest.raises(InvalidAdditionArguments) as error:
+        run(f"add z @{path}")
+    message = str(error.value)
+    assert "'z'" in message
+    assert f"x ({path} line 1)" in message
+    assert f"y ({path} line 3)" in message
+
+
+def test_bad_tokens_strict(tmp_path, monkeypatch):
+    """Verify strict mode stops reading at the first bad token"""
+    monkeypatch.setenv("STREAM_STRICT", "1")
+    path = tmp_path / "bad.txt"
+    path.write_text("1 x\n2\ny 3", encoding="utf-8")
+    with pytest.raises(InvalidAdditionArguments) as error:
+        run(f"add @{path}")
+    assert "line 1" in str(error.value)
+    assert "line 3" not in str(error.value)
+
+
+def test_bad_tokens_capped(tmp_path):
+    """Verify only the first bad tokens are kept, the rest are counted"""
+    path = tmp_path / "bad.txt"
+    path.write_text("x\n" * 100, encoding="utf-8")
+    with pytest.raises(InvalidAdditionArguments) as error:
+        run(f"add @{path}")
+    assert f"line {operand_stream.MAX_REPORTED}" in str(error.value)
+    assert f"... {100 - operand_stream.MAX_REPORTED} more" in str(error.value)
+
+
+def test_missing_source(tmp_path):
+    """Verify an unreadable source is reported through the plugin's error"""
+    with pytest.raises(InvalidAdditionArguments) as error:
+        run(f"add 1 @{tmp_path / 'missing.txt'}")
+    assert "missing.txt" in str(error.value)
+
+
+def test_too_few_streamed_operands(tmp_path):
+    """Verify the operand count is checked once the stream ends"""
+    path = tmp_path / "one.txt"
+    path.write_text("1\n", encoding="utf-8")
+    with pytest.raises(MissingAdditionArguments):
+        run(f"add @{path}")
+
+
+def test_divide_zero_in_stream(tmp_path):
+    """Verify plugin checks still apply to streamed operands"""
+    path = tmp_path / "zero.txt"
+    path.write_text("4\n0\n", encoding="utf-8")
+    with pytest.raises(DivisionZeroArgument):
+        run(f"div @{path}")
+
+
+@patch("importlib.metadata.entry_points")
+def test_streamed_results_not_memoized(mock_entry_points, values_file):
+    """Verify the Invoker doesn't reuse a result when the file may have changed"""
+    entry = MagicMock()
+    entry.load.return_value = Add
+    mock_entry_points.return_value = [entry]
+    invoker = Invoker()
+    assert invoker.execute_command(CommandInput(f"add @{values_file}")).output == "15"
+    values_file.write_text("1 1", encoding="utf-8")
+    assert invoker.execute_command(CommandInput(f"add @{values_file}")).output == "2"
+    assert len(invoker.result_cache) == 0
@@ -0,0 +1,125 @@
+"""Tests for lazy plugin discovery through the plugin manifest."""
+
+import json
+import importlib.metadata
+from unittest.mock import patch
+import pytest
+from calculator.command_input import CommandInput
+from calculator.commands.add.add import Add
+from calculator.invoker import Invoker
+from calculator.plugin_manifest import (
+    ENTRY_POINT_GROUP,
+    MANIFEST_VERSION,
+    PluginRef,
+    discover_plugins,
+    fingerprint
+)
+
+
+def make_entry_points(**plugins):
+    """Build real entry point objects for the given name=value pairs"""
+    return [
+        importlib.metadata.EntryPoint(name, value, ENTRY_POINT_GROUP)
+        for name, value in plugins.items()
+    ]
+
+
+@pytest.fixture(name="entry_points")
+def fixture_entry_points():
+    """Entry points for two of the bundled arithmetic plugins"""
+    return make_entry_points(
+        add_plugin="calculator.commands.add.add:Add",
+        subtract_plugin="calculator.commands.subtract.subtract:Subtract"
+    )
+
+
+@pytest.fixture(name="manifest_path")
+def fixture_manifest_path(tmp_path, monkeypatch):
+    """Point the Invoker at a manifest file in a temporary cache directory"""
+    path = tmp_path / "cache" / "plugin_manifest.json"
+    monkeypatch.setenv("PLUGIN_MANIFEST", str(path))
+    return path
+
+
+def test_discover_without_manifest_loads_everything(entry_points):
+    """Without a manifest path every plugin is imported up front"""
+    with patch("importlib.metadata.entry_points", return_value=entry_points):
+        plugins = discover_plugins(None)
+    assert all(ref.loaded for ref in plugins)
+    assert plugins[0].aliases == Add.ALIASES
+
+
+def test_manifest_written_on_first_run(entry_points, manifest_path):
+    """A missing manifest is built from imported plugins and saved"""
+    with patch("importlib.metadata.entry_points", return_value=entry_points):
+        plugins = discover_plugins(str(manifest_path))
+
+    assert all(ref.loaded for ref in plugins)
+    manifest = json.loads(manifest_path.read_text())
+    assert manifest["fingerprint"] == fingerprint(entry_points)
+    assert manifest["plugins"][0] == {
+        "name": "add_plugin",
+        "value": "calculator.commands.add.add:Add",
+        "aliases": list(Add.ALIASES),
+        "services": []
+    }
+
+
+def test_manifest_hit_defers_imports(entry_points, manifest_path):
+    """With a fresh manifest plugins are only imported once a command needs them"""
+    _ = manifest_path  # prevent unused-argument warning
+    with patch("importlib.metadata.entry_points", return_value=entry_points):
+        Invoker()
+        invoker = Invoker()
+
+    assert not any(ref.loaded for ref in invoker.plugins)
+    assert str(invoker.execute_command(CommandInput("add 1 2"))) == "3"
+    assert [ref.loaded for ref in invoker.plugins] == [True, False]
+
+
+def test_aliases_using_reads_the_manifest(manifest_path):
+    """Plugins asking for a service are found from the manifest without importing any"""
+    _ = manifest_path  # prevent unused-argument warning
+    entry_points = make_entry_points(
+        add_plugin="calculator.commands.add.add:Add",
+        historydelete_plugin="calculator.commands.history.history_delete:HistoryDelete"
+    )
+    with patch("importlib.metadata.entry_points", return_value=entry_points):
+        Invoker()
+        invoker = Invoker()
+
+    assert invoker.aliases_using("history") == {"delete"}
+    assert not any(ref.loaded for ref in invoker.plugins)
+
+
+def test_stale_manifest_is_rebuilt(entry_points, manifest_path):
+    """Changing the installed plugins invalidates the cached manifest"""
+    with patch("importlib.metadata.entry_points", return_value=entry_points):
+        discover_plugins(str(manifest_path))
+
+    changed = make_entry_points(add_plugin="calculator.commands.add.add:Add")
+    with patch("importlib.metadata.entry_points", return_value=changed):
+        plugins = discover_plugins(str(manifest_path))
+
+    assert [ref.name for ref in plugins] == ["add_plugin"]
+    assert all(ref.loaded for ref in plugins)
+    assert len(json.loads(manifest_path.read_text())["plugins"]) == 1
+
+
+def test_corrupt_manifest_is_rebuilt(entry_points, manifest_path):
+    """An unreadable manifest is treated as a cache miss"""
+    manifest_path.parent.mkdir(parents=True)
+    manifest_path.write_text("{not json")
+    with patch("importlib.metadata.entry_points", return_value=entry_points):
+        plugins = discover_plugins(str(manifest_path))
+    assert all(ref.loaded for ref in plugins)
+    assert json.loads(manifest_path.read_text())["version"] == MANIFEST_VERSION
+
+
+def test_plugin_ref_loads_once():
+    """PluginRef imports its plugin lazily and caches the class"""
+    ref = PluginRef("add_plugin", "calculator.commands.add.add:Add", Add.ALIASES)
+    assert not ref.loaded
+    assert ref.load() is Add
+    assert ref.loaded
+    assert "add_plugin" in repr(ref)
@@ -0,0 +1,59 @@
+"""Unit tests for the result cache of pure commands."""
+
+from calculator.result_cache import MAX_OPERANDS, ResultCache
+from calculator.commands.add.add import Add
+from calculator.commands.subtract.subtract import Subtract
+
+
+def test_lru_eviction_and_counters():
+    """Test the least recently used result is evicted and every lookup is counted."""
+    cache = ResultCache(2)
+    cache.put("a", "1")
+    cache.put("b", "2")
+    assert cache.get("a") == "1"
+    cache.put("c", "3")
+    assert cache.get("b") is None
+    assert cache.get("a") == "1" and cache.get("c") == "3"
+    assert (cache.hits, cache.misses, cache.evictions, len(cache)) == (3, 1, 1, 2)
+
+
+def test_keys_keep_the_argument_order():
+    """Test keys keep the argument order and only commutative plugins get a sorted one."""
+    assert ResultCache.key(Add, ("2", "1")) != ResultCache.key(Add, ("1", "2"))
+    assert ResultCache.key(Add, ("1", "2")) != ResultCache.key(Subtract, ("1", "2"))
+    assert ResultCache.key(Add, ("1",) * (MAX_OPERANDS + 1)) is None
+    any_order = ResultCache.any_order_key(ResultCache.key(Add, ("2", "1")))
+    assert any_order == ResultCache.any_order_key(ResultCache.key(Add, ("1", "2")))
+    assert any_order == (Add, ("1", "2"))
+    assert ResultCache.any_order_key(ResultCache.key(Subtract, ("2", "1"))) is None
+    assert ResultCache.any_order_key(ResultCache.key(Add, ("1",))) is None
+
+
+def test_get_tries_each_key():
+    """Test a lookup under several keys counts one hit or one miss."""
+    cache = ResultCache(4)
+    cache.put("b", "2")
+    assert cache.get("a", None, "b") == "2"
+    assert cache.get("a", "c") is None
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_size_from_environment(monkeypatch):
+    """Test RESULT_CACHE_SIZE sets the size and 0 turns the cache off."""
+    monkeypatch.setenv("RESULT_CACHE_SIZE", "7")
+    assert ResultCache().max_size == 7
+    monkeypatch.setenv("RESULT_CACHE_SIZE", "0")
+    assert not ResultCache().enabled
+    assert "off" in ResultCache().report()
+
+
+def test_report_and_clear():
+    """Test the report shows the counters and clear resets them."""
+    cache = ResultCache(10)
+    cache.put("a", "1")
+    cache.get("a")
+    cache.get("b")
+    assert cache.report() == ("Result cache: 1 hits, 1 misses (50.0% hit rate), 0 evictions,"
+                              " 1/10 entries")
+    cache.clear()
+    assert (cache.hits, cache.misses, len(cache)) == (0, 0, 0)
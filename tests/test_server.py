@@ -0,0 +1,147 @@
+"""Tests for the JSON lines calculator server."""
+
+import json
+import asyncio
+from importlib.metadata import EntryPoint
+from concurrent.futures import Executor, Future
+from concurrent.futures.process import BrokenProcessPool
+from unittest.mock import patch
+import pytest
+from calculator.invoker import Invoker
+from calculator.plugin_manifest import ENTRY_POINT_GROUP
+from calculator.server import CalculatorServer
+from calculator.stats import Stats
+from calculator.commands.history.history import History
+
+
+PLUGINS = {
+    "add_plugin": "calculator.commands.add.add:Add",
+    "multiply_plugin": "calculator.commands.multiply.multiply:Multiply",
+    "historydelete_plugin": "calculator.commands.history.history_delete:HistoryDelete",
+}
+
+
+@pytest.fixture(name="calculator_server")
+def fixture_calculator_server():
+    """Server over the real add and delete plugins, forked workers inherit the patch"""
+    entry_points = [EntryPoint(name, value, ENTRY_POINT_GROUP) for name, value in PLUGINS.items()]
+    with patch("importlib.metadata.entry_points", return_value=entry_points):
+        history = History()
+        yield CalculatorServer(Invoker({"history": history}), history)
+
+
+async def exchange(calculator_server: CalculatorServer, socket_path: str,
+                   requests: list) -> list[dict]:
+    """Send pipelined requests over a Unix socket and read a reply for each"""
+    serving = asyncio.create_task(calculator_server.serve(socket_path=socket_path))
+    for _ in range(100):
+        await asyncio.sleep(0.01)
+        try:
+            reader, writer = await asyncio.open_unix_connection(socket_path)
+            break
+        except (FileNotFoundError, ConnectionRefusedError):
+            continue
+    for request in requests:
+        writer.write(request if isinstance(request, bytes) else json.dumps(request).encode())
+        writer.write(b"\n")
+    await writer.drain()
+    replies = [json.loads(await reader.readline()) for _ in requests]
+    writer.close()
+    serving.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await serving
+    return replies
+
+
+def test_pipelined_requests(calculator_server, tmp_path):
+    """Test several requests sent at once are all answered"""
+    requests = [{"id": i, "input": f"add {i} 1"} for i in range(20)]
+    replies = asyncio.run(exchange(calculator_server, str(tmp_path / "calc.sock"), requests))
+    assert sorted((r["id"], r["output"], r["error"]) for r in replies) == [
+        (i, str(i + 1), None) for i in range(20)
+    ]
+    assert list(calculator_server.history.history["output"]) == ["16", "17", "18", "19", "20"]
+    assert not (tmp_path / "calc.sock").exists()
+
+
+def test_errors_are_replies(calculator_server, tmp_path):
+    """Test bad requests and failing commands get error replies instead of dropping the client"""
+    requests = [b"not json", {"id": "a"}, {"id": "b", "input": "nope 1"},
+                {"id": "c", "input": "add 1"}, {"id": "d", "input": "add 2 2"}]
+    replies = asyncio.run(exchange(calculator_server, str(tmp_path / "calc.sock"), requests))
+    by_id = {r["id"]: r for r in replies}
+    assert by_id[None]["error"].startswith("Invalid request")
+    assert by_id["a"]["error"].startswith("Invalid request")
+    assert by_id["b"]["error"].startswith("MissingCommandError")
+    assert by_id["c"]["error"].startswith("MissingAdditionArguments")
+    assert by_id["d"] == {"id": "d", "output": "4", "error": None}
+
+
+def test_long_inputs_run_in_pool(calculator_server, tmp_path, monkeypatch):
+    """Test long commands go to the process pool and are still recorded"""
+    monkeypatch.setenv("SERVE_OFFLOAD_CHARS", "100")
+    offloading = CalculatorServer(calculator_server.invoker, calculator_server.history)
+    long_add = "add " + " ".join(["1"] * 100)
+    assert offloading._offload(long_add)  # pylint: disable=protected-access
+    assert not offloading._offload("delete " + "1" * 100)  # pylint: disable=protected-access
+    requests = [{"id": 1, "input": long_add}, {"id": 2, "input": "add 1 1"}]
+    replies = asyncio.run(exchange(offloading, str(tmp_path / "calc.sock"), requests))
+    assert {r["id"]: r["output"] for r in replies} == {1: "100", 2: "2"}
+    assert offloading.executor is None
+    assert sorted(offloading.history.history["output"]) == ["100", "2"]
+
+
+def test_pool_timings_are_merged(calculator_server, tmp_path, monkeypatch):
+    """Test commands run in the pool are counted in the server's stats"""
+    monkeypatch.setenv("SERVE_OFFLOAD_CHARS", "100")
+    stats = Stats()
+    invoker = Invoker({"history": calculator_server.history, "stats": stats})
+    offloading = CalculatorServer(invoker, calculator_server.history)
+    requests = [{"id": 1, "input": "add " + " ".join(["1"] * 100)}, {"id": 2, "input": "add 1 1"}]
+    asyncio.run(exchange(offloading, str(tmp_path / "calc.sock"), requests))
+    assert stats.histograms[("Add", "execute")].count == 2
+
+
+def test_in_flight_limit(calculator_server, tmp_path, monkeypatch):
+    """Test the server stops reading once too many requests are running"""
+    monkeypatch.setenv("SERVE_MAX_IN_FLIGHT", "2")
+    limited = CalculatorServer(calculator_server.invoker, calculator_server.history)
+    running = []
+    peak = []
+
+    async def slow_command(text):
+        running.append(text)
+        peak.append(len(running))
+        await asyncio.sleep(0.02)
+        running.remove(text)
+        return text, None
+
+    limited.run_command = slow_command
+    requests = [{"id": i, "input": f"add {i} 0"} for i in range(6)]
+    replies = asyncio.run(exchange(limited, str(tmp_path / "calc.sock"), requests))
+    assert len(replies) == 6
+    assert max(peak) == 2
+
+
+class BrokenPool(Executor):
+    """Executor failing like a process pool whose worker was killed"""
+    def submit(self, fn, /, *args, **kwargs):
+        future = Future()
+        future.set_exception(BrokenProcessPool("a worker died"))
+        return future
+
+
+def test_unexpected_errors_are_replies(calculator_server, tmp_path, monkeypatch):
+    """Test exceptions other than CLIError still get exactly one reply per request"""
+    monkeypatch.setenv("SERVE_OFFLOAD_CHARS", "100")
+    offloading = CalculatorServer(calculator_server.invoker, calculator_server.history)
+    offloading.executor = BrokenPool()
+    requests = [{"id": 1, "input": "multiply 1e999999 10"},
+                {"id": 2, "input": "add " + " ".join(["1"] * 100)},
+                {"id": 3, "input": "add 1 1"}]
+    replies = asyncio.run(exchange(offloading, str(tmp_path / "calc.sock"), requests))
+    by_id = {r["id"]: r for r in replies}
+    assert len(replies) == 3
+    assert by_id[1]["error"].startswith("Overflow")
+    assert by_id[2]["error"].startswith("BrokenProcessPool")
+    assert by_id[3] == {"id": 3, "output": "2", "error": None}
@@ -1,7 +1,26 @@
 """Tests for environment setup logic in setup_env()."""
 
+import os
+import logging
+from logging.handlers import QueueHandler
 from unittest.mock import patch
+import pytest
+from calculator import log_queue
 from calculator.setup_env import setup_env
+from calculator.commands.history.history import flush_all
+
+
+@pytest.fixture(autouse=True)
+def restore_root_logger():
+    """Put the root logger back the way it was after setup_env reconfigures it"""
+    root = logging.getLogger()
+    saved_handlers, saved_level = root.handlers[:], root.level
+    # background flushers of earlier tests' histories would log while logging is mocked
+    flush_all()
+    yield
+    log_queue.stop_log_queue()
+    root.handlers = saved_handlers
+    root.setLevel(saved_level)
 
 
 @patch("calculator.setup_env.load_dotenv")
@@ -42,3 +61,54 @@ def test_setup_env_configures_logging(
     assert mock_makedirs.call_count == 2
     mock_file_config.assert_called_once()
     mock_debug.assert_called_once_with("Initialized environment")
+
+
+@patch("calculator.setup_env.load_dotenv")
+@patch("calculator.setup_env.os.makedirs")
+@patch("calculator.setup_env.logging.config.fileConfig")
+def test_setup_env_sqlite_history(mock_file_config, mock_makedirs, mock_dotenv, monkeypatch):
+    """Test the SQLite history backend gets a database file next to the CSV one."""
+    _ = mock_file_config, mock_makedirs, mock_dotenv
+    for key, value in {
+        "LOG_NAME": "app.log",
+        "LOG_DIR_NAME": "logs",
+        "LOG_CONFIG_NAME": "logging.conf",
+        "HISTORY_DIR_NAME": "history",
+        "HISTORY_NAME": "history.csv",
+        "HISTORY_BACKEND": "SQLite"
+    }.items():
+        monkeypatch.setenv(key, value)
+    monkeypatch.setenv("ARITHMETIC_BACKEND", "decimal")
+    monkeypatch.setenv("PLUGIN_MANIFEST", "")
+
+    setup_env()
+
+    assert os.environ["HISTORY_BACKEND"] == "sqlite"
+    assert os.environ["HISTORY_FILE"].endswith("history.db")
+
+
+@patch("calculator.setup_env.load_dotenv")
+@patch("calculator.setup_env.os.makedirs")
+@patch("calculator.setup_env.logging.config.fileConfig")
+def test_setup_env_writes_logs_in_background(mock_file_config, mock_makedirs, mock_dotenv,
+                                             monkeypatch):
+    """Test the configured handlers end up behind a queue served by a listener thread."""
+    _ = mock_makedirs, mock_dotenv
+    for key, value in {
+        "LOG_NAME": "app.log",
+        "LOG_DIR_NAME": "logs",
+        "LOG_CONFIG_NAME": "logging.conf",
+        "HISTORY_DIR_NAME": "history",
+        "HISTORY_NAME": "history.csv",
+        "LOG_LEVEL": "INFO"
+    }.items():
+        monkeypatch.setenv(key, value)
+    handler = logging.NullHandler()
+    mock_file_config.side_effect = lambda *args, **kwargs: logging.getLogger().addHandler(handler)
+
+    setup_env()
+
+    root = logging.getLogger()
+    assert [type(h) for h in root.handlers] == [QueueHandler]
+    assert handler in log_queue._listener.handlers  # pylint: disable=protected-access
+    assert root.level == logging.INFO
@@ -0,0 +1,65 @@
+"""Unit tests for command latency statistics."""
+
+import random
+import pytest
+from calculator.stats import (
+    LatencyHistogram, Stats, bucket_index, bucket_value, format_ns
+)
+
+
+def test_bucket_bounds():
+    """Test every value falls in a bucket whose upper bound is within 3% of it."""
+    for value in list(range(200)) + [random.randrange(10 ** 12) for _ in range(1000)]:
+        index = bucket_index(value)
+        assert value <= bucket_value(index) <= value * 1.032 + 1
+        assert bucket_index(bucket_value(index)) == index
+
+
+def test_percentiles():
+    """Test percentiles of a known distribution."""
+    histogram = LatencyHistogram()
+    for value in range(1, 10001):
+        histogram.record(value * 1000)
+    assert histogram.count == 10000
+    assert histogram.percentile(50) == pytest.approx(5_000_000, rel=0.035)
+    assert histogram.percentile(99) == pytest.approx(9_900_000, rel=0.035)
+    assert histogram.percentile(100) == histogram.max == 10_000_000
+    assert LatencyHistogram().percentile(50) == 0
+
+
+def test_merge():
+    """Test merging histograms adds their counts."""
+    first, second = LatencyHistogram(), LatencyHistogram()
+    first.record(10)
+    second.record(10 ** 9)
+    first.merge(second)
+    assert first.count == 2
+    assert first.max == 10 ** 9
+    assert first.percentile(50) == 10
+
+
+def test_format_ns():
+    """Test durations are shown in a readable unit."""
+    assert format_ns(512) == "512ns"
+    assert format_ns(1500) == "1.5µs"
+    assert format_ns(2_500_000) == "2.5ms"
+    assert format_ns(3_000_000_000) == "3.0s"
+
+
+def test_report():
+    """Test the report lists all-command rows before per-command rows."""
+    stats = Stats()
+    assert stats.report() == "No commands timed yet"
+    stats.record_command("Add", 100, 200, 300, 400)
+    stats.record("output", 500)
+    stats.record("history", 600, command="Multiply")
+    lines = stats.report().splitlines()
+    assert lines[0].split() == ["command", "phase", "count", "p50", "p95", "p99", "max"]
+    assert [line.split()[:2] for line in lines[1:]] == [
+        ["all", "parse"], ["all", "dispatch"], ["all", "validate"], ["all", "execute"],
+        ["all", "history"], ["all", "output"],
+        ["Add", "parse"], ["Add", "dispatch"], ["Add", "validate"], ["Add", "execute"],
+        ["Add", "output"], ["Multiply", "history"]
+    ]
+    stats.clear()
+    assert stats.report() == "No commands timed yet"
@@ -0,0 +1,47 @@
+"""Tests for the stats command plugin."""
+
+import pytest
+from calculator.command_input import CommandInput
+from calculator.commands.stats.stats import StatsCommand
+from calculator.commands.stats.exceptions import InvalidStatsArguments
+from calculator.stats import Stats
+
+
+@pytest.fixture(name="stats")
+def fixture_stats():
+    """Stats with one timed command."""
+    stats = Stats()
+    stats.record_command("Add", 1000, 2000, 3000, 4000)
+    return stats
+
+
+def test_in_scope():
+    """Test the stats command is matched."""
+    assert StatsCommand.in_scope(CommandInput("stats"))
+    assert not StatsCommand.in_scope(CommandInput("status"))
+
+
+def test_validate_rejects_arguments(stats):
+    """Test only reset is accepted as an argument."""
+    StatsCommand(CommandInput("stats"), stats).validate()
+    StatsCommand(CommandInput("stats reset"), stats).validate()
+    with pytest.raises(InvalidStatsArguments):
+        StatsCommand(CommandInput("stats now"), stats).validate()
+
+
+def test_execute_prints_report(stats):
+    """Test the report of the shared stats is the output."""
+    output = StatsCommand(CommandInput("stats"), stats).execute().output
+    assert "p99" in output
+    assert "Add" in output
+
+
+def test_reset(stats):
+    """Test stats reset clears the measurements."""
+    assert StatsCommand(CommandInput("stats reset"), stats).execute().output == "Stats reset"
+    assert not stats.histograms
+
+
+def test_without_service():
+    """Test the plugin works without a shared stats service."""
+    assert StatsCommand(CommandInput("stats")).execute().output == "No commands timed yet"